@@ -4,27 +4,122 @@ FastAPI service for face landmarks detection, pose estimation, and 3D reconstruc
 """
 
 import os
-import io
+import asyncio
 import base64
-from typing import List, Optional, Dict, Any
+import shutil
+import tempfile
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, List, Literal, Optional, Dict, Any, Tuple, Union
 import numpy as np
-import cv2
-from PIL import Image
-import httpx
-import mediapipe as mp
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl, ValidationError
 
 # Import advanced reconstruction modules
-from reconstruction_3d import (
-    StructureFromMotion,
-    MeshOptimizer,
-    TextureMapper,
-    GPUAcceleration
+from reconstruction_3d import GPUAcceleration
+from face_mesh_pool import FaceMeshPoolExhausted
+from image_fetch import ImageFetcher, ImageTooLarge
+from artifact_store import get_artifact_store
+from ingest import ImageDecodeError, UnsupportedUpload, UploadTooLarge, read_uploads
+from image_cache import ImageCache, IMAGE_CACHE_MAX_BYTES
+from workers import WorkerPool, WorkerPoolSaturated, WORKER_COUNT, WORKER_RETRY_AFTER, worker_warm_up
+from jobs import JobQueue, JobFailed, RetryJob
+from memory_budget import MemoryBudget, MemoryExhausted, RequestTooLarge, Reservation
+from video import VIDEO_MAX_FRAMES, VideoDecodeError, spool_video_upload
+from metrics import MetricsMiddleware, render as render_metrics, timed
+from pipeline import (
+    QUALITY_LEVELS,
+    RECONSTRUCTION_MODES,
+    FaceLandmarks,
+    QualityBudget,
+    QualityTier,
+    lowest_quality,
+    detect_face_landmarks,
+    estimate_input_bytes,
+    estimate_keyframe_bytes,
+    estimate_working_set,
+    reconstruct_mesh,
+    estimate_structure,
+    build_mesh,
+    bake_mesh_texture,
+    basic_points,
+    select_keyframes,
+    warm_up,
 )
+from encoders import (
+    ENCODERS,
+    MEDIA_TYPES,
+    STREAM_MEDIA_TYPES,
+    UnsupportedFormat,
+    encode_event,
+    negotiate_format,
+    negotiate_stream_format,
+    to_json_payload,
+)
+
+# Batch landmark detection limits. Items are pipelined so that at most
+# BATCH_PIPELINE_DEPTH images are downloaded, decoded or detected at once.
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "64"))
+BATCH_PIPELINE_DEPTH = int(os.getenv("BATCH_PIPELINE_DEPTH", str(2 * WORKER_COUNT + 1)))
+
+# Shared worker pool, HTTP client, job queue and memory budget, created at startup
+worker_pool: Optional[WorkerPool] = None
+image_fetcher: Optional[ImageFetcher] = None
+job_queue: Optional[JobQueue] = None
+memory_budget: Optional[MemoryBudget] = None
+
+# Every worker is started right after startup and builds its FaceMesh pool;
+# this also runs a warm-up pass through the models on each of them.
+# /ready reports ready once all workers have started.
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+warmup_task: Optional[asyncio.Task] = None
+
+
+async def _warm_up_workers() -> Dict[str, Any]:
+    """
+    Start the workers and report their start-up timings
+    Workers build their FaceMesh pool and warm up as they start, before
+    taking any task (see WorkerPool), so one task per worker starts all of
+    them and no request runs on a cold worker however these tasks are
+    spread.
+    """
+    start = time.perf_counter()
+    steps = await asyncio.gather(*(worker_pool.run(worker_warm_up) for _ in range(worker_pool.workers)))
+    return {"seconds": time.perf_counter() - start, "steps": steps[0]}
+
 
-app = FastAPI(title="Face 3D Reconstruction Service", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global worker_pool, image_fetcher, job_queue, memory_budget, warmup_task
+    worker_pool = WorkerPool(warm_up=warm_up if WARMUP_ON_STARTUP else None)
+    memory_budget = MemoryBudget()
+    image_cache = ImageCache() if IMAGE_CACHE_MAX_BYTES > 0 else None
+    image_fetcher = ImageFetcher(cache=image_cache, memory=memory_budget)
+    job_queue = JobQueue(_run_reconstruction_job)
+    job_queue.start()
+    # Start the workers in the background so the process accepts /health
+    # and /ready probes while the models load
+    warmup_task = asyncio.create_task(_warm_up_workers())
+    yield
+    if warmup_task is not None:
+        warmup_task.cancel()
+        await asyncio.gather(warmup_task, return_exceptions=True)
+        warmup_task = None
+    await job_queue.stop()
+    job_queue = None
+    await image_fetcher.aclose()
+    image_fetcher = None
+    worker_pool.shutdown()
+    worker_pool = None
+    memory_budget = None
+
+
+app = FastAPI(title="Face 3D Reconstruction Service", version="1.0.0", lifespan=lifespan)
+
+# Request latency histograms and X-Profile request traces (see /metrics)
+app.add_middleware(MetricsMiddleware)
 
 # CORS middleware
 app.add_middleware(
@@ -35,128 +130,378 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize MediaPipe
-mp_face_mesh = mp.solutions.face_mesh
-mp_face_detection = mp.solutions.face_detection
-mp_drawing = mp.solutions.drawing_utils
-
-
 class ImageUrlRequest(BaseModel):
     image_url: HttpUrl
+    compact_landmarks: bool = False  # landmarks as [x, y, z] rows instead of dicts
 
 
 class FaceLandmarksResponse(BaseModel):
-    landmarks: List[Dict[str, float]]
+    landmarks: Union[List[Dict[str, float]], List[List[float]]]
     confidence: float
     bounding_box: Dict[str, float]
     pose_angles: Dict[str, float]  # yaw, pitch, roll
+    image_size: Optional[Dict[str, int]] = None  # width, height the landmark pixels refer to
+
+
+class BatchLandmarksRequest(BaseModel):
+    image_urls: List[HttpUrl]
+    compact_landmarks: bool = False  # landmarks as [x, y, z] rows instead of dicts
+
+
+class BatchLandmarksItem(BaseModel):
+    index: int
+    source: str  # URL or uploaded file name
+    status_code: int  # Per-item status, as /detect-landmarks would answer it
+    result: Optional[FaceLandmarksResponse] = None
+    error: Optional[str] = None
+
+
+class BatchLandmarksResponse(BaseModel):
+    results: List[BatchLandmarksItem]
+    succeeded: int
+    failed: int
 
 
 class MultiViewReconstructionRequest(BaseModel):
     image_urls: List[HttpUrl]
     expected_angles: Optional[List[str]] = None  # ["front", "left_30", "right_30", etc.]
+    compact_landmarks: bool = False  # landmarks as [x, y, z] rows instead of dicts
+    dense: bool = False  # also return the dense point cloud of the SIFT matches
+    mode: Literal["accurate", "fast"] = "accurate"  # fast: landmark PnP poses, no SIFT
+    quality: Literal["draft", "standard", "high"] = "standard"  # per-stage budgets, see pipeline.QUALITY_TIERS
+    deadline_ms: Optional[int] = Field(None, gt=0)  # later stages run at a lower tier when earlier ones overran
+
+
+class VideoKeyframe(BaseModel):
+    frame: int  # Frame number in the video or position in the frame sequence
+    yaw: float
+    pitch: float
+    sharpness: float  # Variance of the Laplacian over the face
 
 
 class MultiViewReconstructionResponse(BaseModel):
     landmarks_list: List[FaceLandmarksResponse]
     reconstruction_quality: float
     estimated_3d_points: Optional[List[List[float]]] = None
+    dense_points: Optional[List[List[float]]] = None  # Filtered SIFT point cloud (dense requests)
     mesh_vertices: Optional[List[List[float]]] = None
     mesh_faces: Optional[List[List[int]]] = None
+    mesh_uvs: Optional[List[List[float]]] = None  # Per-vertex texture coordinates, origin top-left
     texture_data: Optional[str] = None  # Base64 encoded texture
     warnings: List[str] = []
-    gpu_accelerated: bool = False
+    quality: Optional[str] = None  # Lowest tier any reconstruction stage actually ran at
+    keyframes: Optional[List[VideoKeyframe]] = None  # Frames selected from a video input
+
+
+class JobSubmittedResponse(BaseModel):
+    job_id: str
+    status: str
+    deduplicated: bool = False  # True when attached to an identical existing job
 
 
-def download_image(url: str) -> np.ndarray:
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str  # queued, running, succeeded or failed
+    created_at: float
+    updated_at: float
+    expires_at: Optional[float] = None  # Result is dropped after this time
+    result: Optional[MultiViewReconstructionResponse] = None
+    error: Optional[Dict[str, Any]] = None  # status_code and detail of a failed job
+
+
+def _download_error(error: BaseException) -> HTTPException:
+    if isinstance(error, HTTPException):
+        return error
+    if isinstance(error, (RequestTooLarge, MemoryExhausted)):
+        return _memory_error(error)
+    if isinstance(error, ImageTooLarge):
+        return HTTPException(status_code=413, detail=f"Failed to download image: {str(error)}")
+    return HTTPException(status_code=400, detail=f"Failed to download image: {str(error)}")
+
+
+async def download_image(url: str) -> np.ndarray:
     """Download image from URL and convert to numpy array"""
     try:
-        response = httpx.get(url, timeout=30.0)
-        response.raise_for_status()
-        
-        image_bytes = io.BytesIO(response.content)
-        image = Image.open(image_bytes)
-        image = image.convert('RGB')
-        
-        return np.array(image)
+        return await image_fetcher.fetch_image(url)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to download image: {str(e)}")
+        raise _download_error(e)
 
 
-def detect_face_landmarks(image: np.ndarray) -> Optional[Dict[str, Any]]:
+async def download_images(urls: List[str], max_side: int = 0) -> List[Any]:
     """
-    Detect face landmarks using MediaPipe Face Mesh
-    Returns landmarks, confidence, bounding box, and pose angles
+    Download several images concurrently, decoded to at most max_side
+    Each entry is either the decoded array or the HTTPException for that URL.
+    A decode refused by the memory budget fails the whole request.
     """
-    with mp_face_mesh.FaceMesh(
-        static_image_mode=True,
-        max_num_faces=1,
-        refine_landmarks=True,
-        min_detection_confidence=0.5
-    ) as face_mesh:
-        # Convert BGR to RGB (MediaPipe expects RGB)
-        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        results = face_mesh.process(rgb_image)
-        
-        if not results.multi_face_landmarks:
-            return None
-        
-        face_landmarks = results.multi_face_landmarks[0]
-        
-        # Extract landmarks (468 points for Face Mesh)
-        landmarks = []
-        h, w = image.shape[:2]
-        
-        for landmark in face_landmarks.landmark:
-            landmarks.append({
-                "x": landmark.x * w,
-                "y": landmark.y * h,
-                "z": landmark.z * w,  # z is relative to image width
-            })
-        
-        # Calculate bounding box
-        x_coords = [lm["x"] for lm in landmarks]
-        y_coords = [lm["y"] for lm in landmarks]
-        bbox = {
-            "x_min": min(x_coords),
-            "y_min": min(y_coords),
-            "x_max": max(x_coords),
-            "y_max": max(y_coords),
-            "width": max(x_coords) - min(x_coords),
-            "height": max(y_coords) - min(y_coords),
-        }
-        
-        # Estimate pose angles (simplified calculation)
-        # Using key facial landmarks for pose estimation
-        nose_tip = landmarks[1]  # Nose tip landmark
-        left_eye = landmarks[33]
-        right_eye = landmarks[263]
-        chin = landmarks[175]
-        
-        # Calculate yaw (left-right rotation)
-        eye_center_x = (left_eye["x"] + right_eye["x"]) / 2
-        yaw = np.arctan2(nose_tip["x"] - eye_center_x, nose_tip["z"]) * 180 / np.pi
-        
-        # Calculate pitch (up-down rotation)
-        eye_center_y = (left_eye["y"] + right_eye["y"]) / 2
-        pitch = np.arctan2(nose_tip["y"] - eye_center_y, nose_tip["z"]) * 180 / np.pi
-        
-        # Calculate roll (head tilt)
-        roll = np.arctan2(right_eye["y"] - left_eye["y"], right_eye["x"] - left_eye["x"]) * 180 / np.pi
-        
-        # Confidence based on face detection
-        confidence = 0.9  # MediaPipe doesn't provide confidence, using default
-        
-        return {
-            "landmarks": landmarks,
-            "confidence": confidence,
-            "bounding_box": bbox,
-            "pose_angles": {
-                "yaw": float(yaw),
-                "pitch": float(pitch),
-                "roll": float(roll),
-            }
-        }
+    results = await image_fetcher.fetch_images(urls, max_side)
+    for result in results:
+        if isinstance(result, (RequestTooLarge, MemoryExhausted)):
+            raise _memory_error(result)
+    return [
+        _download_error(result) if isinstance(result, BaseException) else result
+        for url, result in zip(urls, results)
+    ]
+
+
+async def decode_upload(data: bytes, max_side: int = 0) -> np.ndarray:
+    """
+    Decode uploaded bytes off the event loop to at most max_side
+    Bad data maps to 400, memory budget refusals to 413 / 503.
+    """
+    try:
+        return await asyncio.to_thread(image_fetcher.decode, data, max_side)
+    except ImageDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Failed to decode image: {str(e)}")
+    except (RequestTooLarge, MemoryExhausted) as e:
+        raise _memory_error(e)
+
+
+async def _read_uploads(request: Request, field: str, max_files: int) -> Tuple[List[Tuple[str, bytes]], Dict[str, List[str]]]:
+    """ingest.read_uploads with its errors mapped to 413, 415 and 400"""
+    try:
+        return await read_uploads(request, field, max_files, image_fetcher.max_bytes)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedUpload as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _form_flag(fields: Dict[str, List[str]], name: str) -> bool:
+    return (fields.get(name) or ["false"])[-1].lower() in ("1", "true", "yes")
+
+
+def _form_choice(fields: Dict[str, List[str]], name: str, choices: Tuple[str, ...], default: str) -> str:
+    """Enumerated form field, 400 for values outside choices"""
+    value = (fields.get(name) or [default])[-1].lower()
+    if value not in choices:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown {name} '{value}', expected one of: {', '.join(choices)}"
+        )
+    return value
+
+
+def _form_budget(fields: Dict[str, List[str]], started: float) -> QualityBudget:
+    """"quality" and "deadline_ms" form fields as the request's QualityBudget"""
+    quality = _form_choice(fields, "quality", QUALITY_LEVELS, "standard")
+    deadline = (fields.get("deadline_ms") or [""])[-1]
+    if deadline and not (deadline.isdigit() and int(deadline) > 0):
+        raise HTTPException(status_code=400, detail="deadline_ms must be a positive integer")
+    return QualityBudget.for_request(quality, int(deadline) if deadline else None, started)
+
+
+def _worker_error(error: BaseException) -> Optional[HTTPException]:
+    """Map worker-side capacity errors to 503 responses"""
+    if isinstance(error, WorkerPoolSaturated):
+        return HTTPException(
+            status_code=503,
+            detail=str(error),
+            headers={"Retry-After": str(error.retry_after)},
+        )
+    if isinstance(error, FaceMeshPoolExhausted):
+        return HTTPException(status_code=503, detail=str(error))
+    return None
+
+
+def _memory_error(error: Exception) -> HTTPException:
+    """Map memory budget refusals to 413 (never fits) and 503 (retry later)"""
+    if isinstance(error, RequestTooLarge):
+        return HTTPException(status_code=413, detail=str(error))
+    return HTTPException(
+        status_code=503,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
+@contextmanager
+def _reserve_memory(nbytes: int, reservation: Optional[Reservation] = None) -> Iterator[Reservation]:
+    """
+    Hold nbytes of the memory budget for the enclosed block
+    An outer reservation is resized to nbytes instead and stays held by its owner.
+    """
+    owned = reservation is None
+    try:
+        if owned:
+            reservation = memory_budget.reserve(nbytes)
+        else:
+            reservation.resize(nbytes)
+    except (RequestTooLarge, MemoryExhausted) as e:
+        raise _memory_error(e)
+    try:
+        yield reservation
+    finally:
+        if owned:
+            reservation.release()
+
+
+def _pose_summary(landmarks_list: List[FaceLandmarks]) -> Tuple[float, float, float]:
+    """
+    Reconstruction quality estimate plus the yaw and pitch ranges
+    Based on number of detected faces, angle diversity, and confidence
+    """
+    # Validate pose angles (check if images are from different angles)
+    pose_variations = [lm.pose_angles for lm in landmarks_list]
+    
+    num_detections = len(landmarks_list)
+    avg_confidence = sum(lm.confidence for lm in landmarks_list) / len(landmarks_list)
+    
+    # Check angle diversity
+    yaw_range = max(p["yaw"] for p in pose_variations) - min(p["yaw"] for p in pose_variations)
+    pitch_range = max(p["pitch"] for p in pose_variations) - min(p["pitch"] for p in pose_variations)
+    
+    angle_diversity = (abs(yaw_range) + abs(pitch_range)) / 360.0
+    
+    # Quality score: 0.0 to 1.0
+    reconstruction_quality = (
+        (num_detections / 9.0) * 0.4 +  # Ideal: 9 images
+        avg_confidence * 0.3 +
+        min(angle_diversity, 1.0) * 0.3
+    )
+    return float(reconstruction_quality), yaw_range, pitch_range
+
+
+def _angle_warnings(yaw_range: float, pitch_range: float) -> List[str]:
+    warnings = []
+    if yaw_range < 30:
+        warnings.append("Low yaw angle diversity - recommend images from different horizontal angles")
+    if pitch_range < 10:
+        warnings.append("Low pitch angle diversity - recommend images from different vertical angles")
+    return warnings
+
+
+def _quality_warnings(budget: QualityBudget, delivered: str) -> List[str]:
+    if delivered == budget.quality:
+        return []
+    return [f"Delivered {delivered} quality instead of {budget.quality} to meet deadline_ms"]
+
+
+async def run_reconstruction(downloaded: List[Any], dense: bool = False,
+                             detections: Optional[List[Optional[FaceLandmarks]]] = None,
+                             mode: str = "accurate",
+                             budget: Optional[QualityBudget] = None,
+                             input_tier: Optional[QualityTier] = None,
+                             reservation: Optional[Reservation] = None) -> Dict[str, Any]:
+    """
+    Detect and reconstruct for one multi-view request
+    downloaded holds the decoded image, or the HTTPException of a failed
+    download, per view. dense adds the SIFT point cloud; mode picks the
+    camera pose estimation (see pipeline.RECONSTRUCTION_MODES). Landmarks already
+    known (video keyframes) are passed as detections and skip FaceMesh.
+    input_tier is the tier the views were decoded at. The reconstruction
+    holds its estimated working set of the memory budget while it runs
+    (413 / 503 when refused), by resizing the caller's reservation if given.
+    Returns the array-valued result consumed by the response encoders.
+    Request errors are raised as HTTPException.
+    """
+    landmarks_list = []
+    warnings = []
+    budget = budget or QualityBudget()
+    input_quality = input_tier.name if input_tier else None
+    
+    # Detect landmarks on the worker pool. The decoded arrays are kept
+    # for the SfM stage below.
+    async def detect(image: Any) -> Optional[FaceLandmarks]:
+        if isinstance(image, HTTPException):
+            raise image
+        return await worker_pool.run(detect_face_landmarks, image)
+    
+    if detections is None:
+        detections = await asyncio.gather(*(detect(image) for image in downloaded), return_exceptions=True)
+    for idx, result in enumerate(detections):
+        if isinstance(result, BaseException):
+            capacity_error = _worker_error(result)
+            if capacity_error:
+                raise capacity_error
+            warnings.append(f"Image {idx + 1}: Error processing - {str(result)}")
+        elif result:
+            landmarks_list.append(result)
+        else:
+            warnings.append(f"Image {idx + 1}: No face detected")
+    
+    if len(landmarks_list) == 0:
+        raise HTTPException(status_code=404, detail="No faces detected in any image")
+    
+    reconstruction_quality, yaw_range, pitch_range = _pose_summary(landmarks_list)
+    
+    # Advanced 3D reconstruction using SfM and triangulation
+    reconstruction = {
+        "estimated_3d_points": None,
+        "dense_points": None,
+        "mesh_vertices": None,
+        "mesh_faces": None,
+        "mesh_uvs": None,
+        "texture_jpeg": None,
+        "quality": None,
+        "warnings": [],
+    }
+    
+    if len(landmarks_list) >= 2:
+        failed = next((img for img in downloaded if isinstance(img, HTTPException)), None)
+        if failed is not None:
+            warnings.append(f"Advanced reconstruction failed, using basic method: {str(failed)}")
+            reconstruction["estimated_3d_points"] = basic_points(landmarks_list[0])
+        else:
+            # Reuse the images decoded for landmark detection
+            aligned_landmarks = [r if isinstance(r, FaceLandmarks) else None for r in detections]
+            try:
+                nbytes = estimate_working_set(downloaded, aligned_landmarks, mode, budget)
+                with _reserve_memory(nbytes, reservation):
+                    reconstruction = await worker_pool.run(
+                        reconstruct_mesh, downloaded, aligned_landmarks, dense, mode, budget
+                    )
+            except WorkerPoolSaturated as e:
+                raise _worker_error(e)
+    warnings.extend(reconstruction["warnings"])
+    if reconstruction["quality"] is not None:
+        reconstruction["quality"] = lowest_quality(input_quality, reconstruction["quality"])
+        warnings.extend(_quality_warnings(budget, reconstruction["quality"]))
+    
+    # Add warnings about angle diversity
+    warnings.extend(_angle_warnings(yaw_range, pitch_range))
+    
+    return {
+        **reconstruction,
+        "landmarks": landmarks_list,
+        "reconstruction_quality": float(reconstruction_quality),
+        "warnings": warnings,
+    }
+
+
+async def _reconstruct_urls(urls: List[str], dense: bool, mode: str,
+                            budget: QualityBudget) -> Dict[str, Any]:
+    """
+    run_reconstruction on downloaded views
+    The views are decoded at the budget's input resolution, and their upper
+    bound (pipeline.estimate_input_bytes) is reserved of the memory budget
+    before anything is fetched. The decoded views are released on return.
+    """
+    input_tier = budget.tier("input")
+    with _reserve_memory(estimate_input_bytes(len(urls), input_tier)) as reservation:
+        downloaded = await download_images(urls, input_tier.image_max_side)
+        return await run_reconstruction(
+            downloaded, dense, mode=mode, budget=budget, input_tier=input_tier, reservation=reservation
+        )
+
+
+async def _run_reconstruction_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Job queue runner: one multi-view reconstruction as its JSON payload"""
+    request = MultiViewReconstructionRequest(**params)
+    try:
+        result = await _reconstruct_urls(
+            [str(url) for url in request.image_urls],
+            request.dense,
+            request.mode,
+            QualityBudget.for_request(request.quality, request.deadline_ms)
+        )
+    except HTTPException as e:
+        if e.status_code == 503:
+            # Worker pool or memory budget is saturated; try again instead of failing the job
+            raise RetryJob(float((e.headers or {}).get("Retry-After", WORKER_RETRY_AFTER)))
+        raise JobFailed(e.status_code, str(e.detail))
+    return to_json_payload(result, request.compact_landmarks)
 
 
 @app.get("/")
@@ -171,210 +516,513 @@ async def detect_landmarks(request: ImageUrlRequest):
     Returns 468 landmarks, confidence, bounding box, and pose angles
     """
     try:
-        image = download_image(str(request.image_url))
-        result = detect_face_landmarks(image)
+        image = await download_image(str(request.image_url))
+        result = await worker_pool.run(detect_face_landmarks, image)
         
         if not result:
             raise HTTPException(status_code=404, detail="No face detected in image")
         
-        return FaceLandmarksResponse(**result)
+        return FaceLandmarksResponse(**result.to_dict(request.compact_landmarks))
+    except HTTPException:
+        raise
+    except (WorkerPoolSaturated, FaceMeshPoolExhausted) as e:
+        raise _worker_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/detect-landmarks/upload", response_model=FaceLandmarksResponse)
+async def detect_landmarks_upload(request: Request, compact_landmarks: bool = False):
+    """
+    /detect-landmarks for an uploaded image
+    The image is the raw request body (image/* or application/octet-stream)
+    or the "image" field of a multipart form.
+    """
+    uploads, _ = await _read_uploads(request, "image", 1)
+    image = await decode_upload(uploads[0][1])
+    try:
+        result = await worker_pool.run(detect_face_landmarks, image)
+    except (WorkerPoolSaturated, FaceMeshPoolExhausted) as e:
+        raise _worker_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if not result:
+        raise HTTPException(status_code=404, detail="No face detected in image")
+    return FaceLandmarksResponse(**result.to_dict(compact_landmarks))
+
+
+@app.post("/detect-landmarks/batch", response_model=BatchLandmarksResponse)
+async def detect_landmarks_batch(request: Request):
+    """
+    Detect face landmarks for many images in one call
+    Accepts a JSON body {"image_urls": [...], "compact_landmarks": false}
+    or a multipart form with one or more "images" file fields. Download,
+    decode and FaceMesh inference of different items overlap; every item
+    gets its own status code and error so one bad image does not fail
+    the batch.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        uploads, fields = await _read_uploads(request, "images", BATCH_MAX_ITEMS)
+        compact_landmarks = _form_flag(fields, "compact_landmarks")
+        sources: List[Tuple[str, Any]] = list(uploads)
+    else:
+        try:
+            batch = BatchLandmarksRequest.model_validate(await request.json())
+        except ValueError as e:
+            detail = e.errors() if isinstance(e, ValidationError) else str(e)
+            raise HTTPException(status_code=422, detail=detail)
+        compact_landmarks = batch.compact_landmarks
+        if len(batch.image_urls) > BATCH_MAX_ITEMS:
+            raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} images per batch")
+        sources = [(str(url), str(url)) for url in batch.image_urls]
+    
+    if not sources:
+        raise HTTPException(status_code=400, detail="No images given")
+    
+    depth = asyncio.Semaphore(BATCH_PIPELINE_DEPTH)
+    
+    async def process(index: int, name: str, source: Any) -> BatchLandmarksItem:
+        # The depth semaphore keeps a bounded window of items moving
+        # through download -> decode -> inference, so item k+1 downloads
+        # while item k decodes and item k-1 runs FaceMesh
+        async with depth:
+            try:
+                if isinstance(source, str):
+                    image = await download_image(source)
+                else:
+                    image = await decode_upload(source)
+                
+                result = await worker_pool.run(detect_face_landmarks, image)
+                if not result:
+                    raise HTTPException(status_code=404, detail="No face detected in image")
+                return BatchLandmarksItem(
+                    index=index,
+                    source=name,
+                    status_code=200,
+                    result=FaceLandmarksResponse(**result.to_dict(compact_landmarks)),
+                )
+            except Exception as e:
+                error = e if isinstance(e, HTTPException) else _worker_error(e)
+                if error is None:
+                    error = HTTPException(status_code=500, detail=str(e))
+                return BatchLandmarksItem(index=index, source=name, status_code=error.status_code, error=str(error.detail))
+    
+    results = await asyncio.gather(*(process(i, name, source) for i, (name, source) in enumerate(sources)))
+    succeeded = sum(1 for item in results if item.status_code == 200)
+    return BatchLandmarksResponse(results=results, succeeded=succeeded, failed=len(results) - succeeded)
+
+
 @app.post("/multi-view-reconstruction", response_model=MultiViewReconstructionResponse)
-async def multi_view_reconstruction(request: MultiViewReconstructionRequest):
+async def multi_view_reconstruction(
+    request: MultiViewReconstructionRequest,
+    response_format: Optional[str] = Query(None, alias="format"),
+    accept: Optional[str] = Header(None),
+):
     """
     Process multiple images from different angles and reconstruct 3D face
-    Validates angles, detects landmarks, and estimates reconstruction quality
+    Validates angles, detects landmarks, and estimates reconstruction quality.
+    The response is JSON unless msgpack, GLB or PLY is requested through
+    ?format= or the Accept header.
     """
+    budget = QualityBudget.for_request(request.quality, request.deadline_ms)
     if len(request.image_urls) < 2:
         raise HTTPException(status_code=400, detail="At least 2 images required for multi-view reconstruction")
     
-    landmarks_list = []
-    warnings = []
+    try:
+        output_format = negotiate_format(accept, response_format)
+    except UnsupportedFormat as e:
+        raise HTTPException(status_code=406, detail=str(e))
     
-    # Process each image
-    for idx, url in enumerate(request.image_urls):
-        try:
-            image = download_image(str(url))
-            result = detect_face_landmarks(image)
-            
-            if result:
-                landmarks_list.append(FaceLandmarksResponse(**result))
-            else:
-                warnings.append(f"Image {idx + 1}: No face detected")
-        except Exception as e:
-            warnings.append(f"Image {idx + 1}: Error processing - {str(e)}")
+    # Download all images concurrently; the decoded views are released
+    # before the response is encoded
+    result = await _reconstruct_urls([str(url) for url in request.image_urls], request.dense, request.mode, budget)
+    return _encode_reconstruction(result, output_format, request.compact_landmarks)
+
+
+@app.post("/multi-view-reconstruction/upload", response_model=MultiViewReconstructionResponse)
+async def multi_view_reconstruction_upload(
+    request: Request,
+    response_format: Optional[str] = Query(None, alias="format"),
+    accept: Optional[str] = Header(None),
+):
+    """
+    /multi-view-reconstruction for uploaded images
+    Takes a multipart form with two or more "images" file fields and
+    optional "compact_landmarks", "dense", "mode", "quality" and
+    "deadline_ms" fields; the response negotiation is the same.
+    """
+    started = time.time()
+    try:
+        output_format = negotiate_format(accept, response_format)
+    except UnsupportedFormat as e:
+        raise HTTPException(status_code=406, detail=str(e))
     
-    if len(landmarks_list) == 0:
-        raise HTTPException(status_code=404, detail="No faces detected in any image")
+    uploads, fields = await _read_uploads(request, "images", BATCH_MAX_ITEMS)
+    if len(uploads) < 2:
+        raise HTTPException(status_code=400, detail="At least 2 images required for multi-view reconstruction")
+    mode = _form_choice(fields, "mode", RECONSTRUCTION_MODES, "accurate")
+    budget = _form_budget(fields, started)
     
-    # Validate pose angles (check if images are from different angles)
-    pose_variations = []
-    for landmarks_resp in landmarks_list:
-        angles = landmarks_resp.pose_angles
-        pose_variations.append({
-            "yaw": angles["yaw"],
-            "pitch": angles["pitch"],
-            "roll": angles["roll"],
-        })
+    # Undecodable uploads are treated like failed downloads. The views are
+    # decoded at the input resolution with their upper bound reserved first;
+    # the encoded bytes are released once decoded, the views before the
+    # response is encoded.
+    input_tier = budget.tier("input")
+    with _reserve_memory(estimate_input_bytes(len(uploads), input_tier)) as reservation:
+        decoded = await asyncio.gather(
+            *(decode_upload(data, input_tier.image_max_side) for _, data in uploads), return_exceptions=True
+        )
+        del uploads
+        # Memory budget refusals fail the request, undecodable views (400) do not
+        refused = next((d for d in decoded if isinstance(d, HTTPException) and d.status_code in (413, 503)), None)
+        if refused is not None:
+            raise refused
+        downloaded = [_download_error(d) if isinstance(d, BaseException) else d for d in decoded]
+        del decoded
+        result = await run_reconstruction(
+            downloaded, _form_flag(fields, "dense"), mode=mode, budget=budget,
+            input_tier=input_tier, reservation=reservation
+        )
+        del downloaded
+    return _encode_reconstruction(result, output_format, _form_flag(fields, "compact_landmarks"))
+
+
+@app.post("/multi-view-reconstruction/video", response_model=MultiViewReconstructionResponse)
+async def multi_view_reconstruction_video(
+    request: Request,
+    response_format: Optional[str] = Query(None, alias="format"),
+    accept: Optional[str] = Header(None),
+):
+    """
+    /multi-view-reconstruction from a head-turn video or frame sequence
+    Takes a raw video body, a multipart "video" file or multipart "frames"
+    image files, with the optional form fields of the upload variant. The
+    upload is spooled to disk and FaceMesh tracks the face frame by frame;
+    only a pose-spread set of sharp keyframes (listed under "keyframes")
+    goes on to SfM.
+    """
+    started = time.time()
+    try:
+        output_format = negotiate_format(accept, response_format)
+    except UnsupportedFormat as e:
+        raise HTTPException(status_code=406, detail=str(e))
     
-    # Calculate reconstruction quality
-    # Based on number of detected faces, angle diversity, and confidence
-    num_detections = len(landmarks_list)
-    avg_confidence = sum(lm.confidence for lm in landmarks_list) / len(landmarks_list)
+    # The frames keyframe selection holds (pipeline.estimate_keyframe_bytes)
+    # are reserved of the memory budget before the upload is read; the
+    # reservation is resized to the reconstruction's working set afterwards
+    with _reserve_memory(estimate_keyframe_bytes()) as reservation:
+        directory = tempfile.mkdtemp(prefix="face3d-video-")
+        try:
+            try:
+                paths, is_sequence, fields = await spool_video_upload(request, directory)
+            except UploadTooLarge as e:
+                raise HTTPException(status_code=413, detail=str(e))
+            except UnsupportedUpload as e:
+                raise HTTPException(status_code=415, detail=str(e))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            mode = _form_choice(fields, "mode", RECONSTRUCTION_MODES, "accurate")
+            budget = _form_budget(fields, started)
+            
+            try:
+                selection = await worker_pool.run(select_keyframes, paths, is_sequence)
+            except (WorkerPoolSaturated, FaceMeshPoolExhausted) as e:
+                raise _worker_error(e)
+            except (VideoDecodeError, ImageDecodeError) as e:
+                raise HTTPException(status_code=400, detail=f"Failed to decode video: {str(e)}")
+        finally:
+            await asyncio.to_thread(shutil.rmtree, directory, True)
+        
+        if not selection["images"]:
+            raise HTTPException(status_code=404, detail="No faces detected in any frame")
+        
+        result = await run_reconstruction(
+            selection["images"], _form_flag(fields, "dense"), selection["landmarks"], mode, budget,
+            reservation=reservation
+        )
+        result["keyframes"] = selection["keyframes"]
+        del selection["images"]
+    if selection["frames"] >= VIDEO_MAX_FRAMES:
+        result["warnings"].append(f"Only the first {VIDEO_MAX_FRAMES} frames were used")
+    return _encode_reconstruction(result, output_format, _form_flag(fields, "compact_landmarks"))
+
+
+def _encode_reconstruction(result: Dict[str, Any], output_format: str, compact_landmarks: bool) -> Any:
+    if output_format == "json":
+        with timed("serialize"):
+            return MultiViewReconstructionResponse(**to_json_payload(result, compact_landmarks))
     
-    # Check angle diversity
-    yaw_range = max(p["yaw"] for p in pose_variations) - min(p["yaw"] for p in pose_variations)
-    pitch_range = max(p["pitch"] for p in pose_variations) - min(p["pitch"] for p in pose_variations)
+    try:
+        with timed("serialize"):
+            content = ENCODERS[output_format](result)
+    except UnsupportedFormat as e:
+        raise HTTPException(status_code=406, detail=str(e))
+    return Response(content=content, media_type=MEDIA_TYPES[output_format])
+
+
+@app.post("/multi-view-reconstruction/stream")
+async def multi_view_reconstruction_stream(
+    request: MultiViewReconstructionRequest,
+    http_request: Request,
+    stream_format: Optional[str] = Query(None, alias="format"),
+    accept: Optional[str] = Header(None),
+):
+    """
+    Progressive variant of /multi-view-reconstruction
+    Streams NDJSON (default) or Server-Sent Events in order: one "landmarks"
+    event per image as soon as it is processed, then "summary", "points",
+    "dense_points" (dense requests only), "mesh", "texture" and a final
+    "done" with all warnings and the delivered quality. Errors after the
+    stream started, including memory budget refusals, are sent as an
+    "error" event. Closing the connection cancels the remaining stages.
+    """
+    budget = QualityBudget.for_request(request.quality, request.deadline_ms)
+    if len(request.image_urls) < 2:
+        raise HTTPException(status_code=400, detail="At least 2 images required for multi-view reconstruction")
     
-    angle_diversity = (abs(yaw_range) + abs(pitch_range)) / 360.0
+    try:
+        fmt = negotiate_stream_format(accept, stream_format)
+    except UnsupportedFormat as e:
+        raise HTTPException(status_code=406, detail=str(e))
     
-    # Quality score: 0.0 to 1.0
-    reconstruction_quality = (
-        (num_detections / 9.0) * 0.4 +  # Ideal: 9 images
-        avg_confidence * 0.3 +
-        min(angle_diversity, 1.0) * 0.3
+    return StreamingResponse(
+        _reconstruction_events(request, http_request, fmt, budget),
+        media_type=STREAM_MEDIA_TYPES[fmt],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
+
+
+async def _reconstruction_events(request: MultiViewReconstructionRequest,
+                                 http_request: Request, fmt: str,
+                                 budget: QualityBudget) -> AsyncIterator[bytes]:
+    urls = [str(url) for url in request.image_urls]
+    images: List[Any] = [None] * len(urls)
+    detections: List[Optional[FaceLandmarks]] = [None] * len(urls)
+    warnings = []
+    # Tiers the input views and the reconstruction stages ran at
+    input_qualities: List[str] = []
+    qualities: List[str] = []
     
-    # Advanced 3D reconstruction using SfM and triangulation
-    estimated_3d_points = None
-    mesh_vertices = None
-    mesh_faces = None
-    texture_data = None
-    gpu_accelerated = False
-    
-    if len(landmarks_list) >= 2:
+    async def process(idx: int, url: str) -> Tuple[int, Any, Any]:
+        # Each image is downloaded, decoded at the input resolution and
+        # detected on its own so results can be emitted in completion order
+        input_tier = budget.tier("input")
+        input_qualities.append(input_tier.name)
         try:
-            # Download images for SfM processing
-            images = []
-            for url in request.image_urls:
-                img = download_image(str(url))
-                images.append(img)
-            
-            # Initialize SfM
-            sfm = StructureFromMotion()
-            
-            # Detect and match features
-            matches_data = sfm.detect_and_match_features(images)
-            
-            # Estimate camera poses
-            camera_matrices = sfm.estimate_camera_poses(images, matches_data)
-            
-            # Extract landmark points for triangulation
-            # Use MediaPipe landmarks as correspondences
-            landmark_points_2d = []
-            for landmarks_resp in landmarks_list:
-                # Convert landmarks to 2D points (select key landmarks)
-                key_indices = [1, 33, 61, 199, 291, 263, 172, 175]  # Key facial features
-                points = []
-                for idx in key_indices:
-                    if idx < len(landmarks_resp.landmarks):
-                        lm = landmarks_resp.landmarks[idx]
-                        # Normalize to image coordinates (landmarks are already in pixel coordinates)
-                        points.append([lm["x"], lm["y"]])
-                if len(points) > 0:
-                    landmark_points_2d.append(np.array(points, dtype=np.float32))
-            
-            # Triangulate 3D points
-            if len(landmark_points_2d) >= 2 and len(camera_matrices) >= 2:
-                # Try GPU acceleration first
-                gpu_points = GPUAcceleration.accelerate_triangulation(
-                    landmark_points_2d[:2], 
-                    camera_matrices[:2]
-                )
+            image = await image_fetcher.fetch_image(url, input_tier.image_max_side)
+        except (RequestTooLarge, MemoryExhausted) as e:
+            return idx, None, e
+        except Exception as e:
+            error = _download_error(e)
+            return idx, error, error
+        try:
+            return idx, image, await worker_pool.run(detect_face_landmarks, image)
+        except Exception as e:
+            return idx, image, e
+    
+    # Memory budget held from before the downloads (the views' upper bound)
+    # to the last stage (the working set, from structure estimation on)
+    try:
+        reservation = memory_budget.reserve(estimate_input_bytes(len(urls), budget.tier("input")))
+    except (RequestTooLarge, MemoryExhausted) as e:
+        error = _memory_error(e)
+        yield encode_event(fmt, "error", {"status_code": error.status_code, "detail": error.detail})
+        return
+    
+    tasks = [asyncio.create_task(process(idx, url)) for idx, url in enumerate(urls)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            idx, image, result = await next_done
+            images[idx] = image
+            if isinstance(result, (RequestTooLarge, MemoryExhausted)):
+                error = _memory_error(result)
+                yield encode_event(fmt, "error", {"status_code": error.status_code, "detail": error.detail})
+                return
+            if isinstance(result, BaseException):
+                capacity_error = _worker_error(result)
+                if capacity_error:
+                    yield encode_event(fmt, "error", {"status_code": 503, "detail": capacity_error.detail})
+                    return
+                message = f"Image {idx + 1}: Error processing - {str(result)}"
+                warnings.append(message)
+                yield encode_event(fmt, "landmarks", {"index": idx, "error": message})
+            elif result:
+                detections[idx] = result
+                yield encode_event(fmt, "landmarks", {"index": idx, **result.to_dict(request.compact_landmarks)})
+            else:
+                message = f"Image {idx + 1}: No face detected"
+                warnings.append(message)
+                yield encode_event(fmt, "landmarks", {"index": idx, "error": message})
+        
+        landmarks_list = [lm for lm in detections if lm is not None]
+        if len(landmarks_list) == 0:
+            yield encode_event(fmt, "error", {"status_code": 404, "detail": "No faces detected in any image"})
+            return
+        
+        reconstruction_quality, yaw_range, pitch_range = _pose_summary(landmarks_list)
+        angle_warnings = _angle_warnings(yaw_range, pitch_range)
+        yield encode_event(fmt, "summary", {
+            "reconstruction_quality": reconstruction_quality,
+            "pose_angles": [lm.pose_angles if lm is not None else None for lm in detections],
+            "yaw_range": yaw_range,
+            "pitch_range": pitch_range,
+            "warnings": warnings + angle_warnings,
+        })
+        
+        if len(landmarks_list) >= 2:
+            failed = next((img for img in images if isinstance(img, HTTPException)), None)
+            if failed is not None:
+                warnings.append(f"Advanced reconstruction failed, using basic method: {str(failed)}")
+                yield encode_event(fmt, "points", {
+                    "estimated_3d_points": basic_points(landmarks_list[0]).tolist(),
+                })
+            else:
+                try:
+                    reservation.resize(estimate_working_set(images, detections, request.mode, budget))
+                except (RequestTooLarge, MemoryExhausted) as e:
+                    error = _memory_error(e)
+                    yield encode_event(fmt, "error", {"status_code": error.status_code, "detail": error.detail})
+                    return
                 
-                if gpu_points is not None:
-                    estimated_3d_points = gpu_points.tolist()
-                    gpu_accelerated = True
-                else:
-                    # CPU triangulation
-                    estimated_3d_points_3d = sfm.triangulate_points(
-                        landmark_points_2d[:2],
-                        camera_matrices[:2]
-                    )
-                    estimated_3d_points = estimated_3d_points_3d.tolist()
+                # Each stage is a separate worker task so a client that went
+                # away stops the reconstruction at the next stage boundary
+                structure = await worker_pool.run(
+                    estimate_structure, images, detections, request.dense, request.mode, budget
+                )
+                warnings.extend(structure["warnings"])
+                qualities.append(structure["quality"])
+                points = structure["estimated_3d_points"]
+                yield encode_event(fmt, "points", {
+                    "estimated_3d_points": np.asarray(points).tolist() if points is not None else None,
+                })
+                if structure["dense_points"] is not None:
+                    yield encode_event(fmt, "dense_points", {
+                        "dense_points": structure["dense_points"].tolist(),
+                    })
                 
-                # Generate mesh from 3D points
-                if estimated_3d_points is not None and len(estimated_3d_points) > 3:
-                    points_3d_array = np.array(estimated_3d_points)
-                    
-                    # Remove outliers
-                    points_3d_array = MeshOptimizer.remove_outliers(points_3d_array)
-                    
-                    # Create Delaunay triangulation (2D projection for mesh generation)
-                    # Project to 2D plane for triangulation
-                    if len(points_3d_array) >= 4:  # Delaunay requires at least 4 points
-                        points_2d_proj = points_3d_array[:, [0, 1]]  # Use X-Y plane
-                        try:
-                            from scipy.spatial import Delaunay
-                            tri = Delaunay(points_2d_proj)
-                        
-                        # Get mesh faces
-                        faces = tri.simplices.tolist()
+                if structure["camera_matrices"] is not None and points is not None and len(points) > 3:
+                    if await http_request.is_disconnected():
+                        return
+                    mesh = await worker_pool.run(build_mesh, points, structure["point_indices"], budget)
+                    warnings.extend(mesh["warnings"])
+                    qualities.append(mesh["quality"])
+                    if mesh["mesh_vertices"] is not None:
+                        yield encode_event(fmt, "mesh", {
+                            "mesh_vertices": mesh["mesh_vertices"].tolist(),
+                            "mesh_faces": mesh["mesh_faces"].tolist(),
+                        })
                         
-                        # Apply mesh smoothing
-                        smoothed_vertices = MeshOptimizer.laplacian_smoothing(
-                            points_3d_array,
-                            np.array(faces),
-                            iterations=3,
-                            lambda_factor=0.3
+                        if await http_request.is_disconnected():
+                            return
+                        texture = await worker_pool.run(
+                            bake_mesh_texture,
+                            images,
+                            mesh["mesh_vertices"],
+                            mesh["mesh_faces"],
+                            structure["camera_matrices"],
+                            mesh["mesh_uvs"],
+                            budget,
                         )
-                        
-                            mesh_vertices = smoothed_vertices.tolist()
-                            mesh_faces = faces
-                            
-                            # Generate texture
-                            texture = TextureMapper.create_texture_atlas(
-                                images,
-                                smoothed_vertices,
-                                np.array(faces),
-                                camera_matrices
-                            )
-                            
-                            # Encode texture as base64
-                            _, buffer = cv2.imencode('.jpg', texture)
-                            texture_data = base64.b64encode(buffer).decode('utf-8')
-                            
-                        except Exception as e:
-                            warnings.append(f"Mesh generation failed: {str(e)}")
-                    else:
-                        warnings.append(f"Insufficient points for mesh generation: {len(points_3d_array)}")
-            
-        except Exception as e:
-            warnings.append(f"Advanced reconstruction failed, using basic method: {str(e)}")
-            # Fallback to simple approach
-            first_landmarks = landmarks_list[0].landmarks
-            estimated_3d_points = [
-                [lm["x"], lm["y"], lm["z"]] for lm in first_landmarks[:10]
-            ]
+                        warnings.extend(texture["warnings"])
+                        qualities.append(texture["quality"])
+                        if texture["texture_jpeg"] is not None:
+                            yield encode_event(fmt, "texture", {
+                                "mesh_uvs": texture["mesh_uvs"].tolist(),
+                                "texture_data": base64.b64encode(texture["texture_jpeg"]).decode("utf-8"),
+                            })
+        
+        quality = lowest_quality(*input_qualities, *qualities) if qualities else None
+        if quality is not None:
+            warnings.extend(_quality_warnings(budget, quality))
+        yield encode_event(fmt, "done", {
+            "reconstruction_quality": reconstruction_quality,
+            "warnings": warnings + angle_warnings,
+            "quality": quality,
+        })
+    except (WorkerPoolSaturated, FaceMeshPoolExhausted) as e:
+        yield encode_event(fmt, "error", {"status_code": 503, "detail": str(e)})
+    except Exception as e:
+        yield encode_event(fmt, "error", {"status_code": 500, "detail": str(e)})
+    finally:
+        # Drops queued detections when the client disconnects mid-stream
+        for task in tasks:
+            task.cancel()
+        reservation.release()
+
+
+@app.post("/jobs/multi-view-reconstruction", response_model=JobSubmittedResponse, status_code=202)
+async def submit_reconstruction_job(request: MultiViewReconstructionRequest, response: Response):
+    """
+    Queue a multi-view reconstruction and return its job id
+    An identical submission (same image URLs and parameters) returns the
+    id of the job already queued, running or finished instead of a new one.
+    """
+    if len(request.image_urls) < 2:
+        raise HTTPException(status_code=400, detail="At least 2 images required for multi-view reconstruction")
     
-    # Add warnings about angle diversity
-    if yaw_range < 30:
-        warnings.append("Low yaw angle diversity - recommend images from different horizontal angles")
-    if pitch_range < 10:
-        warnings.append("Low pitch angle diversity - recommend images from different vertical angles")
+    job, created = job_queue.submit(request.model_dump(mode="json"))
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return JobSubmittedResponse(job_id=job.id, status=job.status, deduplicated=not created)
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_reconstruction_job(job_id: str):
+    """Status of a reconstruction job, with the result once it succeeded"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
     
-    return MultiViewReconstructionResponse(
-        landmarks_list=landmarks_list,
-        reconstruction_quality=float(reconstruction_quality),
-        estimated_3d_points=estimated_3d_points,
-        mesh_vertices=mesh_vertices,
-        mesh_faces=mesh_faces,
-        texture_data=texture_data,
-        warnings=warnings,
-        gpu_accelerated=gpu_accelerated
+    return JobStatusResponse(
+        job_id=job.id,
+        status=job.status,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+        expires_at=job.expires_at,
+        result=job.result,
+        error=job.error,
     )
 
 
+def _is_ready() -> bool:
+    return (
+        warmup_task is not None and warmup_task.done()
+        and not warmup_task.cancelled() and warmup_task.exception() is None
+    )
+
+
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe
+    503 until every worker has built its FaceMesh pool and, with
+    WARMUP_ON_STARTUP, run FaceMesh and SIFT once; 200 afterwards. /health
+    stays a liveness check.
+    """
+    if _is_ready():
+        return {
+            "status": "ready",
+            "warmup": warmup_task.result() if warmup_task is not None else None,
+        }
+    if warmup_task is not None and warmup_task.done() and not warmup_task.cancelled():
+        raise HTTPException(status_code=503, detail=f"Warm-up failed: {warmup_task.exception()}")
+    raise HTTPException(status_code=503, detail="Warming up", headers={"Retry-After": "1"})
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     gpu_available = GPUAcceleration.is_cuda_available()
     return {
         "status": "healthy",
+        "ready": _is_ready(),
         "gpu_available": gpu_available,
+        "worker_pool": worker_pool.stats() if worker_pool else None,
+        "image_cache": image_fetcher.cache.stats() if image_fetcher and image_fetcher.cache else None,
+        "jobs": job_queue.stats() if job_queue else None,
+        "memory_budget": memory_budget.stats() if memory_budget else None,
+        "artifact_store": artifact_store.stats() if (artifact_store := get_artifact_store()) else None,
         "features": {
             "sfm": True,
             "triangulation": True,
@@ -385,6 +1033,59 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: stage and request latency, request peak RSS, queue depth and pool utilisation"""
+    extra = []
+    if worker_pool:
+        pool = worker_pool.stats()
+        extra += [
+            ("face3d_worker_pool_workers", "gauge", "Worker pool size", [({}, pool["workers"])]),
+            ("face3d_worker_pool_in_flight", "gauge", "Tasks running or queued on the worker pool", [({}, pool["in_flight"])]),
+            ("face3d_worker_pool_queue_depth", "gauge", "Tasks waiting for a free worker", [({}, pool["queued"])]),
+            ("face3d_worker_pool_utilization", "gauge", "Fraction of workers busy",
+             [({}, min(pool["in_flight"], pool["workers"]) / pool["workers"])]),
+            ("face3d_worker_pool_rejected_total", "counter", "Tasks rejected with 503 because the queue was full",
+             [({}, pool["rejected"])]),
+        ]
+        face_mesh = pool.get("face_mesh_pool")
+        if face_mesh:
+            extra += [
+                ("face3d_face_mesh_pool_in_use", "gauge", "FaceMesh instances in use", [({}, face_mesh["in_use"])]),
+                ("face3d_face_mesh_pool_size", "gauge", "FaceMesh instances in the pool", [({}, face_mesh["size"])]),
+                ("face3d_face_mesh_pool_exhausted_total", "counter", "FaceMesh acquisitions that timed out",
+                 [({}, face_mesh["exhausted_count"])]),
+            ]
+    if job_queue:
+        jobs = job_queue.stats()
+        extra += [
+            ("face3d_job_queue_depth", "gauge", "Reconstruction jobs waiting for a consumer", [({}, jobs["pending"])]),
+            ("face3d_jobs", "gauge", "Stored reconstruction jobs by status",
+             [({"status": status}, n) for status, n in sorted(jobs["jobs"].items())]),
+        ]
+    if memory_budget:
+        budget = memory_budget.stats()
+        extra += [
+            ("face3d_memory_reserved_bytes", "gauge", "Estimated bytes reserved by in-flight reconstructions and image decodes",
+             [({}, budget["reserved_bytes"])]),
+            ("face3d_memory_limit_bytes", "gauge", "Service-wide memory limit for reservations (0 = none)",
+             [({}, budget["limit_bytes"])]),
+            ("face3d_memory_rejected_total", "counter", "Reconstructions and image decodes refused by the memory budget",
+             [({"reason": "too_large"}, budget["too_large"]), ({"reason": "exhausted"}, budget["exhausted"])]),
+        ]
+    caches = [("image_cache", image_fetcher.cache if image_fetcher else None), ("artifact_store", get_artifact_store())]
+    for name, cache in caches:
+        if cache is None:
+            continue
+        stats = cache.stats()
+        extra += [
+            (f"face3d_{name}_hits_total", "counter", f"{name} hits", [({}, stats["hits"])]),
+            (f"face3d_{name}_misses_total", "counter", f"{name} misses", [({}, stats["misses"])]),
+            (f"face3d_{name}_bytes", "gauge", f"{name} size in bytes", [({}, stats["bytes"])]),
+        ]
+    return Response(content=render_metrics(extra), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", "8000"))
@@ -0,0 +1,200 @@
+"""
+Derived Artifact Store
+Disk-backed, content-addressed store for per-image results (landmarks, SIFT
+keypoints and descriptors). Entries are keyed by the SHA-256 of the decoded
+image plus the parameters that produced them, hold their arrays as .npy
+files that are memory-mapped on read, and are evicted LRU under a byte budget.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+ARTIFACT_STORE_DIR = os.getenv(
+    "ARTIFACT_STORE_DIR", os.path.join(tempfile.gettempdir(), "face-3d-artifacts")
+)
+# 0 disables the store
+ARTIFACT_STORE_MAX_BYTES = int(os.getenv("ARTIFACT_STORE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+_META_FILE = "meta.json"
+# The budget covers the whole directory, which other worker processes write
+# to as well: the index is re-read from disk (sizes and access times) before
+# every eviction, and once this process has written this fraction of the
+# budget since the last re-read
+_RESCAN_FRACTION = 0.05
+
+_store: Optional["ArtifactStore"] = None
+_store_lock = threading.Lock()
+
+
+def image_digest(image: np.ndarray) -> str:
+    """SHA-256 of the decoded pixels, shape and dtype"""
+    digest = hashlib.sha256()
+    digest.update(f"{image.shape}:{image.dtype.str}".encode("ascii"))
+    digest.update(memoryview(np.ascontiguousarray(image)).cast("B"))
+    return digest.hexdigest()
+
+
+def artifact_key(digest: str, params: Dict[str, Any]) -> str:
+    """Entry key of one image digest and the parameters of the computation"""
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{digest}:{canonical}".encode("utf-8")).hexdigest()
+
+
+class ArtifactStore:
+    """
+    Directory of entries <root>/<kind>/<key[:2]>/<key>/ with one .npy per
+    array plus meta.json. Entries are written to a temporary directory and
+    renamed into place, so readers never see partial entries and several
+    worker processes can share one root. The LRU index is rebuilt from
+    access times at startup and whenever entries are evicted, so max_bytes
+    bounds the directory rather than what one process wrote.
+    """
+
+    def __init__(self, root: str = ARTIFACT_STORE_DIR, max_bytes: int = ARTIFACT_STORE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # path -> bytes, oldest first
+        self._bytes = 0
+        self._written = 0  # bytes put since the index was last read from disk
+        self._evict_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(root, exist_ok=True)
+        self._load_index()
+
+    def _scan(self) -> "OrderedDict[str, int]":
+        """path -> bytes of every entry on disk, least recently used first"""
+        # Entries never change once renamed into place, so known sizes are reused
+        with self._lock:
+            known = dict(self._entries)
+        found = []
+        for kind in os.listdir(self.root):
+            kind_dir = os.path.join(self.root, kind)
+            if not os.path.isdir(kind_dir) or kind.startswith("."):
+                continue
+            for shard in os.listdir(kind_dir):
+                shard_dir = os.path.join(kind_dir, shard)
+                for key in os.listdir(shard_dir):
+                    path = os.path.join(shard_dir, key)
+                    try:
+                        atime = os.stat(os.path.join(path, _META_FILE)).st_atime
+                        found.append((atime, path, known.get(path) or self._size(path)))
+                    except OSError:
+                        # Incomplete, or evicted by another process meanwhile
+                        continue
+        return OrderedDict((path, size) for _, path, size in sorted(found))
+
+    def _load_index(self) -> None:
+        entries = self._scan()
+        with self._lock:
+            self._entries = entries
+            self._bytes = sum(entries.values())
+            self._written = 0
+
+    def _evict(self) -> None:
+        """Re-read the index from disk and remove the least recently used entries over budget"""
+        if not self._evict_lock.acquire(blocking=False):
+            return  # Another thread of this process is already at it
+        try:
+            self._load_index()
+            victims = []
+            with self._lock:
+                while self._bytes > self.max_bytes and len(self._entries) > 1:
+                    victim, victim_size = self._entries.popitem(last=False)
+                    self._bytes -= victim_size
+                    self.evictions += 1
+                    victims.append(victim)
+            for victim in victims:
+                shutil.rmtree(victim, ignore_errors=True)
+        finally:
+            self._evict_lock.release()
+
+    @staticmethod
+    def _size(path: str) -> int:
+        return sum(entry.stat().st_size for entry in os.scandir(path))
+
+    def _path(self, kind: str, key: str) -> str:
+        return os.path.join(self.root, kind, key[:2], key)
+
+    def get(self, kind: str, key: str) -> Optional[Tuple[Dict[str, np.ndarray], Dict[str, Any]]]:
+        """Arrays (read-only memory maps) and metadata of an entry, or None"""
+        path = self._path(kind, key)
+        try:
+            with open(os.path.join(path, _META_FILE)) as f:
+                meta = json.load(f)
+            arrays = {
+                name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                for name in meta.pop("_arrays")
+            }
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        os.utime(os.path.join(path, _META_FILE))
+        with self._lock:
+            self.hits += 1
+            if path in self._entries:
+                self._entries.move_to_end(path)
+        return arrays, meta
+
+    def put(self, kind: str, key: str, arrays: Dict[str, np.ndarray],
+            meta: Optional[Dict[str, Any]] = None) -> None:
+        """Store an entry atomically and evict the least recently used ones over budget (see _evict)"""
+        path = self._path(kind, key)
+        if os.path.isdir(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self.root)
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(array))
+            with open(os.path.join(staging, _META_FILE), "w") as f:
+                json.dump({**(meta or {}), "_arrays": list(arrays)}, f)
+            size = self._size(staging)
+            os.rename(staging, path)
+        except OSError:
+            # Lost a race with another writer of the same entry, or the disk is full
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+
+        with self._lock:
+            self._entries[path] = size
+            self._bytes += size
+            self._written += size
+            rescan = self._bytes > self.max_bytes or self._written >= self.max_bytes * _RESCAN_FRACTION
+        if rescan:
+            self._evict()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def get_artifact_store() -> Optional[ArtifactStore]:
+    """Process-wide store, created on first use; None when disabled"""
+    global _store
+    if ARTIFACT_STORE_MAX_BYTES <= 0 or not ARTIFACT_STORE_DIR:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore()
+        return _store
@@ -0,0 +1,428 @@
+"""
+Offline Benchmark Suite
+Times every reconstruction stage on the checked-in sample views and on
+synthetic point clouds / meshes of several sizes, then the HTTP endpoints
+through the ASGI test client against a local image server. Results
+(throughput, latency percentiles, peak RSS) are written to JSON and
+compared against a stored baseline.
+
+    python benchmarks/run.py                         # run all, compare to baseline.json
+    python benchmarks/run.py -k texture --repeat 20  # only matching benchmarks
+    python benchmarks/run.py --update-baseline       # store this run as the baseline
+
+Exits with status 1 when a benchmark's median latency regressed by more
+than --threshold against the baseline.
+"""
+
+import argparse
+import functools
+import http.server
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCH_DIR, "data")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+SERVICE_DIR = os.path.dirname(BENCH_DIR)
+
+# Measure cold work: no derived-artifact or image reuse across iterations,
+# and a throwaway job database
+os.environ.setdefault("ARTIFACT_STORE_MAX_BYTES", "0")
+os.environ.setdefault("IMAGE_CACHE_MAX_BYTES", "0")
+os.environ.setdefault("JOB_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="face3d-bench-"), "jobs.sqlite3"))
+sys.path.insert(0, SERVICE_DIR)
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+
+import workers  # noqa: E402
+from encoders import ENCODERS, to_json_payload  # noqa: E402
+from face_mesh_pool import FaceMeshPool  # noqa: E402
+from face_topology import CANONICAL_VERTEX_COUNT  # noqa: E402
+from ingest import decode_image  # noqa: E402
+from metrics import current_rss  # noqa: E402
+from pipeline import (  # noqa: E402
+    DENSE_MIN_NEIGHBORS, DENSE_NEIGHBORS, DENSE_RADIUS_SCALE, DENSE_STD_RATIO, build_mesh, detect_face_landmarks,
+    select_keyframes
+)
+from reconstruction_3d import MeshOptimizer, StructureFromMotion, TextureMapper  # noqa: E402
+
+# Views of the sample face, named after their yaw/pitch in degrees
+SAMPLE_VIEWS = ["front", "left_15", "right_15", "left_30", "right_30"]
+# Synthetic point cloud / mesh sizes (468 is the FaceMesh landmark count)
+CLOUD_SIZES = [468, 5000, 50000]
+TEXTURE_SIZES = [512, 1024, 2048]
+
+
+class RssSampler:
+    """Peak resident set size while a benchmark runs, sampled from /proc"""
+
+    def __init__(self, interval: float = 0.002):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    rss = staticmethod(current_rss)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        self.peak = self.rss()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.rss())
+
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 1,
+            items: int = 1, concurrency: int = 1) -> Dict[str, Any]:
+    """
+    Latency percentiles, throughput and peak RSS of repeated calls to fn
+    With concurrency > 1 the calls run from that many threads and
+    throughput is taken over the wall time of the whole run.
+    """
+    for _ in range(warmup):
+        fn()
+
+    def timed_call(_: int) -> float:
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
+
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                latencies = list(executor.map(timed_call, range(repeat)))
+        else:
+            latencies = [timed_call(i) for i in range(repeat)]
+        wall = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    return {
+        "iterations": repeat,
+        "items_per_iteration": items,
+        "concurrency": concurrency,
+        "mean_ms": float(ms.mean()),
+        "min_ms": float(ms.min()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+        "throughput_per_s": repeat * items / wall,
+        "peak_rss_bytes": rss.peak,
+    }
+
+
+def load_views() -> Tuple[List[bytes], List[np.ndarray]]:
+    encoded = []
+    for name in SAMPLE_VIEWS:
+        with open(os.path.join(DATA_DIR, f"{name}.jpg"), "rb") as f:
+            encoded.append(f.read())
+    return encoded, [decode_image(data) for data in encoded]
+
+
+def sample_video(images: List[np.ndarray], frames_per_view: int = 12) -> str:
+    """Head-turn video of the sample views (each held for a few frames) in a temp file"""
+    path = os.path.join(tempfile.mkdtemp(prefix="face3d-bench-"), "headturn.mp4")
+    h, w = images[0].shape[:2]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 30, (w, h))
+    for name in ["left_30", "left_15", "front", "right_15", "right_30"]:
+        frame = cv2.cvtColor(images[SAMPLE_VIEWS.index(name)], cv2.COLOR_RGB2BGR)
+        for _ in range(frames_per_view):
+            writer.write(frame)
+    writer.release()
+    return path
+
+
+def synthetic_cloud(n: int, seed: int = 0) -> np.ndarray:
+    """n points on a noisy half ellipsoid roughly the size of a face (pixels)"""
+    rng = np.random.default_rng(seed)
+    theta = rng.uniform(-np.pi / 2, np.pi / 2, n)
+    phi = rng.uniform(-np.pi / 2.5, np.pi / 2.5, n)
+    points = np.stack([
+        90 * np.sin(theta) * np.cos(phi),
+        120 * np.sin(phi),
+        -70 * np.cos(theta) * np.cos(phi),
+    ], axis=1)
+    return points + rng.normal(0, 0.5, points.shape)
+
+
+def synthetic_mesh(n: int) -> Tuple[np.ndarray, np.ndarray]:
+    from scipy.spatial import Delaunay
+    vertices = synthetic_cloud(n)
+    return vertices, Delaunay(vertices[:, :2]).simplices
+
+
+def filter_cloud(cloud: np.ndarray) -> np.ndarray:
+    """Dense-mode outlier filtering as run by pipeline.dense_point_cloud"""
+    cloud = cloud[MeshOptimizer.statistical_outlier_mask(cloud, DENSE_NEIGHBORS, DENSE_STD_RATIO)]
+    return cloud[MeshOptimizer.radius_outlier_mask(cloud, min_neighbors=DENSE_MIN_NEIGHBORS,
+                                                    radius_scale=DENSE_RADIUS_SCALE)]
+
+
+def synthetic_cameras(n_views: int = 3, size: int = 640, distance: float = 600.0) -> List[np.ndarray]:
+    """Cameras orbiting the synthetic cloud at evenly spaced yaw angles"""
+    K = np.array([[800.0, 0, size / 2], [0, 800.0, size / 2], [0, 0, 1]])
+    cameras = []
+    for yaw in np.linspace(-25, 25, n_views):
+        R = cv2.Rodrigues(np.array([0.0, np.radians(yaw), 0.0]))[0]
+        # The cloud faces -z; look at it from that side
+        R = R @ np.diag([1.0, -1.0, -1.0])
+        t = np.array([[0.0], [0.0], [distance]])
+        cameras.append(K @ np.hstack([R, t]))
+    return cameras
+
+
+def stage_benchmarks(repeat: int) -> Dict[str, Callable[[], Dict[str, Any]]]:
+    """Benchmarks of the pipeline stages, keyed by name; each runs lazily"""
+    encoded, images = load_views()
+    sfm = StructureFromMotion(match_workers=workers.SFM_MATCH_WORKERS)
+    landmarks = [detect_face_landmarks(image) for image in images]
+    boxes = [lm.bounding_box for lm in landmarks]
+    poses = [lm.pose_angles for lm in landmarks]
+    matches = sfm.detect_and_match_features(images, face_boxes=boxes, max_side=1024, pose_angles=poses)
+    cameras = sfm.estimate_camera_poses(images, matches)
+    # Landmark triangulation over the views that could be posed
+    posed, cameras = zip(*[(lm, P) for lm, P in zip(landmarks, cameras) if P is not None])
+    key_points = [lm.key_points_2d() for lm in posed]
+
+    benches: Dict[str, Callable[[], Dict[str, Any]]] = {
+        "stage.decode": lambda: measure(lambda: [decode_image(data) for data in encoded], repeat, items=len(encoded)),
+        "stage.face_mesh": lambda: measure(lambda: [detect_face_landmarks(image) for image in images], repeat, items=len(images)),
+        "stage.sift_flann": lambda: measure(
+            lambda: sfm.detect_and_match_features(images, face_boxes=boxes, max_side=1024, pose_angles=poses), repeat
+        ),
+        "stage.pose": lambda: measure(lambda: sfm.estimate_camera_poses(images, matches), repeat),
+        "stage.pnp": lambda: measure(
+            lambda: sfm.estimate_landmark_poses(images, [lm.points[:CANONICAL_VERTEX_COUNT] for lm in landmarks]), repeat
+        ),
+        "stage.triangulation.landmarks": lambda: measure(
+            lambda: sfm.triangulate_points(key_points, cameras, max_reprojection_error=8.0), repeat
+        ),
+    }
+
+    video = sample_video(images)
+    benches["stage.video_keyframes"] = lambda: measure(lambda: select_keyframes([video], False), repeat, items=60)
+
+    # All 468 landmarks meshed with the shared FaceMesh topology
+    canonical = np.arange(CANONICAL_VERTEX_COUNT)
+    landmark_cloud, errors = sfm.triangulate_dlt([lm.key_points_2d(canonical) for lm in posed], cameras)
+    kept = errors <= 8.0
+    benches["stage.build_mesh.canonical"] = functools.partial(
+        measure, functools.partial(build_mesh, landmark_cloud[kept], canonical[kept]), repeat,
+        items=CANONICAL_VERTEX_COUNT)
+
+    synthetic_cams = synthetic_cameras(len(images))
+    for n in CLOUD_SIZES:
+        cloud = synthetic_cloud(n)
+        projected = [cv2.convertPointsFromHomogeneous((np.c_[cloud, np.ones(n)] @ P.T)).reshape(-1, 2)
+                     for P in synthetic_cams]
+        vertices, faces = synthetic_mesh(n)
+        benches[f"stage.triangulation.{n}"] = functools.partial(
+            measure, functools.partial(sfm.triangulate_points, projected, synthetic_cams, 8.0), repeat, items=n)
+        benches[f"stage.build_mesh.{n}"] = functools.partial(
+            measure, functools.partial(build_mesh, cloud), repeat, items=n)
+        benches[f"stage.dense_filter.{n}"] = functools.partial(
+            measure, functools.partial(filter_cloud, cloud), repeat, items=n)
+        benches[f"stage.smoothing.uniform.{n}"] = functools.partial(
+            measure, functools.partial(MeshOptimizer.laplacian_smoothing, vertices, faces, 3, 0.3), repeat, items=n)
+        benches[f"stage.smoothing.cotangent.{n}"] = functools.partial(
+            measure, functools.partial(MeshOptimizer.laplacian_smoothing, vertices, faces, 3, 0.3, "cotangent"),
+            repeat, items=n)
+
+    vertices, faces = synthetic_mesh(5000)
+    bake_cams = synthetic_cameras(3)
+    for size in TEXTURE_SIZES:
+        benches[f"stage.texture_bake.{size}"] = functools.partial(
+            measure, functools.partial(TextureMapper.bake_texture, images[:3], vertices, faces, bake_cams, size), repeat)
+
+    uvs = TextureMapper.generate_uv_coordinates(vertices - vertices.mean(axis=0), method="planar")
+    texture, _ = TextureMapper.bake_texture(images[:3], vertices, faces, bake_cams, 1024)
+    result = {
+        "estimated_3d_points": vertices[:8],
+        "mesh_vertices": vertices,
+        "mesh_faces": faces,
+        "mesh_uvs": uvs,
+        "texture_jpeg": cv2.imencode(".jpg", texture)[1].tobytes(),
+        "warnings": [],
+        "landmarks": landmarks,
+        "reconstruction_quality": 1.0,
+    }
+    benches["stage.texture_encode.1024"] = lambda: measure(lambda: cv2.imencode(".jpg", texture), repeat)
+    benches["stage.serialize.json"] = lambda: measure(lambda: json.dumps(to_json_payload(result)), repeat)
+    for fmt in sorted(ENCODERS):
+        benches[f"stage.serialize.{fmt}"] = functools.partial(measure, functools.partial(ENCODERS[fmt], result), repeat)
+    return benches
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def serve_images() -> Tuple[http.server.ThreadingHTTPServer, str]:
+    """Serve DATA_DIR on an ephemeral local port"""
+    handler = functools.partial(_QuietHandler, directory=DATA_DIR)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def endpoint_benchmarks(client: Any, base_url: str, repeat: int,
+                        concurrency: int) -> Dict[str, Callable[[], Dict[str, Any]]]:
+    urls = [f"{base_url}/{name}.jpg" for name in SAMPLE_VIEWS]
+    with open(os.path.join(DATA_DIR, "front.jpg"), "rb") as f:
+        front = f.read()
+
+    def call(method: str, path: str, **kwargs: Any) -> Callable[[], None]:
+        def run() -> None:
+            response = client.request(method, path, **kwargs)
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} returned {response.status_code}: {response.text[:200]}")
+        return run
+
+    cases = {
+        "endpoint.detect_landmarks": (call("POST", "/detect-landmarks", json={"image_url": urls[0]}), 1),
+        "endpoint.detect_landmarks_upload": (
+            call("POST", "/detect-landmarks/upload", content=front, headers={"content-type": "image/jpeg"}), 1),
+        "endpoint.detect_landmarks_batch": (
+            call("POST", "/detect-landmarks/batch", json={"image_urls": urls}), len(urls)),
+        "endpoint.multi_view_reconstruction.json": (
+            call("POST", "/multi-view-reconstruction", json={"image_urls": urls}), 1),
+        "endpoint.multi_view_reconstruction.fast": (
+            call("POST", "/multi-view-reconstruction", json={"image_urls": urls, "mode": "fast"}), 1),
+        "endpoint.multi_view_reconstruction.draft": (
+            call("POST", "/multi-view-reconstruction", json={"image_urls": urls, "quality": "draft"}), 1),
+        "endpoint.multi_view_reconstruction.glb": (
+            call("POST", "/multi-view-reconstruction?format=glb", json={"image_urls": urls}), 1),
+    }
+    return {
+        name: functools.partial(measure, fn, repeat, items=items, concurrency=concurrency)
+        for name, (fn, items) in cases.items()
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float,
+            min_delta_ms: float) -> List[str]:
+    """
+    Print p50 changes against the baseline and return the regressed benchmarks
+    A benchmark regresses when its p50 is both more than `threshold` slower
+    relatively and more than min_delta_ms slower absolutely, so timer noise
+    on sub-millisecond stages is not flagged.
+    """
+    regressed = []
+    print(f"\n{'benchmark':<45} {'base p50':>10} {'p50':>10} {'change':>8}")
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<45} {'-':>10} {current['p50_ms']:>10.2f} {'new':>8}")
+            continue
+        change = current["p50_ms"] / base["p50_ms"] - 1 if base["p50_ms"] else 0.0
+        flag = ""
+        if change > threshold and current["p50_ms"] - base["p50_ms"] > min_delta_ms:
+            flag = "  REGRESSED"
+            regressed.append(name)
+        print(f"{name:<45} {base['p50_ms']:>10.2f} {current['p50_ms']:>10.2f} {change:>+8.1%}{flag}")
+    return regressed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", "--filter", default="", help="regex selecting benchmark names")
+    parser.add_argument("--repeat", type=int, default=10, help="timed iterations per stage benchmark")
+    parser.add_argument("--endpoint-repeat", type=int, default=5, help="timed iterations per endpoint benchmark")
+    parser.add_argument("--concurrency", type=int, default=1, help="concurrent requests in endpoint benchmarks")
+    parser.add_argument("--output", default="benchmark-results.json", help="where to write this run's results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="allowed relative p50 slowdown before a benchmark counts as regressed")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="absolute p50 slowdown (ms) below which changes are treated as noise")
+    parser.add_argument("--update-baseline", action="store_true", help="write this run to --baseline")
+    parser.add_argument("--skip-endpoints", action="store_true", help="only run the stage benchmarks")
+    args = parser.parse_args(argv)
+
+    selected = re.compile(args.filter)
+    results: Dict[str, Any] = {}
+
+    def run(benches: Dict[str, Callable[[], Dict[str, Any]]]) -> None:
+        for name, bench in benches.items():
+            if not selected.search(name):
+                continue
+            results[name] = bench()
+            r = results[name]
+            print(f"{name:<45} p50 {r['p50_ms']:9.2f} ms  p99 {r['p99_ms']:9.2f} ms  "
+                  f"{r['throughput_per_s']:9.1f}/s  rss {r['peak_rss_bytes'] / 2**20:7.1f} MiB")
+
+    workers._face_mesh_pool = FaceMeshPool(size=1)
+    workers._tracking_pool = FaceMeshPool(size=1, static_image_mode=False)
+    try:
+        run(stage_benchmarks(args.repeat))
+    finally:
+        for pool in (workers._face_mesh_pool, workers._tracking_pool):
+            pool.close()
+        workers._face_mesh_pool = workers._tracking_pool = None
+
+    if not args.skip_endpoints:
+        from fastapi.testclient import TestClient
+        import app as service
+
+        server, base_url = serve_images()
+        try:
+            with TestClient(service.app) as client:
+                run(endpoint_benchmarks(client, base_url, args.endpoint_repeat, args.concurrency))
+        finally:
+            server.shutdown()
+
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "worker_count": workers.WORKER_COUNT,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressed = compare(results, baseline, args.threshold, args.min_delta_ms)
+    if regressed:
+        print(f"\n{len(regressed)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,369 @@
+"""
+Response Encoders
+Wire formats for reconstruction results: JSON (default), msgpack with packed
+little-endian buffers, binary glTF (GLB) and binary PLY, plus the NDJSON /
+Server-Sent Events framing used by the streaming endpoint
+"""
+
+import base64
+import json
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "msgpack": "application/msgpack",
+    "glb": "model/gltf-binary",
+    "ply": "application/ply",
+}
+
+_ACCEPT_ALIASES = {
+    "application/json": "json",
+    "application/msgpack": "msgpack",
+    "application/x-msgpack": "msgpack",
+    "model/gltf-binary": "glb",
+    "application/ply": "ply",
+    "application/x-ply": "ply",
+    "*/*": "json",
+    "application/*": "json",
+}
+
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+# glTF 2.0 constants
+_GLB_MAGIC = 0x46546C67  # "glTF"
+_GLB_CHUNK_JSON = 0x4E4F534A
+_GLB_CHUNK_BIN = 0x004E4942
+_GL_FLOAT = 5126
+_GL_UNSIGNED_INT = 5125
+_GL_ARRAY_BUFFER = 34962
+_GL_ELEMENT_ARRAY_BUFFER = 34963
+_GL_POINTS = 0
+_GL_TRIANGLES = 4
+
+
+class UnsupportedFormat(Exception):
+    """Raised when a requested response format is unknown or unavailable"""
+
+
+def negotiate_format(accept: Optional[str], requested: Optional[str] = None) -> str:
+    """
+    Pick the response format from an explicit ?format= value or the Accept header
+    Unknown Accept values fall back to JSON; an unknown explicit format is an error
+    """
+    if requested:
+        fmt = requested.lower()
+        if fmt not in MEDIA_TYPES:
+            raise UnsupportedFormat(
+                f"Unknown format '{requested}', expected one of: {', '.join(MEDIA_TYPES)}"
+            )
+    else:
+        fmt = "json"
+        candidates: List[Tuple[float, int, str]] = []
+        for position, part in enumerate((accept or "").split(",")):
+            media_type, _, params = part.strip().partition(";")
+            quality = 1.0
+            for param in params.split(";"):
+                key, _, value = param.strip().partition("=")
+                if key == "q":
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            alias = _ACCEPT_ALIASES.get(media_type.strip().lower())
+            if alias and quality > 0:
+                candidates.append((-quality, position, alias))
+        if candidates:
+            fmt = min(candidates)[2]
+
+    if fmt == "msgpack" and msgpack is None:
+        raise UnsupportedFormat("msgpack output requires the 'msgpack' package")
+    return fmt
+
+
+def negotiate_stream_format(accept: Optional[str], requested: Optional[str] = None) -> str:
+    """NDJSON unless ?format=sse is given or the Accept header asks for text/event-stream"""
+    if requested:
+        fmt = requested.lower()
+        if fmt not in STREAM_MEDIA_TYPES:
+            raise UnsupportedFormat(
+                f"Unknown stream format '{requested}', expected one of: {', '.join(STREAM_MEDIA_TYPES)}"
+            )
+        return fmt
+    if "text/event-stream" in (accept or "").lower():
+        return "sse"
+    return "ndjson"
+
+
+def encode_event(fmt: str, event: str, data: Dict[str, Any]) -> bytes:
+    """
+    Frame one stream event
+    NDJSON lines carry the event name in an "event" field; SSE uses the
+    event: line with the JSON document as data
+    """
+    if fmt == "sse":
+        return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode("utf-8")
+    return (json.dumps({"event": event, **data}, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _as_array(values: Any, dtype: str) -> Optional[np.ndarray]:
+    if values is None:
+        return None
+    return np.ascontiguousarray(values, dtype=dtype)
+
+
+def to_json_payload(result: Dict[str, Any], compact_landmarks: bool = False) -> Dict[str, Any]:
+    """Convert array-valued result fields to plain lists and base64 for JSON"""
+    texture_jpeg = result.get("texture_jpeg")
+    return {
+        "landmarks_list": [lm.to_dict(compact_landmarks) for lm in result["landmarks"]],
+        "reconstruction_quality": result["reconstruction_quality"],
+        "estimated_3d_points": _tolist(result.get("estimated_3d_points")),
+        "dense_points": _tolist(result.get("dense_points")),
+        "mesh_vertices": _tolist(result.get("mesh_vertices")),
+        "mesh_faces": _tolist(result.get("mesh_faces")),
+        "mesh_uvs": _tolist(result.get("mesh_uvs")),
+        "texture_data": base64.b64encode(texture_jpeg).decode('utf-8') if texture_jpeg else None,
+        "warnings": result["warnings"],
+        "quality": result.get("quality"),
+        "keyframes": result.get("keyframes"),
+    }
+
+
+def _tolist(values: Any) -> Optional[list]:
+    if values is None:
+        return None
+    return np.asarray(values).tolist()
+
+
+def _packed(values: Any, dtype: str) -> Optional[Dict[str, Any]]:
+    array = _as_array(values, dtype)
+    if array is None:
+        return None
+    return {"dtype": dtype, "shape": list(array.shape), "data": array.tobytes()}
+
+
+def encode_msgpack(result: Dict[str, Any]) -> bytes:
+    """
+    msgpack document mirroring the JSON response, with every numeric array
+    sent as {"dtype", "shape", "data"} where data is the raw little-endian buffer
+    """
+    if msgpack is None:
+        raise UnsupportedFormat("msgpack output requires the 'msgpack' package")
+
+    payload = {
+        "landmarks_list": [
+            {
+                "landmarks": _packed(lm.points, "<f4"),
+                "confidence": lm.confidence,
+                "bounding_box": lm.bounding_box,
+                "pose_angles": lm.pose_angles,
+                "image_size": lm.image_size,
+            }
+            for lm in result["landmarks"]
+        ],
+        "reconstruction_quality": result["reconstruction_quality"],
+        "estimated_3d_points": _packed(result.get("estimated_3d_points"), "<f4"),
+        "dense_points": _packed(result.get("dense_points"), "<f4"),
+        "mesh_vertices": _packed(result.get("mesh_vertices"), "<f4"),
+        "mesh_faces": _packed(result.get("mesh_faces"), "<u4"),
+        "mesh_uvs": _packed(result.get("mesh_uvs"), "<f4"),
+        "texture_data": result.get("texture_jpeg"),
+        "warnings": result["warnings"],
+        "quality": result.get("quality"),
+        "keyframes": result.get("keyframes"),
+    }
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+def _geometry(result: Dict[str, Any]) -> Tuple[np.ndarray, Optional[np.ndarray], Optional[np.ndarray]]:
+    """Mesh (with UVs when baked) if one was built, otherwise the triangulated point cloud"""
+    vertices = _as_array(result.get("mesh_vertices"), "<f4")
+    faces = _as_array(result.get("mesh_faces"), "<u4")
+    uvs = _as_array(result.get("mesh_uvs"), "<f4")
+    if vertices is None or faces is None or len(faces) == 0:
+        vertices = _as_array(result.get("estimated_3d_points"), "<f4")
+        faces = None
+        uvs = None
+    if vertices is None or len(vertices) == 0:
+        raise UnsupportedFormat("No geometry was reconstructed for a binary mesh response")
+    if uvs is not None and len(uvs) != len(vertices):
+        uvs = None
+    return vertices.reshape(-1, 3), faces, uvs
+
+
+def _metadata(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "reconstruction_quality": result["reconstruction_quality"],
+        "warnings": result["warnings"],
+        "quality": result.get("quality"),
+    }
+
+
+def _pad4(data: bytes, fill: bytes) -> bytes:
+    return data + fill * (-len(data) % 4)
+
+
+def encode_glb(result: Dict[str, Any]) -> bytes:
+    """
+    Binary glTF 2.0 with one mesh primitive (triangles, or points when no
+    faces were built). A baked texture is embedded as a JPEG image with
+    TEXCOORD_0. A dense point cloud becomes a second node with a points
+    primitive. Reconstruction metadata goes into the root extras.
+    """
+    vertices, faces, uvs = _geometry(result)
+    texture_jpeg = result.get("texture_jpeg") if uvs is not None else None
+
+    buffer_views: List[Dict[str, Any]] = []
+    accessors: List[Dict[str, Any]] = []
+    chunks: List[bytes] = []
+    offset = 0
+
+    def add_view(data: bytes, target: Optional[int] = None) -> int:
+        nonlocal offset
+        view = {"buffer": 0, "byteOffset": offset, "byteLength": len(data)}
+        if target is not None:
+            view["target"] = target
+        buffer_views.append(view)
+        padded = _pad4(data, b"\x00")
+        chunks.append(padded)
+        offset += len(padded)
+        return len(buffer_views) - 1
+
+    accessors.append({
+        "bufferView": add_view(vertices.tobytes(), _GL_ARRAY_BUFFER),
+        "componentType": _GL_FLOAT,
+        "count": len(vertices),
+        "type": "VEC3",
+        "min": vertices.min(axis=0).tolist(),
+        "max": vertices.max(axis=0).tolist(),
+    })
+    primitive: Dict[str, Any] = {"attributes": {"POSITION": 0}, "mode": _GL_POINTS}
+
+    if faces is not None:
+        accessors.append({
+            "bufferView": add_view(faces.tobytes(), _GL_ELEMENT_ARRAY_BUFFER),
+            "componentType": _GL_UNSIGNED_INT,
+            "count": int(faces.size),
+            "type": "SCALAR",
+        })
+        primitive["indices"] = len(accessors) - 1
+        primitive["mode"] = _GL_TRIANGLES
+
+    gltf: Dict[str, Any] = {
+        "asset": {"version": "2.0", "generator": "face-3d-service"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0}],
+        "meshes": [{"primitives": [primitive]}],
+        "accessors": accessors,
+        "bufferViews": buffer_views,
+    }
+
+    if texture_jpeg:
+        accessors.append({
+            "bufferView": add_view(uvs.reshape(-1, 2).tobytes(), _GL_ARRAY_BUFFER),
+            "componentType": _GL_FLOAT,
+            "count": len(vertices),
+            "type": "VEC2",
+        })
+        primitive["attributes"]["TEXCOORD_0"] = len(accessors) - 1
+        primitive["material"] = 0
+        gltf["images"] = [{"bufferView": add_view(texture_jpeg), "mimeType": "image/jpeg"}]
+        gltf["samplers"] = [{}]
+        gltf["textures"] = [{"sampler": 0, "source": 0}]
+        gltf["materials"] = [{
+            "pbrMetallicRoughness": {
+                "baseColorTexture": {"index": 0},
+                "metallicFactor": 0.0,
+            },
+            "doubleSided": True,
+        }]
+
+    dense_points = _as_array(result.get("dense_points"), "<f4")
+    if dense_points is not None and len(dense_points):
+        dense_points = dense_points.reshape(-1, 3)
+        accessors.append({
+            "bufferView": add_view(dense_points.tobytes(), _GL_ARRAY_BUFFER),
+            "componentType": _GL_FLOAT,
+            "count": len(dense_points),
+            "type": "VEC3",
+            "min": dense_points.min(axis=0).tolist(),
+            "max": dense_points.max(axis=0).tolist(),
+        })
+        gltf["meshes"].append({"primitives": [{"attributes": {"POSITION": len(accessors) - 1}, "mode": _GL_POINTS}]})
+        gltf["nodes"].append({"mesh": 1, "name": "dense_points"})
+        gltf["scenes"][0]["nodes"].append(1)
+
+    binary = b"".join(chunks)
+    gltf["buffers"] = [{"byteLength": len(binary)}]
+    gltf["extras"] = _metadata(result)
+    json_chunk = _pad4(json.dumps(gltf, separators=(",", ":")).encode("utf-8"), b" ")
+
+    total_length = 12 + 8 + len(json_chunk) + 8 + len(binary)
+    return b"".join([
+        struct.pack("<III", _GLB_MAGIC, 2, total_length),
+        struct.pack("<II", len(json_chunk), _GLB_CHUNK_JSON),
+        json_chunk,
+        struct.pack("<II", len(binary), _GLB_CHUNK_BIN),
+        binary,
+    ])
+
+
+def encode_ply(result: Dict[str, Any]) -> bytes:
+    """
+    Binary little-endian PLY of the mesh (or point cloud when no faces were
+    built), with per-vertex s/t texture coordinates when a texture was baked
+    """
+    vertices, faces, uvs = _geometry(result)
+
+    header = [
+        "ply",
+        "format binary_little_endian 1.0",
+        f"comment reconstruction_quality {result['reconstruction_quality']:.6f}",
+        f"element vertex {len(vertices)}",
+        "property float x",
+        "property float y",
+        "property float z",
+    ]
+    vertex_fields = [("position", "<f4", (3,))]
+    if uvs is not None:
+        header += ["property float s", "property float t"]
+        vertex_fields.append(("uv", "<f4", (2,)))
+    if faces is not None:
+        header += [
+            f"element face {len(faces)}",
+            "property list uchar uint vertex_indices",
+        ]
+    header.append("end_header")
+
+    vertex_records = np.empty(len(vertices), dtype=vertex_fields)
+    vertex_records["position"] = vertices
+    if uvs is not None:
+        vertex_records["uv"] = uvs.reshape(-1, 2)
+    body = [("\n".join(header) + "\n").encode("ascii"), vertex_records.tobytes()]
+
+    if faces is not None:
+        face_records = np.empty(len(faces), dtype=[("count", "u1"), ("indices", "<u4", (3,))])
+        face_records["count"] = 3
+        face_records["indices"] = faces
+        body.append(face_records.tobytes())
+
+    return b"".join(body)
+
+
+ENCODERS = {
+    "msgpack": encode_msgpack,
+    "glb": encode_glb,
+    "ply": encode_ply,
+}
@@ -0,0 +1,122 @@
+"""
+MediaPipe FaceMesh Pool
+Process-wide pool of pre-initialised FaceMesh instances shared across requests
+"""
+
+import os
+import queue
+import threading
+from contextlib import ExitStack, contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+
+# 0 sizes the pool to the worker count
+FACE_MESH_POOL_SIZE = int(os.getenv("FACE_MESH_POOL_SIZE", "0"))
+FACE_MESH_POOL_TIMEOUT = float(os.getenv("FACE_MESH_POOL_TIMEOUT", "10"))
+
+
+class FaceMeshPoolExhausted(Exception):
+    """Raised when no FaceMesh instance becomes free within the acquire timeout"""
+
+
+class FaceMeshPool:
+    """
+    Fixed-size pool of warmed FaceMesh graphs.
+    Each instance is handed to exactly one thread at a time, so the
+    TFLite graph is loaded once at startup instead of once per image.
+    """
+
+    def __init__(self, size: int = 1, timeout: float = FACE_MESH_POOL_TIMEOUT,
+                 **face_mesh_options: Any):
+        if size < 1:
+            raise ValueError("FaceMesh pool size must be at least 1")
+
+        self.size = size
+        self.timeout = timeout
+        self.options = {
+            "static_image_mode": True,
+            "max_num_faces": 1,
+            "refine_landmarks": True,
+            "min_detection_confidence": 0.5,
+            **face_mesh_options,
+        }
+
+        self._instances: "queue.LifoQueue[Any]" = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._exhausted_count = 0
+        self._closed = False
+        self._warm_lock = threading.Lock()
+        self._warmed = False
+
+        # mediapipe pulls in matplotlib and its own solution graphs, about a
+        # second of imports, so it is loaded with the first pool rather than
+        # with the service modules
+        from mediapipe.python.solutions import face_mesh as mp_face_mesh
+        for _ in range(size):
+            self._instances.put(mp_face_mesh.FaceMesh(**self.options))
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Borrow a FaceMesh instance for the duration of the with-block
+        Raises FaceMeshPoolExhausted if none is released within the timeout
+        """
+        if self._closed:
+            raise RuntimeError("FaceMesh pool is closed")
+
+        wait = self.timeout if timeout is None else timeout
+        try:
+            face_mesh = self._instances.get(timeout=wait)
+        except queue.Empty:
+            with self._lock:
+                self._exhausted_count += 1
+            raise FaceMeshPoolExhausted(
+                f"No FaceMesh instance available after {wait:.1f}s (pool size {self.size})"
+            )
+
+        with self._lock:
+            self._in_use += 1
+        try:
+            yield face_mesh
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._instances.put(face_mesh)
+
+    def warm_up(self, image: np.ndarray) -> None:
+        """
+        Run one frame through every instance
+        Graphs start (and load their TFLite models) on their first frame, so
+        this moves that cost from the first requests to startup. Only the
+        first call does any work.
+        """
+        with self._warm_lock:
+            if self._warmed:
+                return
+            with ExitStack() as stack:
+                instances = [stack.enter_context(self.acquire()) for _ in range(self.size)]
+                for face_mesh in instances:
+                    face_mesh.process(image)
+            self._warmed = True
+
+    def stats(self) -> Dict[str, int]:
+        """Current pool utilisation"""
+        with self._lock:
+            return {
+                "size": self.size,
+                "in_use": self._in_use,
+                "available": self.size - self._in_use,
+                "exhausted_count": self._exhausted_count,
+            }
+
+    def close(self) -> None:
+        """Release every idle FaceMesh graph"""
+        self._closed = True
+        while True:
+            try:
+                face_mesh = self._instances.get_nowait()
+            except queue.Empty:
+                break
+            face_mesh.close()
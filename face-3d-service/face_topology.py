@@ -0,0 +1,155 @@
+"""
+Canonical Face Mesh Topology
+Triangles, adjacency, smoothing operator and UV layout of MediaPipe's
+468-landmark FaceMesh tesselation. Landmark i of every detection is vertex
+i of this mesh, so all of it is built once per process and shared
+read-only by every request.
+"""
+
+import itertools
+import threading
+from collections import Counter
+from typing import TYPE_CHECKING, List, Optional
+
+import numpy as np
+
+from reconstruction_3d import MeshTopology
+
+if TYPE_CHECKING:
+    import scipy.sparse as sp
+
+# Landmarks covered by the tesselation (refined iris points 468-477 are not)
+CANONICAL_VERTEX_COUNT = 468
+
+# Landmarks used to put the UV layout upright: subject's right / left eye
+# outer corners and forehead / chin
+_UV_RIGHT_EYE, _UV_LEFT_EYE = 33, 263
+_UV_FOREHEAD, _UV_CHIN = 10, 152
+_UV_MARGIN = 0.02
+
+_topology: Optional["FaceTopology"] = None
+_topology_lock = threading.Lock()
+
+
+def _faces_from_edges(edges: np.ndarray) -> np.ndarray:
+    """
+    Triangles of the tesselation from its edge list
+    Every 3-clique is a face except the few separating triangles whose three
+    edges are each shared by three cliques.
+    """
+    neighbours = {}
+    for a, b in edges.tolist():
+        neighbours.setdefault(a, set()).add(b)
+        neighbours.setdefault(b, set()).add(a)
+    triangles = {
+        tuple(sorted((a, b, c)))
+        for a, b in edges.tolist()
+        for c in neighbours[a] & neighbours[b]
+    }
+    edge_use = Counter(e for t in triangles for e in itertools.combinations(t, 2))
+    return np.array(sorted(
+        t for t in triangles
+        if not all(edge_use[e] > 2 for e in itertools.combinations(t, 2))
+    ), dtype=np.int64)
+
+
+def _boundary_loops(faces: np.ndarray) -> List[List[int]]:
+    """Closed loops of edges used by a single face (face outline, eyes, mouth)"""
+    edge_use = Counter(tuple(sorted(e)) for t in faces.tolist() for e in itertools.combinations(t, 2))
+    nxt = {}
+    for (a, b), n in edge_use.items():
+        if n == 1:
+            nxt.setdefault(a, []).append(b)
+            nxt.setdefault(b, []).append(a)
+    loops, seen = [], set()
+    for start in nxt:
+        if start in seen:
+            continue
+        loop, prev, current = [start], None, start
+        seen.add(start)
+        while True:
+            step = next((v for v in nxt[current] if v != prev), None)
+            if step is None or step == start:
+                break
+            loop.append(step)
+            seen.add(step)
+            prev, current = current, step
+        loops.append(loop)
+    return loops
+
+
+class FaceTopology:
+    """
+    Fixed mesh over the FaceMesh landmarks
+    faces are oriented counter-clockwise as seen by a camera facing the
+    subject, uvs (origin top-left) are a harmonic (Tutte) embedding with the
+    face outline on a circle, upright and not mirrored. Arrays are read-only.
+    """
+
+    def __init__(self, edges: np.ndarray, n_vertices: int = CANONICAL_VERTEX_COUNT):
+        faces = _faces_from_edges(np.asarray(edges, dtype=np.int64))
+        self.n_vertices = n_vertices
+        self.outline = max(_boundary_loops(faces), key=len)
+        self.uvs = self._layout(MeshTopology(faces, n_vertices).uniform_operator, self.outline)
+
+        # Counter-clockwise on screen (y down) means a negative signed area in UV space
+        tri = self.uvs[faces]
+        area = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+        self.faces = np.where((area > 0)[:, None], faces[:, [0, 2, 1]], faces)
+        self.mesh = MeshTopology(self.faces, n_vertices)
+
+        for array in (self.faces, self.uvs):
+            array.setflags(write=False)
+
+    def _layout(self, operator: "sp.csr_matrix", outline: List[int]) -> np.ndarray:
+        import scipy.sparse as sp
+        from scipy.sparse.linalg import spsolve
+
+        n = self.n_vertices
+        angles = np.linspace(0, 2 * np.pi, len(outline), endpoint=False)
+        fixed = np.zeros((n, 2))
+        fixed[outline] = np.stack([np.cos(angles), np.sin(angles)], axis=1)
+
+        # Every inner vertex at the mean of its neighbours: (I - W) x = 0
+        inner = np.setdiff1d(np.arange(n), outline)
+        system = (sp.identity(n, format="csr") - operator).tocsr()
+        rhs = -system[inner][:, outline] @ fixed[outline]
+        uvs = fixed.copy()
+        uvs[inner] = spsolve(system[inner][:, inner].tocsc(), rhs)
+
+        # Rotate chin-to-forehead onto -v (up), then un-mirror the eyes
+        up = uvs[_UV_FOREHEAD] - uvs[_UV_CHIN]
+        angle = np.arctan2(up[0], -up[1])
+        c, s = np.cos(angle), np.sin(angle)
+        uvs = uvs @ np.array([[c, -s], [s, c]])
+        if uvs[_UV_RIGHT_EYE, 0] > uvs[_UV_LEFT_EYE, 0]:
+            uvs[:, 0] = -uvs[:, 0]
+
+        uvs -= uvs.min(axis=0)
+        uvs /= uvs.max()
+        return (_UV_MARGIN + (1 - 2 * _UV_MARGIN) * uvs).astype(np.float32)
+
+    def fill(self, vertices: np.ndarray, valid: np.ndarray, iterations: int = 100) -> np.ndarray:
+        """
+        Replace invalid vertices by the harmonic interpolation of their
+        valid neighbours (Jacobi iterations of the shared averaging operator)
+        """
+        vertices = np.array(vertices, dtype=np.float64)
+        missing = ~valid
+        if not missing.any():
+            return vertices
+        vertices[missing] = vertices[valid].mean(axis=0)
+        operator = self.mesh.uniform_operator
+        for _ in range(iterations):
+            vertices[missing] = (operator @ vertices)[missing]
+        return vertices
+
+
+def get_face_topology() -> FaceTopology:
+    """Process-wide canonical topology, built on first use (the startup warm-up)"""
+    global _topology
+    with _topology_lock:
+        if _topology is None:
+            from mediapipe.python.solutions.face_mesh_connections import FACEMESH_TESSELATION
+            _topology = FaceTopology(np.array(sorted(FACEMESH_TESSELATION)))
+        return _topology
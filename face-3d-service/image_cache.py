@@ -0,0 +1,100 @@
+"""
+Decoded Image Cache
+Process-wide LRU of decoded images keyed by URL, bounded by total bytes and
+revalidated against the origin with ETag / Last-Modified
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import numpy as np
+
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+@dataclass
+class CachedImage:
+    image: np.ndarray
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Headers for a conditional GET against the cached validators"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ImageCache:
+    """
+    Byte-bounded LRU of decoded images.
+    Cached arrays are marked read-only because they are shared between
+    requests and pipeline stages.
+    """
+
+    def __init__(self, max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedImage]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, url: str) -> Optional[CachedImage]:
+        """Look up an entry without counting it; callers record the outcome once revalidated"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def record_hit(self) -> None:
+        with self._lock:
+            self.hits += 1
+
+    def record_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def put(self, url: str, image: np.ndarray, etag: Optional[str] = None,
+            last_modified: Optional[str] = None) -> None:
+        """
+        Store a decoded image
+        Responses without validators are not cached since they cannot be revalidated
+        """
+        if not etag and not last_modified:
+            return
+        if image.nbytes > self.max_bytes:
+            return
+
+        image.flags.writeable = False
+        with self._lock:
+            previous = self._entries.pop(url, None)
+            if previous is not None:
+                self._bytes -= previous.image.nbytes
+
+            self._entries[url] = CachedImage(image, etag, last_modified)
+            self._bytes += image.nbytes
+
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.image.nbytes
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,164 @@
+"""
+Async Image Fetching
+Shared httpx.AsyncClient with connection reuse, per-host concurrency caps and size limits
+"""
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import httpx
+import numpy as np
+
+from image_cache import ImageCache
+from ingest import decode_image, decode_nbytes
+from memory_budget import MemoryBudget
+from metrics import timed
+
+IMAGE_FETCH_TIMEOUT = float(os.getenv("IMAGE_FETCH_TIMEOUT", "30"))
+IMAGE_FETCH_MAX_BYTES = int(os.getenv("IMAGE_FETCH_MAX_BYTES", str(20 * 1024 * 1024)))
+IMAGE_FETCH_PER_HOST = int(os.getenv("IMAGE_FETCH_PER_HOST", "4"))
+IMAGE_FETCH_MAX_CONNECTIONS = int(os.getenv("IMAGE_FETCH_MAX_CONNECTIONS", "32"))
+
+
+class ImageTooLarge(Exception):
+    """Raised when an image body exceeds the configured byte limit"""
+
+
+class ImageFetcher:
+    """
+    Pooled async downloader for request images.
+    One instance lives for the whole process so keep-alive connections
+    are reused across requests. When a cache is given, decoded images are
+    reused as long as the origin answers 304 to a conditional GET. When a
+    memory budget is given, every decode holds its buffers of it.
+    """
+
+    def __init__(self, cache: Optional[ImageCache] = None,
+                 memory: Optional[MemoryBudget] = None,
+                 timeout: float = IMAGE_FETCH_TIMEOUT,
+                 max_bytes: int = IMAGE_FETCH_MAX_BYTES,
+                 per_host: int = IMAGE_FETCH_PER_HOST,
+                 max_connections: int = IMAGE_FETCH_MAX_CONNECTIONS):
+        self.cache = cache
+        self.memory = memory
+        self.max_bytes = max_bytes
+        self.per_host = per_host
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+        # Semaphores of the hosts with downloads running or waiting, and how
+        # many; a host's entry is dropped with its last download so the
+        # dict stays as small as the set of hosts in use
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._host_users: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def _host_slot(self, url: str) -> AsyncIterator[None]:
+        """Hold one of the per_host download slots of the URL's host"""
+        host = urlsplit(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_host)
+            self._host_semaphores[host] = semaphore
+        self._host_users[host] = self._host_users.get(host, 0) + 1
+        try:
+            async with semaphore:
+                yield
+        finally:
+            self._host_users[host] -= 1
+            if not self._host_users[host]:
+                del self._host_users[host]
+                del self._host_semaphores[host]
+
+    async def _download(self, url: str,
+                        headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes, httpx.Headers]:
+        """
+        Stream the response body, aborting as soon as it exceeds max_bytes
+        A 304 answer to a conditional request is returned with an empty body
+        """
+        async with self._host_slot(url):
+            async with self.client.stream("GET", url, headers=headers) as response:
+                if response.status_code == 304 and headers:
+                    return response.status_code, b"", response.headers
+                response.raise_for_status()
+
+                content_length = response.headers.get("content-length")
+                if content_length and int(content_length) > self.max_bytes:
+                    raise ImageTooLarge(
+                        f"Image is {content_length} bytes, limit is {self.max_bytes}"
+                    )
+
+                buffer = bytearray()
+                async for chunk in response.aiter_bytes():
+                    buffer.extend(chunk)
+                    if len(buffer) > self.max_bytes:
+                        raise ImageTooLarge(f"Image exceeds {self.max_bytes} bytes")
+                return response.status_code, bytes(buffer), response.headers
+
+    async def fetch_bytes(self, url: str) -> bytes:
+        """Download the raw image bytes"""
+        _, data, _ = await self._download(url)
+        return data
+
+    def decode(self, data: bytes, max_side: int = 0) -> np.ndarray:
+        """
+        ingest.decode_image capped at max_side, holding the decode's bytes of
+        the memory budget (RequestTooLarge / MemoryExhausted when refused)
+        """
+        if self.memory is None:
+            return decode_image(data, fit_side=max_side)
+        with self.memory.reserve(decode_nbytes(data, fit_side=max_side)):
+            return decode_image(data, fit_side=max_side)
+
+    async def fetch_image(self, url: str, max_side: int = 0) -> np.ndarray:
+        """
+        Download an image and decode it to an RGB numpy array (see decode)
+        Each max_side is cached separately.
+        """
+        key = f"{url}#max_side={max_side}" if max_side else url
+        cached = self.cache.get(key) if self.cache else None
+        headers = cached.conditional_headers() if cached else None
+
+        with timed("download"):
+            status, data, response_headers = await self._download(url, headers)
+        if status == 304 and cached is not None:
+            self.cache.record_hit()
+            return cached.image
+
+        # Decoding is CPU-bound, keep it off the event loop
+        image = await asyncio.to_thread(self.decode, data, max_side)
+        if self.cache:
+            self.cache.record_miss()
+            self.cache.put(
+                key,
+                image,
+                etag=response_headers.get("etag"),
+                last_modified=response_headers.get("last-modified"),
+            )
+        return image
+
+    async def fetch_images(self, urls: List[str], max_side: int = 0) -> List[Union[np.ndarray, BaseException]]:
+        """
+        Download all URLs concurrently, decoded to at most max_side
+        Repeated URLs are fetched once and share the decoded array.
+        Failed downloads are returned in place as exceptions
+        """
+        unique_urls = list(dict.fromkeys(urls))
+        results = await asyncio.gather(
+            *(self.fetch_image(url, max_side) for url in unique_urls),
+            return_exceptions=True,
+        )
+        by_url = dict(zip(unique_urls, results))
+        return [by_url[url] for url in urls]
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
@@ -0,0 +1,209 @@
+"""
+Image Ingestion
+Decodes encoded image bytes (downloaded or uploaded) straight into one RGB
+uint8 array with cv2.imdecode, applying EXIF orientation and reduced
+resolution decoding. A longest side cap (IMAGE_MAX_SIDE, or the one a
+reconstruction asks for) is applied right away so oversized images never
+reach the cache or any stage at full size. Every pipeline stage consumes
+this RGB convention.
+"""
+
+import io
+import os
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+from starlette.requests import Request
+
+from metrics import timed
+
+try:
+    import python_multipart
+except ImportError:
+    python_multipart = None
+
+# Longest side images are decoded to. Larger JPEGs are decoded at 1/2, 1/4
+# or 1/8 scale by the codec itself as long as the result stays at least
+# this large; 0 always decodes at full resolution.
+IMAGE_DECODE_MAX_SIDE = int(os.getenv("IMAGE_DECODE_MAX_SIDE", "0"))
+# Longest side kept after decoding: larger images are decoded at a reduced
+# scale where the codec allows it and then downscaled to this; 0 keeps the
+# decoded resolution. Landmark coordinates refer to the capped image.
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "0"))
+# Largest codec output accepted, in pixels from the image header after any
+# reduced decoding; bounds a decoded image when no side cap applies. 0 = no limit.
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", "50000000"))
+
+# Raw request bodies with one of these content types are taken as one image
+_RAW_IMAGE_TYPES = ("image/", "application/octet-stream")
+
+# (reduction factor, grayscale flag that selects it); combined with the RGB flag
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+    (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+    (2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
+)
+_HAS_RGB_DECODE = hasattr(cv2, "IMREAD_COLOR_RGB")
+_JPEG_MAGIC = b"\xff\xd8"
+
+
+class ImageDecodeError(Exception):
+    """Raised when bytes cannot be decoded as an image"""
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the byte or file count limit"""
+
+
+class UnsupportedUpload(Exception):
+    """Raised when the request body is neither multipart nor a raw image"""
+
+
+def _source_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """Width and height from the image header, without decoding pixels"""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            return image.size
+    except Exception:
+        return None
+
+
+def _smallest_side(*sides: int) -> int:
+    """Smallest of the given longest-side caps, ignoring 0 (no cap)"""
+    return min((side for side in sides if side > 0), default=0)
+
+
+def _reduction(size: Optional[Tuple[int, int]], max_side: int) -> int:
+    """Codec reduction factor decoding keeps at least max_side of, 1 = full resolution"""
+    if max_side <= 0 or size is None:
+        return 1
+    longest = max(size)
+    for factor, _ in _REDUCED_FLAGS:
+        if longest // factor >= max_side:
+            return factor
+    return 1
+
+
+def _decode_flags(factor: int) -> int:
+    color = cv2.IMREAD_COLOR_RGB if _HAS_RGB_DECODE else cv2.IMREAD_COLOR
+    if factor == 1:
+        return color
+    # The reduced flags are defined on top of IMREAD_GRAYSCALE (0), so
+    # OR-ing the colour flag keeps colour output at that scale
+    return dict(_REDUCED_FLAGS)[factor] | color
+
+
+def decode_nbytes(data: bytes, max_side: Optional[int] = None, fit_side: int = 0) -> int:
+    """
+    Bytes decode_image allocates for these arguments, from the image header
+    The codec output plus its downscaled copy; 0 when the header is unreadable.
+    """
+    size = _source_size(data)
+    if size is None:
+        return 0
+    fit_side = _smallest_side(IMAGE_MAX_SIDE, fit_side)
+    if max_side is None:
+        max_side = IMAGE_DECODE_MAX_SIDE
+    factor = _reduction(size, _smallest_side(max_side, fit_side))
+    width, height = size[0] // factor, size[1] // factor
+    nbytes = width * height * 3
+    if factor > 1 and not data.startswith(_JPEG_MAGIC):
+        # Only JPEG reduces inside the codec, other formats decode at full size first
+        nbytes += size[0] * size[1] * 3
+    longest = max(width, height)
+    if fit_side and longest > fit_side:
+        scale = fit_side / longest
+        nbytes += int(width * scale) * int(height * scale) * 3
+    return nbytes
+
+
+def decode_image(data: bytes, max_side: Optional[int] = None, fit_side: int = 0) -> np.ndarray:
+    """
+    Decode encoded image bytes to an RGB uint8 array
+    EXIF orientation is applied by the codec; max_side (default
+    IMAGE_DECODE_MAX_SIDE) enables reduced-resolution decoding. The result
+    is at most fit_side (and IMAGE_MAX_SIDE) on its longest side, reduced
+    decoding stopping at that size; 0 sets no cap of its own. Images the
+    codec would decode to more than IMAGE_MAX_PIXELS are refused.
+    """
+    fit_side = _smallest_side(IMAGE_MAX_SIDE, fit_side)
+    if max_side is None:
+        max_side = IMAGE_DECODE_MAX_SIDE
+    max_side = _smallest_side(max_side, fit_side)
+    size = _source_size(data) if max_side > 0 or IMAGE_MAX_PIXELS > 0 else None
+    factor = _reduction(size, max_side)
+    if IMAGE_MAX_PIXELS > 0 and size is not None:
+        pixels = (size[0] // factor) * (size[1] // factor)
+        if pixels > IMAGE_MAX_PIXELS:
+            raise ImageDecodeError(f"Image has {pixels} pixels, more than the {IMAGE_MAX_PIXELS} allowed")
+    with timed("decode"):
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        image = cv2.imdecode(buffer, _decode_flags(factor)) if len(buffer) else None
+        if image is None:
+            raise ImageDecodeError("Unsupported or corrupt image data")
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+        elif not _HAS_RGB_DECODE:
+            cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+        image = fit_image(image, fit_side)
+    return image
+
+
+def fit_image(image: np.ndarray, max_side: int) -> np.ndarray:
+    """image downscaled (INTER_AREA) so its longest side is at most max_side; 0 keeps it"""
+    longest = max(image.shape[:2])
+    if max_side <= 0 or longest <= max_side:
+        return image
+    scale = max_side / longest
+    return cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+
+async def read_uploads(request: Request, field: str, max_files: int,
+                       max_bytes: int) -> Tuple[List[Tuple[str, bytes]], Dict[str, List[str]]]:
+    """
+    Read uploaded image bytes from a multipart form or a raw request body
+    Multipart forms yield every file in `field` plus the remaining form
+    fields; a raw image/* or application/octet-stream body is one upload.
+    Raises UploadTooLarge past max_bytes / max_files, UnsupportedUpload for
+    other content types and ValueError when no image was sent.
+    """
+    content_type = request.headers.get("content-type", "").lower()
+
+    if content_type.startswith("multipart/form-data"):
+        if python_multipart is None:
+            raise UnsupportedUpload("Multipart uploads require the 'python-multipart' package")
+        form = await request.form(max_files=max_files + 1)
+        uploads: List[Tuple[str, bytes]] = []
+        fields: Dict[str, List[str]] = {}
+        try:
+            for key, value in form.multi_items():
+                if isinstance(value, str):
+                    fields.setdefault(key, []).append(value)
+                    continue
+                if key != field:
+                    continue
+                if len(uploads) >= max_files:
+                    raise UploadTooLarge(f"At most {max_files} images per request")
+                data = await value.read(max_bytes + 1)
+                if len(data) > max_bytes:
+                    raise UploadTooLarge(f"Image exceeds {max_bytes} bytes")
+                uploads.append((value.filename or "upload", data))
+        finally:
+            await form.close()
+        if not uploads:
+            raise ValueError(f"Multipart form has no '{field}' file fields")
+        return uploads, fields
+
+    if content_type.startswith(_RAW_IMAGE_TYPES):
+        data = bytearray()
+        async for chunk in request.stream():
+            data.extend(chunk)
+            if len(data) > max_bytes:
+                raise UploadTooLarge(f"Image exceeds {max_bytes} bytes")
+        if not data:
+            raise ValueError("Request body is empty")
+        return [("body", bytes(data))], {}
+
+    raise UnsupportedUpload("Expected multipart/form-data or an image request body")
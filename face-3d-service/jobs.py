@@ -0,0 +1,387 @@
+"""
+Reconstruction Job Queue
+SQLite-persisted queue for asynchronous reconstructions. Identical
+submissions attach to the job already queued, running or finished, and
+finished results are kept until their TTL expires.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(tempfile.gettempdir(), "face-3d-jobs.sqlite3"))
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "3600"))  # seconds
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "2"))
+JOB_SWEEP_INTERVAL = int(os.getenv("JOB_SWEEP_INTERVAL", "60"))  # seconds
+# Runs of one job, retries after a saturated worker pool included
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+# Identity written on running jobs; stable across restarts of one replica
+JOB_OWNER = os.getenv("JOB_OWNER") or f"{socket.gethostname()}:{os.getpid()}"
+# A running job whose owner has not renewed it for this long is taken over
+JOB_LEASE = int(os.getenv("JOB_LEASE", "300"))  # seconds
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, status);
+CREATE INDEX IF NOT EXISTS jobs_expires ON jobs (expires_at);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, updated_at);
+"""
+
+# Columns added after the first release, created on databases that predate them
+_MIGRATIONS = {
+    "attempts": "ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0",
+    "owner": "ALTER TABLE jobs ADD COLUMN owner TEXT",
+}
+
+
+class JobFailed(Exception):
+    """Raised by a job runner to fail a job with an HTTP status and detail"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class RetryJob(Exception):
+    """Raised by a job runner when the job should be re-queued after a delay"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+@dataclass
+class Job:
+    id: str
+    status: str
+    params: Dict[str, Any]
+    result: Optional[Dict[str, Any]]
+    error: Optional[Dict[str, Any]]
+    created_at: float
+    updated_at: float
+    expires_at: Optional[float]
+
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _canonical_url(url: str) -> str:
+    """url with a lower-case scheme and host, no default port and no fragment"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    netloc = host if parts.port in (None, _DEFAULT_PORTS.get(scheme)) else f"{host}:{parts.port}"
+    if parts.username or parts.password:
+        netloc = parts.netloc.rsplit("@", 1)[0] + "@" + netloc
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+def job_key(params: Dict[str, Any]) -> str:
+    """
+    De-duplication key of a submission
+    The views are hashed in submission order, because view 0 is the SfM
+    reference frame and landmarks and warnings are indexed by position;
+    only the spelling of each URL and expected angle is canonicalised.
+    """
+    urls = params.get("image_urls") or []
+    angles = params.get("expected_angles") or [None] * len(urls)
+    views = [
+        (_canonical_url(url), angle.strip().lower() if isinstance(angle, str) else angle)
+        for url, angle in zip(urls, angles)
+    ]
+    rest = {k: v for k, v in params.items() if k not in ("image_urls", "expected_angles")}
+    canonical = json.dumps({"views": views, "params": rest}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class JobStore:
+    """
+    SQLite table of jobs; every call is short and serialised by a lock
+    Running jobs carry the owner that claimed them, so replicas sharing the
+    database only take over each other's jobs once the lease has run out.
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH, owner: str = JOB_OWNER):
+        self.path = path
+        self.owner = owner
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for column, statement in _MIGRATIONS.items():
+            if column not in columns:
+                self._db.execute(statement)
+
+    def create_or_attach(self, params: Dict[str, Any], now: float) -> Tuple[Job, bool]:
+        """
+        Insert a queued job, or return the live job with the same key
+        The bool is True when a new job was created.
+        """
+        key = job_key(params)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT * FROM jobs WHERE key = ? AND status != ? "
+                    "AND (expires_at IS NULL OR expires_at > ?) "
+                    "ORDER BY created_at DESC LIMIT 1",
+                    (key, FAILED, now),
+                ).fetchone()
+                if row is not None:
+                    self._db.execute("COMMIT")
+                    return self._job(row), False
+
+                job_id = uuid.uuid4().hex
+                self._db.execute(
+                    "INSERT INTO jobs (id, key, status, params, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, key, QUEUED, json.dumps(params), now, now),
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return Job(job_id, QUEUED, params, None, None, now, now, None), True
+
+    def get(self, job_id: str, now: float) -> Optional[Job]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM jobs WHERE id = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (job_id, now),
+            ).fetchone()
+        return self._job(row) if row is not None else None
+
+    def mark_running(self, job_id: str, now: float) -> Optional[Tuple[Dict[str, Any], int]]:
+        """Move a queued job to running and return its parameters and attempt number"""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, owner = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ? AND status = ?",
+                (RUNNING, self.owner, now, job_id, QUEUED),
+            )
+            if cursor.rowcount == 0:
+                return None
+            row = self._db.execute("SELECT params, attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row["params"]), row["attempts"]
+
+    def requeue(self, job_id: str, now: float) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, updated_at = ? WHERE id = ?",
+                (QUEUED, now, job_id),
+            )
+
+    def renew(self, now: float) -> None:
+        """Extend the lease of every job this owner is running"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET updated_at = ? WHERE status = ? AND owner = ?",
+                (now, RUNNING, self.owner),
+            )
+
+    def finish(self, job_id: str, now: float, ttl: float,
+               result: Optional[Dict[str, Any]] = None,
+               error: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ?, expires_at = ? "
+                "WHERE id = ?",
+                (
+                    FAILED if error is not None else SUCCEEDED,
+                    json.dumps(result) if result is not None else None,
+                    json.dumps(error) if error is not None else None,
+                    now,
+                    now + ttl,
+                    job_id,
+                ),
+            )
+
+    def recover(self, now: float, lease: float = JOB_LEASE) -> List[str]:
+        """
+        Jobs this owner was running before a restart, and jobs whose lease
+        ran out, are queued again; returns every queued job, oldest first
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, updated_at = ? "
+                "WHERE status = ? AND (owner = ? OR owner IS NULL OR updated_at <= ?)",
+                (QUEUED, now, RUNNING, self.owner, now - lease),
+            )
+            rows = self._db.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def reclaim_expired_leases(self, now: float, lease: float = JOB_LEASE) -> List[str]:
+        """Running jobs of any owner that stopped renewing them, queued again"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    "SELECT id FROM jobs WHERE status = ? AND updated_at <= ? ORDER BY created_at",
+                    (RUNNING, now - lease),
+                ).fetchall()
+                self._db.executemany(
+                    "UPDATE jobs SET status = ?, owner = NULL, updated_at = ? WHERE id = ?",
+                    [(QUEUED, now, row["id"]) for row in rows],
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return [row["id"] for row in rows]
+
+    def purge_expired(self, now: float) -> int:
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+            )
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _job(row: sqlite3.Row) -> Job:
+        return Job(
+            id=row["id"],
+            status=row["status"],
+            params=json.loads(row["params"]),
+            result=json.loads(row["result"]) if row["result"] else None,
+            error=json.loads(row["error"]) if row["error"] else None,
+            created_at=row["created_at"],
+            updated_at=row["updated_at"],
+            expires_at=row["expires_at"],
+        )
+
+
+class JobQueue:
+    """
+    Runs queued jobs with a fixed number of consumer tasks.
+    The runner is an async callable taking the stored parameters and
+    returning a JSON-serialisable result; it raises JobFailed for request
+    errors and RetryJob when the worker pool is saturated. A job still
+    being retried after max_attempts runs fails with 503. Store calls run
+    in a thread so SQLite never blocks the event loop. The leases of
+    running jobs are renewed every third of lease seconds, and jobs other
+    replicas stopped renewing are picked up by the sweep.
+    """
+
+    def __init__(self, runner: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 store: Optional[JobStore] = None, concurrency: int = JOB_CONCURRENCY,
+                 ttl: float = JOB_RESULT_TTL, max_attempts: int = JOB_MAX_ATTEMPTS,
+                 lease: float = JOB_LEASE):
+        self.runner = runner
+        self.store = store or JobStore()
+        self.concurrency = concurrency
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self._pending: "asyncio.Queue[str]" = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        for job_id in self.store.recover(time.time(), self.lease):
+            self._pending.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._consume()) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._sweep()))
+        self._tasks.append(asyncio.create_task(self._renew()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.store.close()
+
+    def submit(self, params: Dict[str, Any]) -> Tuple[Job, bool]:
+        """Queue a job, or attach to the live one with identical parameters"""
+        job, created = self.store.create_or_attach(params, time.time())
+        if created:
+            self._pending.put_nowait(job.id)
+        return job, created
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.store.get(job_id, time.time())
+
+    def stats(self) -> Dict[str, Any]:
+        return {"pending": self._pending.qsize(), "jobs": self.store.counts()}
+
+    async def _consume(self) -> None:
+        while True:
+            job_id = await self._pending.get()
+            claimed = await asyncio.to_thread(self.store.mark_running, job_id, time.time())
+            if claimed is None:
+                continue
+            params, attempt = claimed
+            try:
+                result = await self.runner(params)
+            except RetryJob as e:
+                if attempt >= self.max_attempts:
+                    await asyncio.to_thread(
+                        self.store.finish, job_id, time.time(), self.ttl,
+                        error={"status_code": 503, "detail": f"Service busy, gave up after {attempt} attempts"}
+                    )
+                    continue
+                await asyncio.to_thread(self.store.requeue, job_id, time.time())
+                asyncio.get_running_loop().call_later(e.retry_after, self._pending.put_nowait, job_id)
+            except JobFailed as e:
+                await asyncio.to_thread(self.store.finish, job_id, time.time(), self.ttl,
+                                        error={"status_code": e.status_code, "detail": e.detail})
+            except asyncio.CancelledError:
+                # Shutting down: the job stays running and is recovered on restart
+                raise
+            except Exception as e:
+                await asyncio.to_thread(self.store.finish, job_id, time.time(), self.ttl,
+                                        error={"status_code": 500, "detail": str(e)})
+            else:
+                await asyncio.to_thread(self.store.finish, job_id, time.time(), self.ttl, result=result)
+
+    async def _sweep(self) -> None:
+        while True:
+            await asyncio.sleep(JOB_SWEEP_INTERVAL)
+            await asyncio.to_thread(self.store.purge_expired, time.time())
+            for job_id in await asyncio.to_thread(self.store.reclaim_expired_leases, time.time(), self.lease):
+                self._pending.put_nowait(job_id)
+
+    async def _renew(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            await asyncio.to_thread(self.store.renew, time.time())
@@ -0,0 +1,120 @@
+"""
+Memory Budget
+Admission control on the estimated working set of reconstruction requests
+(see pipeline.estimate_input_bytes and estimate_working_set) and of image
+decodes: a request that alone exceeds the per-request budget is refused,
+and one that would push the bytes reserved by all in-flight requests past
+the service limit is asked to retry later, instead of both running the
+process into the OOM killer.
+"""
+
+import os
+import threading
+from typing import Any, Dict
+
+REQUEST_MEMORY_BUDGET_MB = int(os.getenv("REQUEST_MEMORY_BUDGET_MB", "1024"))  # 0 = no per-request limit
+MEMORY_LIMIT_MB = int(os.getenv("MEMORY_LIMIT_MB", "0"))  # 0 = no service-wide limit
+MEMORY_RETRY_AFTER = int(os.getenv("MEMORY_RETRY_AFTER", "5"))
+
+_MB = 1024 * 1024
+
+
+class RequestTooLarge(Exception):
+    """Raised when one request's working set exceeds the per-request budget"""
+
+
+class MemoryExhausted(Exception):
+    """Raised when in-flight requests have reserved too much of the service limit"""
+
+    def __init__(self, message: str, retry_after: int = MEMORY_RETRY_AFTER):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class MemoryBudget:
+    """
+    Byte reservations of in-flight requests
+    acquire() checks a request's estimate against both limits and reserves
+    it; release() returns it. A request is always admitted when nothing else
+    is reserved, so a service limit below the per-request budget cannot
+    refuse work forever.
+    """
+
+    def __init__(self, request_limit_mb: int = REQUEST_MEMORY_BUDGET_MB,
+                 total_limit_mb: int = MEMORY_LIMIT_MB):
+        self.request_limit = request_limit_mb * _MB
+        self.total_limit = total_limit_mb * _MB
+        self._lock = threading.Lock()
+        self._reserved = 0
+        self._peak_reserved = 0
+        self._too_large = 0
+        self._exhausted = 0
+
+    def acquire(self, nbytes: int) -> None:
+        self._swap(0, nbytes)
+
+    def reserve(self, nbytes: int) -> "Reservation":
+        """acquire() nbytes as a Reservation, released when its block exits"""
+        self.acquire(nbytes)
+        return Reservation(self, nbytes)
+
+    def _swap(self, held: int, nbytes: int) -> None:
+        """Replace a reservation of held bytes by one of nbytes, checked like acquire()"""
+        with self._lock:
+            others = self._reserved - held
+            if self.request_limit and nbytes > self.request_limit:
+                self._too_large += 1
+                raise RequestTooLarge(
+                    f"Request needs about {nbytes // _MB} MB, more than the "
+                    f"{self.request_limit // _MB} MB per-request budget; send fewer or smaller "
+                    f"images or a lower quality"
+                )
+            if self.total_limit and others and others + nbytes > self.total_limit:
+                self._exhausted += 1
+                raise MemoryExhausted(
+                    f"Request needs about {nbytes // _MB} MB but only "
+                    f"{max(self.total_limit - others, 0) // _MB} MB of the service memory limit is free"
+                )
+            self._reserved = others + nbytes
+            self._peak_reserved = max(self._peak_reserved, self._reserved)
+
+    def release(self, nbytes: int) -> None:
+        with self._lock:
+            self._reserved -= nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "request_limit_bytes": self.request_limit,
+                "limit_bytes": self.total_limit,
+                "reserved_bytes": self._reserved,
+                "peak_reserved_bytes": self._peak_reserved,
+                "too_large": self._too_large,
+                "exhausted": self._exhausted,
+            }
+
+
+class Reservation:
+    """
+    Bytes held of a MemoryBudget
+    resize() moves the reservation to a new estimate (the old one stays held
+    when that is refused); release() and leaving the with block return it.
+    """
+
+    def __init__(self, budget: MemoryBudget, nbytes: int):
+        self.budget = budget
+        self.nbytes = nbytes
+
+    def resize(self, nbytes: int) -> None:
+        self.budget._swap(self.nbytes, nbytes)
+        self.nbytes = nbytes
+
+    def release(self) -> None:
+        self.budget.release(self.nbytes)
+        self.nbytes = 0
+
+    def __enter__(self) -> "Reservation":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.release()
@@ -0,0 +1,415 @@
+"""
+Service Metrics
+Per-stage latency histograms rendered in the Prometheus text format, the
+peak resident set size of every request, and opt-in per-request traces: a
+request sent with the profile header gets a per-stage timing breakdown and
+a sampled CPU profile instead of its body.
+"""
+
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "X-Profile").lower()
+# When set, the profile header must carry this token instead of 1/true/yes
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))  # seconds
+PROFILE_MAX_STACKS = int(os.getenv("PROFILE_MAX_STACKS", "200"))
+RSS_SAMPLE_INTERVAL = float(os.getenv("RSS_SAMPLE_INTERVAL", "0.01"))  # seconds
+
+# Seconds; covers a cached landmark lookup up to a slow multi-view reconstruction
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Bytes; 64 MiB up to 8 GiB
+RSS_BUCKETS = tuple(float(2 ** n) for n in range(26, 34))
+
+_MAX_STACK_DEPTH = 64
+# Innermost frames of an idle event loop; such samples are not CPU time
+_IDLE_FRAMES = {("select", "selectors.py"), ("poll", "selectors.py"), ("control", "selectors.py")}
+
+
+class Histogram:
+    """Cumulative histogram (latencies or byte sizes) with one label"""
+
+    def __init__(self, name: str, help: str, label: str,
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label value -> (per-bucket counts, sum, count)
+        self._series: Dict[str, Tuple[List[int], float, int]] = {}
+
+    def observe(self, label_value: str, value: float) -> None:
+        with self._lock:
+            counts, total, n = self._series.get(label_value) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._series[label_value] = (counts, total + value, n + 1)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((k, list(c), s, n) for k, (c, s, n) in self._series.items())
+        for label_value, counts, total, n in series:
+            label = f'{self.label}="{_escape(label_value)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {n}')
+            lines.append(f"{self.name}_sum{{{label}}} {total}")
+            lines.append(f"{self.name}_count{{{label}}} {n}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "face3d_stage_duration_seconds", "Time spent in one pipeline stage", "stage"
+)
+REQUEST_SECONDS = Histogram(
+    "face3d_request_duration_seconds", "End-to-end HTTP request latency", "endpoint"
+)
+REQUEST_PEAK_RSS = Histogram(
+    "face3d_request_peak_rss_bytes",
+    "Peak resident set size of the service (or worker) process while a request ran",
+    "endpoint",
+    RSS_BUCKETS,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render(extra: Sequence[Tuple[str, str, str, Sequence[Tuple[Dict[str, str], float]]]] = ()) -> str:
+    """
+    Prometheus text exposition of the stage and request histograms
+    extra holds (name, type, help, [(labels, value), ...]) entries for
+    gauges and counters read from the pools at scrape time.
+    """
+    lines = STAGE_SECONDS.render() + REQUEST_SECONDS.render() + REQUEST_PEAK_RSS.render()
+    for name, kind, help, samples in extra:
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            label = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+            lines.append(f"{name}{{{label}}} {value}" if label else f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+@dataclass
+class RequestTrace:
+    """Stage timings, peak RSS (and CPU samples when profiling) of one request"""
+    profile: bool = False
+    stages: Dict[str, List[float]] = field(default_factory=dict)  # stage -> [count, seconds]
+    stacks: Counter = field(default_factory=Counter)
+    samples: int = 0
+    peak_rss: int = 0  # bytes, highest of the serving process and its worker tasks
+
+    def add(self, stage: str, seconds: float) -> None:
+        entry = self.stages.setdefault(stage, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+
+@dataclass
+class WorkerSample:
+    """Timings, peak RSS and CPU samples collected inside one worker pool task"""
+    timings: List[Tuple[str, float]]
+    stacks: Dict[str, int]
+    samples: int
+    peak_rss: int = 0
+
+
+_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+# Set while a worker pool task runs; its timings travel back with the result
+_worker = threading.local()
+
+
+def profiling_requested() -> bool:
+    trace = _trace.get()
+    return trace is not None and trace.profile
+
+
+def record(stage: str, seconds: float) -> None:
+    """Add one stage duration to the histogram and the current request trace"""
+    pending = getattr(_worker, "timings", None)
+    if pending is not None:
+        pending.append((stage, seconds))
+        return
+    STAGE_SECONDS.observe(stage, seconds)
+    trace = _trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Time the enclosed block as one pipeline stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        # Lifetime high-water mark (KiB on Linux) when /proc is unavailable
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RssWatch:
+    """Highest RSS seen while registered with an RssMonitor"""
+
+    def __init__(self, rss: int):
+        self.peak = rss
+
+
+class RssMonitor:
+    """
+    Samples the process RSS from one background thread while any watch is
+    open, raising the peak of every open watch. Concurrent requests share
+    the process, so each one's peak includes the others' memory.
+    """
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._reset()
+        # A forked worker process inherits neither the sampling thread nor
+        # the parent's open watches
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        self._watches: List[RssWatch] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def open(self) -> RssWatch:
+        handle = RssWatch(current_rss())
+        with self._cond:
+            self._watches.append(handle)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="rss-monitor", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return handle
+
+    def close(self, handle: RssWatch) -> int:
+        """Stop updating handle and return its peak in bytes"""
+        with self._cond:
+            self._watches.remove(handle)
+        handle.peak = max(handle.peak, current_rss())
+        return handle.peak
+
+    @contextmanager
+    def watch(self) -> Iterator[RssWatch]:
+        handle = self.open()
+        try:
+            yield handle
+        finally:
+            self.close(handle)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._watches:
+                    self._cond.wait()
+                watches = list(self._watches)
+            rss = current_rss()
+            for handle in watches:
+                handle.peak = max(handle.peak, rss)
+            time.sleep(self.interval)
+
+
+_rss_monitor = RssMonitor()
+
+
+class StackSampler:
+    """
+    Samples the Python stacks of the given threads at a fixed interval from
+    a background thread, folded as "outer;...;inner" strings.
+    """
+
+    def __init__(self, thread_ids: Sequence[int], interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.thread_ids = set(thread_ids)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in self.thread_ids:
+                frame = frames.get(thread_id)
+                if frame is None or (frame.f_code.co_name, os.path.basename(frame.f_code.co_filename)) in _IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < _MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+
+def run_instrumented(fn: Callable[..., Any], profile: bool, submitted_at: float,
+                     *args: Any, **kwargs: Any) -> Tuple[Any, WorkerSample]:
+    """
+    Worker-side wrapper of a pool task: collects the stage timings, peak
+    RSS (and CPU samples when profiling) of fn and returns them with its
+    result. Runs in worker threads and processes alike.
+    """
+    timings = [("worker_queue_wait", max(time.monotonic() - submitted_at, 0.0))]
+    _worker.timings = timings
+    sampler = StackSampler([threading.get_ident()]).start() if profile else None
+    try:
+        with _rss_monitor.watch() as rss:
+            result = fn(*args, **kwargs)
+    finally:
+        _worker.timings = None
+        if sampler is not None:
+            sampler.stop()
+    sample = WorkerSample(
+        timings=timings,
+        stacks=dict(sampler.stacks) if sampler else {},
+        samples=sampler.samples if sampler else 0,
+        peak_rss=rss.peak,
+    )
+    return result, sample
+
+
+def merge(sample: WorkerSample) -> None:
+    """Report a finished pool task's timings, peak RSS and samples in the calling request"""
+    for stage, seconds in sample.timings:
+        record(stage, seconds)
+    trace = _trace.get()
+    if trace is not None:
+        trace.peak_rss = max(trace.peak_rss, sample.peak_rss)
+    if trace is not None and sample.stacks:
+        trace.stacks.update(sample.stacks)
+        trace.samples += sample.samples
+
+
+def _profile_requested(headers: Dict[bytes, bytes]) -> bool:
+    value = headers.get(PROFILE_HEADER.encode("latin-1"), b"")
+    if PROFILE_TOKEN:
+        return hmac.compare_digest(value, PROFILE_TOKEN.encode("latin-1"))
+    return value.lower() in (b"1", b"true", b"yes")
+
+
+def _server_timing(trace: RequestTrace) -> str:
+    return ", ".join(
+        f"{stage};dur={seconds * 1000:.2f}" for stage, (_, seconds) in trace.stages.items()
+    )
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request and recording its peak RSS
+    per route (see RssMonitor). With PROFILE_ENABLED, a request sent with
+    PROFILE_HEADER: 1 (or PROFILE_TOKEN, when set) also samples the event
+    loop thread and every worker task it submits, and is answered with a
+    JSON report of its stage timings and folded CPU stacks instead of the
+    endpoint's body. Event loop samples include whatever other requests ran
+    concurrently.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = PROFILE_ENABLED and _profile_requested(dict(scope.get("headers") or []))
+        trace = RequestTrace(profile=profile)
+        token = _trace.set(trace)
+        sampler = StackSampler([threading.get_ident()]).start() if profile else None
+        start = time.perf_counter()
+        watch = _rss_monitor.open()
+
+        status = {"code": 500, "bytes": 0, "content_type": None}
+
+        async def capture(message: Dict[str, Any]) -> None:
+            # The endpoint's own response is replaced by the report
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                status["content_type"] = dict(message.get("headers") or []).get(b"content-type")
+            elif message["type"] == "http.response.body":
+                status["bytes"] += len(message.get("body", b""))
+
+        try:
+            await self.app(scope, receive, capture if profile else send)
+        finally:
+            elapsed = time.perf_counter() - start
+            trace.peak_rss = max(trace.peak_rss, _rss_monitor.close(watch))
+            _trace.reset(token)
+            if sampler is not None:
+                sampler.stop()
+                trace.stacks.update(sampler.stacks)
+                trace.samples += sampler.samples
+            route = scope.get("route")
+            endpoint = getattr(route, "path", "unmatched")
+            REQUEST_SECONDS.observe(endpoint, elapsed)
+            REQUEST_PEAK_RSS.observe(endpoint, trace.peak_rss)
+
+        if not profile:
+            return
+
+        stacks = trace.stacks.most_common(PROFILE_MAX_STACKS)
+        report = {
+            "status_code": status["code"],
+            "content_type": status["content_type"].decode("latin-1") if status["content_type"] else None,
+            "response_bytes": status["bytes"],
+            "duration_seconds": elapsed,
+            "peak_rss_bytes": trace.peak_rss,
+            "stages": {
+                stage: {"count": count, "seconds": seconds}
+                for stage, (count, seconds) in trace.stages.items()
+            },
+            "profile": {
+                "interval_seconds": PROFILE_SAMPLE_INTERVAL,
+                "samples": trace.samples,
+                "stacks": [{"stack": stack, "samples": n} for stack, n in stacks],
+            },
+        }
+        body = json.dumps(report).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"server-timing", _server_timing(trace).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
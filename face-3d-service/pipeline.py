@@ -0,0 +1,790 @@
+"""
+Reconstruction Pipeline Stages
+CPU-bound stages of the service. Every function here runs inside a worker
+of the WorkerPool and picks up its per-worker FaceMesh / SfM objects from
+the workers module, so they must stay picklable module-level functions.
+"""
+
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import cv2
+
+from reconstruction_3d import (
+    MeshOptimizer,
+    StructureFromMotion,
+    TextureMapper,
+    GPUAcceleration
+)
+from artifact_store import artifact_key, get_artifact_store, image_digest
+from face_topology import CANONICAL_VERTEX_COUNT, get_face_topology
+from metrics import timed
+from ingest import IMAGE_MAX_PIXELS, IMAGE_MAX_SIDE
+from video import (
+    VIDEO_MAX_CANDIDATES, VIDEO_MAX_KEYFRAMES, VIDEO_MAX_SIDE, Keyframe, KeyframeSelector, face_sharpness, iter_frames
+)
+from workers import current_face_mesh_pool, current_sfm, current_tracking_pool
+
+
+# MediaPipe Face Mesh indices used throughout the pipeline
+NOSE_TIP = 1
+LEFT_EYE = 33
+RIGHT_EYE = 263
+KEY_LANDMARK_INDICES = np.array([1, 33, 61, 199, 291, 263, 172, 175])  # Key facial features
+
+# In MediaPipe's canonical face model the nose tip is about 3.8 units below
+# and 4.3 in front of the outer eye corner midpoint; that angle is pitch 0
+NEUTRAL_PITCH = float(np.degrees(np.arctan2(3.79, 4.30)))
+# Part of the landmark artifact key; bump when the pose estimate changes
+POSE_VERSION = 2
+
+# Triangulated points with a larger mean reprojection error (pixels) are dropped
+MAX_REPROJECTION_ERROR = float(os.getenv("MAX_REPROJECTION_ERROR", "8.0"))
+
+# SIFT runs on the face bounding box plus this margin (fraction of the box
+# size), downscaled so its longest side is at most SIFT_MAX_SIDE pixels
+# (standard quality; see QUALITY_TIERS). SIFT_FACE_ROI=false restores
+# full-frame detection; SIFT_MAX_SIDE=0 disables the cap.
+SIFT_FACE_ROI = os.getenv("SIFT_FACE_ROI", "true").lower() in ("1", "true", "yes")
+SIFT_ROI_MARGIN = float(os.getenv("SIFT_ROI_MARGIN", "0.25"))
+SIFT_MAX_SIDE = int(os.getenv("SIFT_MAX_SIDE", "1024"))
+
+# Views of a reconstruction are decoded to at most this longest side
+# (standard and high quality; draft uses 640), so the memory reserved
+# before they are fetched is bounded; 0 keeps them as decoded.
+RECONSTRUCTION_MAX_SIDE = int(os.getenv("RECONSTRUCTION_MAX_SIDE", "2048"))
+
+# "canonical" meshes every FaceMesh landmark with the fixed tesselation of
+# face_topology; "delaunay" triangulates the key landmarks per request.
+MESH_TOPOLOGY = os.getenv("MESH_TOPOLOGY", "canonical").lower()
+# Canonical meshes need at least this fraction of landmarks triangulated
+# (the rest are filled in from their neighbours), else Delaunay is used
+MIN_LANDMARK_COVERAGE = 0.5
+
+# Dense mode outlier filtering: statistical (mean distance to the k nearest
+# neighbours) then radius (neighbour count within a multiple of the median
+# point spacing)
+DENSE_NEIGHBORS = int(os.getenv("DENSE_NEIGHBORS", "16"))
+DENSE_STD_RATIO = float(os.getenv("DENSE_STD_RATIO", "2.0"))
+DENSE_MIN_NEIGHBORS = int(os.getenv("DENSE_MIN_NEIGHBORS", "4"))
+DENSE_RADIUS_SCALE = float(os.getenv("DENSE_RADIUS_SCALE", "3.0"))
+
+# Camera pose estimation: "accurate" matches SIFT features and chains
+# essential-matrix poses, "fast" solves PnP of every view's landmarks
+# against a face model built from the landmarks themselves (no SIFT)
+RECONSTRUCTION_MODES = ("accurate", "fast")
+
+
+@dataclass(frozen=True)
+class QualityTier:
+    """Per-stage budgets of one quality level"""
+    name: str
+    image_max_side: int  # working resolution of the input views, 0 = as decoded
+    sift_features: int
+    flann_checks: int
+    sift_max_side: int  # 0 = no cap
+    smoothing_iterations: int
+    texture_size: int
+
+
+# From cheapest to most expensive; "standard" matches the untiered pipeline
+QUALITY_TIERS = {tier.name: tier for tier in (
+    QualityTier("draft", image_max_side=640, sift_features=1000, flann_checks=16,
+                sift_max_side=512, smoothing_iterations=1, texture_size=256),
+    QualityTier("standard", image_max_side=RECONSTRUCTION_MAX_SIDE, sift_features=5000, flann_checks=50,
+                sift_max_side=SIFT_MAX_SIDE, smoothing_iterations=3, texture_size=1024),
+    QualityTier("high", image_max_side=RECONSTRUCTION_MAX_SIDE, sift_features=8000, flann_checks=128,
+                sift_max_side=0, smoothing_iterations=5, texture_size=2048),
+)}
+QUALITY_LEVELS = tuple(QUALITY_TIERS)
+
+# With a deadline, each stage should be done once this fraction of it has
+# elapsed. A stage runs at the highest tier (up to the requested one) whose
+# recent cost in this process still fits, so it is downgraded when earlier
+# stages overran, and at draft once its checkpoint has passed.
+QUALITY_CHECKPOINTS = {"input": 1.0, "structure": 0.5, "mesh": 0.6, "texture": 0.9}
+# Weight of the latest run in the per-process mean cost of a stage and tier
+STAGE_COST_SMOOTHING = 0.3
+
+# (stage, tier name) -> exponentially weighted mean seconds
+_stage_costs: Dict[Tuple[str, str], float] = {}
+
+# Working-set model behind estimate_working_set, in bytes: SIFT builds a
+# float32 scale-space pyramid of its input upsampled 2x; texture baking
+# keeps the face map and texture per texel plus the float32 arrays of one
+# band of TextureMapper.BAKE_ROWS rows
+SIFT_BYTES_PER_PIXEL = 240
+TEXTURE_BYTES_PER_TEXEL = 7
+BAKE_BYTES_PER_BAND_TEXEL = 112
+
+
+def record_stage_cost(stage: str, tier: QualityTier, seconds: float) -> None:
+    """Fold one measured stage duration into the mean cost used by QualityBudget.tier"""
+    key = (stage, tier.name)
+    previous = _stage_costs.get(key)
+    _stage_costs[key] = seconds if previous is None else previous + STAGE_COST_SMOOTHING * (seconds - previous)
+
+
+@dataclass
+class QualityBudget:
+    """
+    Requested quality tier and optional deadline of one request
+    Times are time.time() timestamps so the budget keeps its meaning when
+    it is pickled to process workers.
+    """
+    quality: str = "standard"
+    started: float = field(default_factory=time.time)
+    deadline: Optional[float] = None
+
+    @classmethod
+    def for_request(cls, quality: str, deadline_ms: Optional[int] = None,
+                    started: Optional[float] = None) -> "QualityBudget":
+        """Budget whose deadline is deadline_ms after started (default: now)"""
+        started = time.time() if started is None else started
+        deadline = started + deadline_ms / 1000.0 if deadline_ms else None
+        return cls(quality, started, deadline)
+
+    def tier(self, stage: str) -> QualityTier:
+        """Tier the given stage (a QUALITY_CHECKPOINTS key) should run at now"""
+        level = QUALITY_LEVELS.index(self.quality)
+        if self.deadline is not None:
+            now = time.time()
+            due = self.started + QUALITY_CHECKPOINTS[stage] * (self.deadline - self.started)
+            # Stages without a measured cost yet are assumed to fit
+            while level > 0 and now + _stage_costs.get((stage, QUALITY_LEVELS[level]), 0.0) > due:
+                level -= 1
+        return QUALITY_TIERS[QUALITY_LEVELS[level]]
+
+
+def lowest_quality(*tiers: Optional[str]) -> Optional[str]:
+    """Cheapest of the given tier names, ignoring None"""
+    return min((t for t in tiers if t is not None), key=QUALITY_LEVELS.index, default=None)
+
+
+@dataclass
+class FaceLandmarks:
+    """
+    Landmarks of one detected face held as a float32 (N, 3) array in pixel
+    coordinates. Dicts are only built at the JSON boundary by to_dict().
+    """
+    points: np.ndarray
+    confidence: float
+    bounding_box: Dict[str, float]
+    pose_angles: Dict[str, float]  # yaw, pitch, roll
+    image_size: Optional[Dict[str, int]] = None  # width, height of the analysed image
+
+    def key_points_2d(self, indices: np.ndarray = KEY_LANDMARK_INDICES) -> np.ndarray:
+        """(K, 2) image coordinates of the requested landmarks that exist in this mesh"""
+        indices = indices[indices < len(self.points)]
+        return self.points[indices, :2]
+
+    def to_dict(self, compact: bool = False) -> Dict[str, Any]:
+        """
+        JSON-ready representation
+        Compact mode returns landmarks as [x, y, z] rows instead of dicts
+        """
+        if compact:
+            landmarks = self.points.tolist()
+        else:
+            landmarks = [
+                {"x": x, "y": y, "z": z} for x, y, z in self.points.tolist()
+            ]
+        return {
+            "landmarks": landmarks,
+            "confidence": self.confidence,
+            "bounding_box": self.bounding_box,
+            "pose_angles": self.pose_angles,
+            "image_size": self.image_size,
+        }
+
+
+def detect_face_landmarks(image: np.ndarray) -> Optional[FaceLandmarks]:
+    """
+    Detect face landmarks using MediaPipe Face Mesh
+    Returns landmarks, confidence, bounding box, and pose angles.
+    Results (including "no face") are looked up in and saved to the
+    artifact store, so a resubmitted image skips FaceMesh entirely.
+    """
+    store = get_artifact_store()
+    if store is None:
+        return _detect_face_landmarks(image)
+
+    pool = current_face_mesh_pool()
+    key = artifact_key(image_digest(image), {"stage": "face_mesh", "pose": POSE_VERSION, **pool.options})
+    cached = store.get("landmarks", key)
+    if cached is not None:
+        arrays, meta = cached
+        if not meta["face"]:
+            return None
+        return FaceLandmarks(
+            points=arrays["points"],
+            confidence=meta["confidence"],
+            bounding_box=meta["bounding_box"],
+            pose_angles=meta["pose_angles"],
+            image_size=meta["image_size"],
+        )
+
+    result = _detect_face_landmarks(image)
+    if result is None:
+        store.put("landmarks", key, {}, {"face": False})
+    else:
+        store.put("landmarks", key, {"points": result.points}, {
+            "face": True,
+            "confidence": result.confidence,
+            "bounding_box": result.bounding_box,
+            "pose_angles": result.pose_angles,
+            "image_size": result.image_size,
+        })
+    return result
+
+
+def _detect_face_landmarks(image: np.ndarray) -> Optional[FaceLandmarks]:
+    # The image is RGB as produced by ingest.decode_image, which is what
+    # MediaPipe expects, so it is passed through without a copy
+    with current_face_mesh_pool().acquire() as face_mesh, timed("face_mesh"):
+        results = face_mesh.process(image)
+    return _face_landmarks(results, image.shape[:2])
+
+
+def _face_landmarks(results: Any, image_shape: Tuple[int, int]) -> Optional[FaceLandmarks]:
+    """FaceLandmarks of the first face in a FaceMesh result, None without a face"""
+    if not results.multi_face_landmarks:
+        return None
+
+    face_landmarks = results.multi_face_landmarks[0].landmark
+
+    # Extract landmarks (468 points, 478 with refined irises) as one array.
+    # z is relative to image width.
+    h, w = image_shape
+    points = np.fromiter(
+        (c for lm in face_landmarks for c in (lm.x, lm.y, lm.z)),
+        dtype=np.float32,
+        count=3 * len(face_landmarks),
+    ).reshape(-1, 3)
+    points *= np.array([w, h, w], dtype=np.float32)
+
+    # Calculate bounding box
+    x_min, y_min = points[:, :2].min(axis=0).tolist()
+    x_max, y_max = points[:, :2].max(axis=0).tolist()
+    bbox = {
+        "x_min": x_min,
+        "y_min": y_min,
+        "x_max": x_max,
+        "y_max": y_max,
+        "width": x_max - x_min,
+        "height": y_max - y_min,
+    }
+
+    # Estimate pose angles from key facial landmarks. Yaw is the turn of
+    # the outer eye corner line about the vertical axis and roll its tilt
+    # in the image; pitch is the angle of the nose tip below the eye centre
+    # less NEUTRAL_PITCH, so a frontal face reads as yaw 0 / pitch 0.
+    nose_tip = points[NOSE_TIP].astype(np.float64)
+    left_eye = points[LEFT_EYE].astype(np.float64)
+    right_eye = points[RIGHT_EYE].astype(np.float64)
+    eye_line = right_eye - left_eye
+    nose_offset = nose_tip - (left_eye + right_eye) / 2
+    # Depth of the nose in front of the eyes whichever way the head is turned
+    nose_depth = np.hypot(nose_offset[0], nose_offset[2])
+
+    # yaw (left-right), pitch (up-down) and roll (head tilt) in one call
+    yaw, pitch, roll = np.degrees(np.arctan2(
+        [eye_line[2], nose_offset[1], eye_line[1]],
+        [eye_line[0], nose_depth, eye_line[0]],
+    ))
+    pitch -= NEUTRAL_PITCH
+
+    # Confidence based on face detection
+    confidence = 0.9  # MediaPipe doesn't provide confidence, using default
+
+    return FaceLandmarks(
+        points=points,
+        confidence=confidence,
+        bounding_box=bbox,
+        pose_angles={
+            "yaw": float(yaw),
+            "pitch": float(pitch),
+            "roll": float(roll),
+        },
+        image_size={"width": w, "height": h},
+    )
+
+
+def select_keyframes(paths: List[str], is_sequence: bool) -> Dict[str, Any]:
+    """
+    Video stage: tracks the face through every frame with FaceMesh in
+    tracking mode and keeps a pose-spread set of sharp keyframes
+    Frames are decoded one at a time; only the per-pose-cell candidates of
+    KeyframeSelector stay in memory. Returns the keyframe images with
+    their landmarks, per-keyframe metadata and frame counts.
+    """
+    selector = KeyframeSelector()
+    frames = 0
+    tracked = 0
+    with current_tracking_pool().acquire() as face_mesh:
+        # Tracking state must not carry over from the previous video
+        face_mesh.reset()
+        for index, frame in enumerate(iter_frames(paths, is_sequence)):
+            frames += 1
+            with timed("face_tracking"):
+                results = face_mesh.process(frame)
+            landmarks = _face_landmarks(results, frame.shape[:2])
+            if landmarks is None:
+                continue
+            tracked += 1
+            selector.offer(Keyframe(index, frame, landmarks, face_sharpness(frame, landmarks.bounding_box)))
+
+    keyframes = selector.select()
+    return {
+        "images": [k.image for k in keyframes],
+        "landmarks": [k.landmarks for k in keyframes],
+        "keyframes": [
+            {"frame": k.index, "yaw": k.pose[0], "pitch": k.pose[1], "sharpness": k.sharpness}
+            for k in keyframes
+        ],
+        "frames": frames,
+        "frames_with_face": tracked,
+    }
+
+
+def basic_points(landmarks: FaceLandmarks) -> np.ndarray:
+    """Fallback point set taken straight from the first detected landmarks"""
+    return landmarks.points[:10]
+
+
+def estimate_structure(images: List[np.ndarray],
+                       landmarks_list: List[Optional[FaceLandmarks]],
+                       dense: bool = False,
+                       mode: str = "accurate",
+                       budget: Optional[QualityBudget] = None) -> Dict[str, Any]:
+    """
+    SfM stage: camera poses and landmark triangulation
+    landmarks_list is aligned with images, with None where no face was found.
+    Failures are reported as warnings with the basic point fallback, in
+    which case camera_matrices is None. point_indices holds the landmark
+    index of every estimated point. With dense, the RANSAC-inlier SIFT
+    matches are also triangulated into the filtered dense_points cloud.
+    Views that cannot be posed get a None camera matrix and are left out of
+    triangulation and texturing. mode="fast" poses the cameras from the
+    landmarks alone, skipping SIFT, and ignores dense.
+    The SIFT/FLANN budgets come from budget's "structure" tier, reported
+    under quality.
+    """
+    estimated_3d_points = None
+    point_indices = None
+    dense_points = None
+    camera_matrices = None
+    warnings = []
+
+    if mode not in RECONSTRUCTION_MODES:
+        raise ValueError(f"Unknown reconstruction mode: {mode}")
+    tier = (budget or QualityBudget()).tier("structure")
+
+    try:
+        sfm = current_sfm()
+
+        if mode == "fast":
+            # Landmark PnP against the most frontal view's camera frame
+            if dense:
+                warnings.append("Dense point cloud requires mode=accurate, skipped")
+            reference = min(
+                (i for i, lm in enumerate(landmarks_list) if lm is not None),
+                key=lambda i: np.hypot(landmarks_list[i].pose_angles["yaw"], landmarks_list[i].pose_angles["pitch"])
+            )
+            with timed("pnp"):
+                camera_matrices = sfm.estimate_landmark_poses(
+                    images,
+                    [lm.points[:CANONICAL_VERTEX_COUNT] if lm is not None else None for lm in landmarks_list],
+                    reference
+                )
+        else:
+            start = time.perf_counter()
+            # Detect and match features on the face regions
+            face_boxes = None
+            if SIFT_FACE_ROI:
+                face_boxes = [lm.bounding_box if lm is not None else None for lm in landmarks_list]
+            matches_data = sfm.detect_and_match_features(
+                images,
+                face_boxes=face_boxes,
+                roi_margin=SIFT_ROI_MARGIN,
+                max_side=tier.sift_max_side or None,
+                pose_angles=[lm.pose_angles if lm is not None else None for lm in landmarks_list],
+                nfeatures=tier.sift_features,
+                flann_checks=tier.flann_checks
+            )
+
+            # Estimate camera poses
+            camera_matrices = sfm.estimate_camera_poses(images, matches_data)
+            unposed = sum(P is None for P in camera_matrices)
+            if unposed:
+                warnings.append(
+                    f"{unposed} views could not be matched to the first view and were dropped"
+                )
+
+            if dense:
+                try:
+                    dense_points = dense_point_cloud(sfm, matches_data, camera_matrices)
+                except Exception as e:
+                    warnings.append(f"Dense point cloud failed: {str(e)}")
+            # Keypoints and descriptors are not needed past this point
+            del matches_data
+            record_stage_cost("structure", tier, time.perf_counter() - start)
+
+        # Extract landmark points for triangulation from every posed view with a face
+        # Use MediaPipe landmarks as correspondences (already in pixel coordinates)
+        if MESH_TOPOLOGY == "canonical":
+            indices = np.arange(CANONICAL_VERTEX_COUNT)
+        else:
+            indices = KEY_LANDMARK_INDICES
+        landmark_points_2d = []
+        view_matrices = []
+        for lm, P in zip(landmarks_list, camera_matrices):
+            if lm is not None and P is not None:
+                landmark_points_2d.append(lm.key_points_2d(indices))
+                view_matrices.append(P)
+
+        # Triangulate 3D points over all views, dropping badly reprojected points
+        if len(landmark_points_2d) >= 2:
+            with timed("triangulation"):
+                points_3d, errors = sfm.triangulate_dlt(landmark_points_2d, view_matrices)
+            kept = errors <= MAX_REPROJECTION_ERROR
+            estimated_3d_points = points_3d[kept]
+            point_indices = indices[kept]
+            dropped = len(kept) - int(kept.sum())
+            if dropped:
+                warnings.append(
+                    f"Dropped {dropped} triangulated points with reprojection error above {MAX_REPROJECTION_ERROR}px"
+                )
+
+    except Exception as e:
+        warnings.append(f"Advanced reconstruction failed, using basic method: {str(e)}")
+        # Fallback to simple approach
+        estimated_3d_points = basic_points(next(lm for lm in landmarks_list if lm is not None))
+        point_indices = None
+        camera_matrices = None
+
+    return {
+        "estimated_3d_points": estimated_3d_points,
+        "point_indices": point_indices,
+        "dense_points": dense_points,
+        "camera_matrices": camera_matrices,
+        "quality": tier.name,
+        "warnings": warnings,
+    }
+
+
+def dense_point_cloud(sfm: StructureFromMotion, matches_data: Dict[str, Any],
+                      camera_matrices: List[np.ndarray]) -> np.ndarray:
+    """
+    Triangulates every RANSAC-inlier feature track and removes statistical
+    and radius outliers (cKDTree neighbourhoods). Returns float32 (N, 3).
+    """
+    with timed("dense_triangulation"):
+        cloud = sfm.triangulate_matches(
+            matches_data,
+            camera_matrices,
+            max_reprojection_error=MAX_REPROJECTION_ERROR
+        )
+    with timed("dense_filter"):
+        cloud = cloud[MeshOptimizer.statistical_outlier_mask(cloud, DENSE_NEIGHBORS, DENSE_STD_RATIO)]
+        cloud = cloud[MeshOptimizer.radius_outlier_mask(
+            cloud,
+            min_neighbors=DENSE_MIN_NEIGHBORS,
+            radius_scale=DENSE_RADIUS_SCALE
+        )]
+    return cloud.astype(np.float32)
+
+
+def build_mesh(points_3d: np.ndarray,
+               point_indices: Optional[np.ndarray] = None,
+               budget: Optional[QualityBudget] = None) -> Dict[str, Any]:
+    """
+    Meshing stage
+    With MESH_TOPOLOGY=canonical and the landmark index of every point, the
+    points become vertices of the shared FaceMesh topology (UVs included).
+    Otherwise, or when too few landmarks survived triangulation: outlier
+    removal, Delaunay triangulation and smoothing. Smoothing iterations
+    come from budget's "mesh" tier, reported under quality.
+    """
+    tier = (budget or QualityBudget()).tier("mesh")
+    start = time.perf_counter()
+    warnings = []
+    if MESH_TOPOLOGY == "canonical" and point_indices is not None:
+        covered = np.count_nonzero(np.asarray(point_indices) < CANONICAL_VERTEX_COUNT)
+        if covered >= MIN_LANDMARK_COVERAGE * CANONICAL_VERTEX_COUNT:
+            result = _build_canonical_mesh(points_3d, point_indices, tier)
+            record_stage_cost("mesh", tier, time.perf_counter() - start)
+            return result
+        warnings.append(
+            f"Only {covered} of {CANONICAL_VERTEX_COUNT} landmarks triangulated, using Delaunay meshing"
+        )
+
+    mesh_vertices = None
+    mesh_faces = None
+
+    try:
+        # Remove outliers
+        points_3d_array = MeshOptimizer.remove_outliers(np.asarray(points_3d))
+
+        # Create Delaunay triangulation (2D projection for mesh generation)
+        # Project to 2D plane for triangulation
+        if len(points_3d_array) >= 4:  # Delaunay requires at least 4 points
+            points_2d_proj = points_3d_array[:, [0, 1]]  # Use X-Y plane
+            from scipy.spatial import Delaunay
+            with timed("delaunay"):
+                tri = Delaunay(points_2d_proj)
+
+            # Get mesh faces
+            faces = tri.simplices
+
+            # Apply mesh smoothing
+            with timed("smoothing"):
+                mesh_vertices = MeshOptimizer.laplacian_smoothing(
+                    points_3d_array,
+                    faces,
+                    iterations=tier.smoothing_iterations,
+                    lambda_factor=0.3
+                )
+            mesh_faces = faces
+        else:
+            warnings.append(f"Insufficient points for mesh generation: {len(points_3d_array)}")
+
+    except Exception as e:
+        warnings.append(f"Mesh generation failed: {str(e)}")
+
+    record_stage_cost("mesh", tier, time.perf_counter() - start)
+    return {
+        "mesh_vertices": mesh_vertices,
+        "mesh_faces": mesh_faces,
+        "mesh_uvs": None,
+        "quality": tier.name,
+        "warnings": warnings,
+    }
+
+
+def _build_canonical_mesh(points_3d: np.ndarray, point_indices: np.ndarray,
+                          tier: QualityTier) -> Dict[str, Any]:
+    """Scatters triangulated landmarks into the canonical mesh and smooths it"""
+    topology = get_face_topology()
+    result = {"mesh_vertices": None, "mesh_faces": None, "mesh_uvs": None, "quality": tier.name, "warnings": []}
+
+    try:
+        point_indices = np.asarray(point_indices)
+        inside = point_indices < topology.n_vertices
+        vertices = np.zeros((topology.n_vertices, 3))
+        valid = np.zeros(topology.n_vertices, dtype=bool)
+        vertices[point_indices[inside]] = np.asarray(points_3d)[inside]
+        valid[point_indices[inside]] = True
+        with timed("mesh_fill"):
+            vertices = topology.fill(vertices, valid)
+
+        with timed("smoothing"):
+            result["mesh_vertices"] = MeshOptimizer.laplacian_smoothing(
+                vertices,
+                topology.faces,
+                iterations=tier.smoothing_iterations,
+                lambda_factor=0.3,
+                topology=topology.mesh
+            )
+        result["mesh_faces"] = topology.faces
+        result["mesh_uvs"] = topology.uvs
+    except Exception as e:
+        result["warnings"].append(f"Mesh generation failed: {str(e)}")
+
+    return result
+
+
+def bake_mesh_texture(images: List[np.ndarray],
+                      mesh_vertices: np.ndarray,
+                      mesh_faces: np.ndarray,
+                      camera_matrices: List[np.ndarray],
+                      mesh_uvs: Optional[np.ndarray] = None,
+                      budget: Optional[QualityBudget] = None) -> Dict[str, Any]:
+    """
+    Texturing stage: bakes every posed view (camera matrix not None) into
+    the UV layout (mesh_uvs, or a generated one when None) and encodes it
+    as JPEG. The texture size comes from budget's "texture" tier.
+    """
+    tier = (budget or QualityBudget()).tier("texture")
+    texture_jpeg = None
+    warnings = []
+
+    try:
+        start = time.perf_counter()
+        posed = [(image, P) for image, P in zip(images, camera_matrices) if P is not None]
+        with timed("texture_bake"):
+            texture, mesh_uvs = TextureMapper.bake_texture(
+                [image for image, _ in posed],
+                mesh_vertices,
+                mesh_faces,
+                [P for _, P in posed],
+                texture_size=tier.texture_size,
+                uvs=mesh_uvs
+            )
+
+        # Encode texture as JPEG (OpenCV encodes BGR, the pipeline is RGB;
+        # the texture is converted in place as nothing else uses it)
+        with timed("texture_encode"):
+            _, buffer = cv2.imencode('.jpg', cv2.cvtColor(texture, cv2.COLOR_RGB2BGR, dst=texture))
+        texture_jpeg = buffer.tobytes()
+        record_stage_cost("texture", tier, time.perf_counter() - start)
+    except Exception as e:
+        warnings.append(f"Texture baking failed: {str(e)}")
+
+    return {
+        "mesh_uvs": mesh_uvs,
+        "texture_jpeg": texture_jpeg,
+        "quality": tier.name,
+        "warnings": warnings,
+    }
+
+
+def reconstruct_mesh(images: List[np.ndarray],
+                     landmarks_list: List[Optional[FaceLandmarks]],
+                     dense: bool = False,
+                     mode: str = "accurate",
+                     budget: Optional[QualityBudget] = None) -> Dict[str, Any]:
+    """
+    Advanced 3D reconstruction using SfM and triangulation
+    Runs estimate_structure, build_mesh and bake_mesh_texture in one call.
+    quality is the lowest tier any of them ran at under budget.
+    Geometry is returned as NumPy arrays and the texture as JPEG bytes;
+    conversion to the wire format happens in the response encoders.
+    """
+    structure = estimate_structure(images, landmarks_list, dense, mode, budget)
+    result = {
+        "estimated_3d_points": structure["estimated_3d_points"],
+        "dense_points": structure["dense_points"],
+        "mesh_vertices": None,
+        "mesh_faces": None,
+        "mesh_uvs": None,
+        "texture_jpeg": None,
+        "quality": structure["quality"],
+        "warnings": structure["warnings"],
+    }
+
+    points = structure["estimated_3d_points"]
+    if structure["camera_matrices"] is None or points is None or len(points) <= 3:
+        return result
+
+    mesh = build_mesh(points, structure["point_indices"], budget)
+    result["mesh_vertices"] = mesh["mesh_vertices"]
+    result["mesh_faces"] = mesh["mesh_faces"]
+    result["quality"] = lowest_quality(result["quality"], mesh["quality"])
+    result["warnings"] += mesh["warnings"]
+
+    if mesh["mesh_vertices"] is not None:
+        texture = bake_mesh_texture(
+            images,
+            mesh["mesh_vertices"],
+            mesh["mesh_faces"],
+            structure["camera_matrices"],
+            mesh["mesh_uvs"],
+            budget
+        )
+        result["mesh_uvs"] = texture["mesh_uvs"]
+        result["quality"] = lowest_quality(result["quality"], texture["quality"])
+        result["texture_jpeg"] = texture["texture_jpeg"]
+        result["warnings"] += texture["warnings"]
+
+    return result
+
+
+def estimate_input_bytes(views: int, tier: QualityTier) -> int:
+    """
+    Upper bound of the bytes of views decoded at tier's input resolution
+    Known before anything is fetched. Without any side cap each view is
+    bounded by IMAGE_MAX_PIXELS; 0 only when that limit is off too.
+    """
+    return views * _view_bytes(tier.image_max_side)
+
+
+def estimate_keyframe_bytes() -> int:
+    """
+    Upper bound of the frames select_keyframes holds at once: every
+    KeyframeSelector candidate, the one just offered and the frame being
+    tracked, at VIDEO_MAX_SIDE
+    """
+    return (max(VIDEO_MAX_CANDIDATES, VIDEO_MAX_KEYFRAMES) + 2) * _view_bytes(VIDEO_MAX_SIDE)
+
+
+def _view_bytes(max_side: int) -> int:
+    """Bytes of one RGB view decoded at most max_side (and IMAGE_MAX_SIDE) on its longest side"""
+    side = min((s for s in (max_side, IMAGE_MAX_SIDE) if s > 0), default=0)
+    return side * side * 3 if side else IMAGE_MAX_PIXELS * 3
+
+
+def estimate_working_set(images: List[np.ndarray],
+                         landmarks_list: List[Optional[FaceLandmarks]],
+                         mode: str = "accurate",
+                         budget: Optional[QualityBudget] = None) -> int:
+    """
+    Estimated peak bytes of reconstruct_mesh on these views
+    Counts the views themselves, SIFT on the largest face region (views
+    are processed one at a time; fast mode runs no SIFT) and texture
+    baking, at the requested tier of budget before any deadline downgrade.
+    """
+    tier = QUALITY_TIERS[(budget or QualityBudget()).quality]
+    total = sum(image.nbytes for image in images)
+    if mode == "accurate":
+        total += SIFT_BYTES_PER_PIXEL * max(
+            (_sift_pixels(image, lm, tier.sift_max_side) for image, lm in zip(images, landmarks_list)),
+            default=0
+        )
+    size = tier.texture_size
+    total += size * size * TEXTURE_BYTES_PER_TEXEL + TextureMapper.BAKE_ROWS * size * BAKE_BYTES_PER_BAND_TEXEL
+    return total
+
+
+def _sift_pixels(image: np.ndarray, landmarks: Optional[FaceLandmarks], max_side: int) -> int:
+    """Pixel count SIFT runs on for one view, mirroring StructureFromMotion._compute_features"""
+    h, w = image.shape[:2]
+    if SIFT_FACE_ROI and landmarks is not None:
+        box = landmarks.bounding_box
+        w = min(box["width"] * (1 + 2 * SIFT_ROI_MARGIN), w)
+        h = min(box["height"] * (1 + 2 * SIFT_ROI_MARGIN), h)
+    if max_side and max(h, w) > max_side:
+        scale = max_side / max(h, w)
+        h, w = h * scale, w * scale
+    return int(h * w)
+
+
+def warm_up() -> Dict[str, float]:
+    """
+    Startup pass through the per-worker models
+    Runs a synthetic textured frame through FaceMesh and SIFT/FLANN, builds
+    the canonical mesh topology and runs a small point cloud through
+    Delaunay and smoothing, so graph start-up and first-call initialisation
+    happen before the first request. The artifact
+    store is bypassed. Returns the seconds spent per step.
+    """
+    rng = np.random.default_rng(0)
+    image = cv2.GaussianBlur(rng.integers(0, 256, (256, 256, 3), dtype=np.uint8), (0, 0), 1.5)
+    timings = {}
+
+    start = time.perf_counter()
+    current_face_mesh_pool().warm_up(image)
+    timings["face_mesh"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sfm = current_sfm()
+    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    _, des1 = sfm.sift.detectAndCompute(gray, None)
+    _, des2 = sfm.sift.detectAndCompute(np.roll(gray, 8, axis=1), None)
+    sfm._match_pair(des1, des2)
+    timings["sift"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    get_face_topology()
+    timings["topology"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    from scipy.spatial import Delaunay
+    points = rng.normal(size=(32, 3)) * 50
+    MeshOptimizer.laplacian_smoothing(points, Delaunay(points[:, :2]).simplices, iterations=1)
+    GPUAcceleration.is_cuda_available()
+    timings["mesh"] = time.perf_counter() - start
+    return timings
@@ -3,126 +3,573 @@ Advanced 3D Face Reconstruction Module
 Includes SfM, triangulation, mesh optimization, and texture mapping
 """
 
+import functools
+import hashlib
+import heapq
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import cv2
-from scipy.spatial import Delaunay
-from typing import List, Dict, Tuple, Optional
+from typing import TYPE_CHECKING, List, Dict, Tuple, Optional
 import warnings
 warnings.filterwarnings('ignore')
 
+from artifact_store import ArtifactStore, artifact_key, image_digest
+from metrics import timed
+
+# scipy is imported by the functions that use it, so importing this module
+# (at start-up and in every worker process) does not load it
+if TYPE_CHECKING:
+    import scipy.sparse as sp
+
 
 class StructureFromMotion:
     """
     Structure-from-Motion implementation for multi-view face reconstruction
     """
     
-    def __init__(self):
+    # Shared by all instances; OpenCV releases the GIL while matching
+    _match_executor: Optional[ThreadPoolExecutor] = None
+    _match_executor_lock = threading.Lock()
+    
+    def __init__(self, match_workers: int = 4, artifact_store: Optional[ArtifactStore] = None):
         # SIFT feature detector for matching
-        self.sift = cv2.SIFT_create(nfeatures=5000)
+        self.nfeatures = 5000
+        self.sift = cv2.SIFT_create(nfeatures=self.nfeatures)
+        # Detectors for other per-request feature budgets, created on first use
+        self._sifts = {self.nfeatures: self.sift}
         # FLANN matcher
         FLANN_INDEX_KDTREE = 1
-        index_params = dict(algorithm=FLANN_INDEX_KDTREE, trees=5)
-        search_params = dict(checks=50)
-        self.flann = cv2.FlannBasedMatcher(index_params, search_params)
+        self.index_params = dict(algorithm=FLANN_INDEX_KDTREE, trees=5)
+        self.search_params = dict(checks=50)
+        self.flann = cv2.FlannBasedMatcher(self.index_params, self.search_params)
+        self.match_workers = match_workers
+        # Optional store of SIFT results keyed by image content and parameters
+        self.artifact_store = artifact_store
     
-    def detect_and_match_features(self, images: List[np.ndarray]) -> List[Dict]:
+    @classmethod
+    def _get_match_executor(cls, workers: int) -> ThreadPoolExecutor:
+        with cls._match_executor_lock:
+            if cls._match_executor is None:
+                cls._match_executor = ThreadPoolExecutor(
+                    max_workers=workers,
+                    thread_name_prefix="flann-match",
+                )
+            return cls._match_executor
+    
+    @staticmethod
+    def select_view_pairs(pose_angles: List[Optional[Dict[str, float]]],
+                          neighbors: int = 2,
+                          max_angle: float = 45.0) -> List[Tuple[int, int]]:
+        """
+        Choose which views to match from their estimated yaw/pitch
+        Each view is paired with up to `neighbors` closest views within
+        max_angle degrees, plus the edges of a minimum spanning tree so the
+        match graph stays connected. Views without a pose fall back to
+        being paired with their upload neighbours.
+        """
+        n = len(pose_angles)
+        if n < 2:
+            return []
+        
+        known = [i for i, pose in enumerate(pose_angles) if pose is not None]
+        pairs = set()
+        
+        if len(known) >= 2:
+            angles = np.array([[pose_angles[i]["yaw"], pose_angles[i]["pitch"]] for i in known])
+            diff = angles[:, None, :] - angles[None, :, :]
+            diff = (diff + 180.0) % 360.0 - 180.0  # wrap to [-180, 180)
+            distance = np.linalg.norm(diff, axis=2)
+            np.fill_diagonal(distance, np.inf)
+            
+            # Nearest neighbours within the angular limit
+            nearest = np.argsort(distance, axis=1)[:, :neighbors]
+            for a, row in enumerate(nearest):
+                for b in row:
+                    if distance[a, b] <= max_angle:
+                        pairs.add((min(known[a], known[b]), max(known[a], known[b])))
+            
+            # Prim's minimum spanning tree keeps every view reachable
+            in_tree = np.zeros(len(known), dtype=bool)
+            in_tree[0] = True
+            best = distance[0].copy()
+            parent = np.zeros(len(known), dtype=int)
+            for _ in range(len(known) - 1):
+                candidate = np.where(in_tree, np.inf, best)
+                b = int(np.argmin(candidate))
+                a = int(parent[b])
+                pairs.add((min(known[a], known[b]), max(known[a], known[b])))
+                in_tree[b] = True
+                closer = distance[b] < best
+                best = np.where(closer, distance[b], best)
+                parent = np.where(closer, b, parent)
+        
+        # Views without a pose estimate are matched with their neighbours in upload order
+        for i in range(n):
+            if pose_angles[i] is None:
+                if i > 0:
+                    pairs.add((i - 1, i))
+                if i + 1 < n:
+                    pairs.add((i, i + 1))
+        
+        return sorted(pairs)
+    
+    def _sift_for(self, nfeatures: Optional[int]) -> cv2.SIFT:
+        """SIFT detector keeping at most nfeatures keypoints (None: the default)"""
+        nfeatures = nfeatures or self.nfeatures
+        sift = self._sifts.get(nfeatures)
+        if sift is None:
+            sift = self._sifts[nfeatures] = cv2.SIFT_create(nfeatures=nfeatures)
+        return sift
+    
+    def _match_pair(self, des1: Optional[np.ndarray], des2: Optional[np.ndarray],
+                    checks: Optional[int] = None) -> list:
+        """FLANN kNN match with Lowe's ratio test, checks overriding the default search effort"""
+        if des1 is None or des2 is None or len(des1) < 2 or len(des2) < 2:
+            return []
+        
+        # FlannBasedMatcher keeps per-call state, so each task builds its own
+        search_params = dict(checks=checks) if checks else self.search_params
+        matcher = cv2.FlannBasedMatcher(self.index_params, search_params)
+        matches = matcher.knnMatch(des1, des2, k=2)
+        
+        # Apply Lowe's ratio test
+        return [
+            pair[0] for pair in matches
+            if len(pair) == 2 and pair[0].distance < 0.7 * pair[1].distance
+        ]
+    
+    def detect_and_match_features(self, images: List[np.ndarray],
+                                  face_boxes: Optional[List[Optional[Dict[str, float]]]] = None,
+                                  roi_margin: float = 0.25,
+                                  max_side: Optional[int] = None,
+                                  pose_angles: Optional[List[Optional[Dict[str, float]]]] = None,
+                                  nfeatures: Optional[int] = None,
+                                  flann_checks: Optional[int] = None) -> List[Dict]:
         """
         Detect and match features across multiple images
-        Returns matched keypoints for each image pair
+        Returns matched keypoints for each image pair in 'pairs'/'matches'.
+        With face_boxes (bounding boxes from detect_face_landmarks, aligned
+        with images) SIFT only runs on the face region plus roi_margin, and
+        max_side caps the resolution fed to SIFT. Keypoint positions are
+        always reported in full-image coordinates under 'points'.
+        With pose_angles the pairs are chosen by select_view_pairs instead
+        of upload order, and all pairs are matched concurrently.
+        nfeatures and flann_checks override the SIFT keypoint budget and
+        the FLANN search effort for this call.
         """
         # Detect keypoints and descriptors for all images
         keypoints_list = []
         descriptors_list = []
+        points_list = []
         
-        for img in images:
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if len(img.shape) == 3 else img
-            kp, des = self.sift.detectAndCompute(gray, None)
-            keypoints_list.append(kp)
-            descriptors_list.append(des)
-        
-        # Match features between consecutive images
-        matches_list = []
-        for i in range(len(images) - 1):
-            if descriptors_list[i] is None or descriptors_list[i + 1] is None:
-                matches_list.append([])
-                continue
-            
-            matches = self.flann.knnMatch(descriptors_list[i], descriptors_list[i + 1], k=2)
-            
-            # Apply Lowe's ratio test
-            good_matches = []
-            for match_pair in matches:
-                if len(match_pair) == 2:
-                    m, n = match_pair
-                    if m.distance < 0.7 * n.distance:
-                        good_matches.append(m)
-            
-            matches_list.append(good_matches)
+        with timed("sift"):
+            for idx, img in enumerate(images):
+                box = face_boxes[idx] if face_boxes is not None else None
+                kp, des, points = self._detect_features(img, box, roi_margin, max_side, nfeatures)
+                keypoints_list.append(kp)
+                descriptors_list.append(des)
+                points_list.append(points)
+        
+        # Pick the view pairs worth matching
+        if pose_angles is not None:
+            pairs = self.select_view_pairs(pose_angles)
+        else:
+            pairs = [(i, i + 1) for i in range(len(images) - 1)]
+        
+        # Match all pairs concurrently
+        with timed("flann"):
+            if self.match_workers > 1 and len(pairs) > 1:
+                executor = self._get_match_executor(self.match_workers)
+                matches_list = list(executor.map(
+                    lambda pair: self._match_pair(descriptors_list[pair[0]], descriptors_list[pair[1]], flann_checks),
+                    pairs
+                ))
+            else:
+                matches_list = [
+                    self._match_pair(descriptors_list[i], descriptors_list[j], flann_checks) for i, j in pairs
+                ]
         
         return {
             'keypoints': keypoints_list,
+            'points': points_list,
+            'pairs': pairs,
             'matches': matches_list,
             'descriptors': descriptors_list
         }
     
-    def estimate_camera_poses(self, images: List[np.ndarray], matches_data: Dict) -> List[np.ndarray]:
+    def _detect_features(self, image: np.ndarray, box: Optional[Dict[str, float]],
+                         roi_margin: float, max_side: Optional[int],
+                         nfeatures: Optional[int] = None) -> Tuple[list, Optional[np.ndarray], np.ndarray]:
+        """
+        Run SIFT on the (optionally cropped and downscaled) image
+        Returns keypoints in working coordinates, descriptors, and an (N, 2)
+        array of keypoint positions mapped back to full-image coordinates.
+        With an artifact store, results for the same image and parameters
+        are read back instead of recomputed.
+        """
+        if self.artifact_store is None:
+            return self._compute_features(image, box, roi_margin, max_side, nfeatures)
+        
+        key = artifact_key(image_digest(image), {
+            "stage": "sift",
+            "nfeatures": nfeatures or self.nfeatures,
+            "box": [round(box[k], 2) for k in ("x_min", "y_min", "x_max", "y_max")] if box else None,
+            "roi_margin": roi_margin,
+            "max_side": max_side,
+        })
+        cached = self.artifact_store.get("sift", key)
+        if cached is not None:
+            arrays, _ = cached
+            packed = arrays["keypoints"]
+            kp = [
+                cv2.KeyPoint(float(x), float(y), float(size), float(angle), float(response), int(octave), int(class_id))
+                for x, y, size, angle, response, octave, class_id in packed
+            ]
+            des = arrays["descriptors"] if len(packed) else None
+            return kp, des, arrays["points"]
+        
+        kp, des, points = self._compute_features(image, box, roi_margin, max_side, nfeatures)
+        packed = np.array(
+            [(k.pt[0], k.pt[1], k.size, k.angle, k.response, k.octave, k.class_id) for k in kp],
+            dtype=np.float64
+        ).reshape(-1, 7)
+        self.artifact_store.put("sift", key, {
+            "keypoints": packed,
+            "descriptors": des if des is not None else np.empty((0, 128), dtype=np.float32),
+            "points": points,
+        })
+        return kp, des, points
+    
+    def _compute_features(self, image: np.ndarray, box: Optional[Dict[str, float]],
+                          roi_margin: float, max_side: Optional[int],
+                          nfeatures: Optional[int] = None) -> Tuple[list, Optional[np.ndarray], np.ndarray]:
+        h, w = image.shape[:2]
+        x0, y0 = 0, 0
+        if box is not None:
+            margin_x = box["width"] * roi_margin
+            margin_y = box["height"] * roi_margin
+            x0 = int(max(np.floor(box["x_min"] - margin_x), 0))
+            y0 = int(max(np.floor(box["y_min"] - margin_y), 0))
+            x1 = int(min(np.ceil(box["x_max"] + margin_x), w))
+            y1 = int(min(np.ceil(box["y_max"] + margin_y), h))
+            if x1 - x0 >= 16 and y1 - y0 >= 16:
+                image = image[y0:y1, x0:x1]
+            else:
+                x0, y0 = 0, 0
+        
+        # Crop before the colour conversion so only the ROI is copied
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY) if len(image.shape) == 3 else image
+        
+        scale = 1.0
+        if max_side and max(gray.shape[:2]) > max_side:
+            scale = max_side / max(gray.shape[:2])
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        
+        kp, des = self._sift_for(nfeatures).detectAndCompute(gray, None)
+        if len(kp) == 0:
+            return kp, des, np.empty((0, 2), dtype=np.float32)
+        
+        points = cv2.KeyPoint_convert(kp).astype(np.float32)
+        points /= scale
+        points += np.array([x0, y0], dtype=np.float32)
+        return kp, des, points
+    
+    def estimate_camera_poses(self, images: List[np.ndarray], matches_data: Dict) -> List[Optional[np.ndarray]]:
         """
         Estimate camera poses using epipolar geometry
-        Returns camera matrices (3x4) for each view
+        Returns camera matrices (3x4) for each view, None for views that
+        could not be chained to the first one. Relative poses of the matched pairs are chained outward from the
+        first view along the best-connected edges of the match graph. The
+        unknown scale of each new baseline is fixed from the depths of
+        keypoints already triangulated in the parent view. The RANSAC inliers
+        of every pair used are recorded in matches_data['inliers'] as
+        (view_a, view_b, keypoints_a, keypoints_b) for triangulate_matches.
         """
-        camera_matrices = []
+        n_views = len(images)
         
         # Assume first camera is at origin (identity)
         K = self._estimate_intrinsic_matrix(images[0])
-        P1 = K @ np.hstack([np.eye(3), np.zeros((3, 1))])
-        camera_matrices.append(P1)
-        
-        # Estimate poses for subsequent cameras
-        for i in range(len(images) - 1):
-            if len(matches_data['matches'][i]) < 8:
-                # Not enough matches, use identity
-                camera_matrices.append(P1.copy())
+        
+        # Match graph: view -> [(match count, neighbour, pair index)]
+        graph: Dict[int, List[Tuple[int, int, int]]] = {i: [] for i in range(n_views)}
+        for pair_idx, ((i, j), matches) in enumerate(zip(matches_data['pairs'], matches_data['matches'])):
+            if len(matches) >= 8:
+                graph[i].append((len(matches), j, pair_idx))
+                graph[j].append((len(matches), i, pair_idx))
+        
+        poses: Dict[int, Tuple[np.ndarray, np.ndarray]] = {0: (np.eye(3), np.zeros((3, 1)))}
+        inliers = matches_data['inliers'] = []
+        # Per posed view: keypoint index -> depth in that camera's frame
+        depths: Dict[int, Dict[int, float]] = {0: {}}
+        
+        # Maximum spanning tree by match count (Prim), rooted at view 0
+        frontier = [(-count, 0, neighbour, pair_idx) for count, neighbour, pair_idx in graph[0]]
+        heapq.heapify(frontier)
+        while frontier:
+            _, parent, child, pair_idx = heapq.heappop(frontier)
+            if child in poses:
                 continue
             
-            # Extract matched points
-            kp1 = matches_data['keypoints'][i]
-            kp2 = matches_data['keypoints'][i + 1]
-            matches = matches_data['matches'][i]
-            
-            pts1 = np.float32([kp1[m.queryIdx].pt for m in matches]).reshape(-1, 1, 2)
-            pts2 = np.float32([kp2[m.trainIdx].pt for m in matches]).reshape(-1, 1, 2)
+            with timed("pose"):
+                relative = self._relative_pose(K, matches_data, pair_idx, parent)
+            if relative is None:
+                continue
+            R_rel, t_rel, parent_idx, child_idx, parent_depth, child_depth = relative
+            inliers.append((parent, child, parent_idx, child_idx))
             
-            # Find essential matrix
-            E, mask = cv2.findEssentialMat(pts1, pts2, K, method=cv2.RANSAC, prob=0.999, threshold=1.0)
+            # Scale the unit baseline so shared keypoints keep the depth
+            # they already have in the parent view
+            known = depths[parent]
+            ratios = [
+                known[k] / d for k, d in zip(parent_idx.tolist(), parent_depth.tolist())
+                if k in known and d > 0
+            ]
+            scale = float(np.median(ratios)) if ratios else 1.0
             
-            # Recover pose
-            _, R, t, mask_pose = cv2.recoverPose(E, pts1, pts2, K)
+            R_parent, t_parent = poses[parent]
+            poses[child] = (R_rel @ R_parent, R_rel @ t_parent + scale * t_rel)
+            for k, d in zip(parent_idx.tolist(), (scale * parent_depth).tolist()):
+                known.setdefault(k, d)
+            depths[child] = dict(zip(child_idx.tolist(), (scale * child_depth).tolist()))
             
-            # Camera matrix for this view
-            P = K @ np.hstack([R, t])
-            camera_matrices.append(P)
+            for count, neighbour, next_pair in graph[child]:
+                if neighbour not in poses:
+                    heapq.heappush(frontier, (-count, child, neighbour, next_pair))
+        
+        camera_matrices: List[Optional[np.ndarray]] = []
+        for i in range(n_views):
+            if i not in poses:
+                # Not connected to the reference view, left unposed
+                camera_matrices.append(None)
+                continue
+            R, t = poses[i]
+            camera_matrices.append(K @ np.hstack([R, t]))
         
         return camera_matrices
     
+    def _relative_pose(self, K: np.ndarray, matches_data: Dict, pair_idx: int,
+                       source: int) -> Optional[Tuple[np.ndarray, ...]]:
+        """
+        Essential-matrix pose of the other view of a pair relative to `source`
+        Returns R, unit t, the RANSAC-inlier keypoint indices in both views
+        and their triangulated depths in both camera frames (unit baseline)
+        """
+        i, j = matches_data['pairs'][pair_idx]
+        matches = matches_data['matches'][pair_idx]
+        idx_i = np.array([m.queryIdx for m in matches])
+        idx_j = np.array([m.trainIdx for m in matches])
+        if source != i:
+            i, j, idx_i, idx_j = j, i, idx_j, idx_i
+        
+        # Extract matched points (full-image coordinates)
+        pts1 = matches_data['points'][i][idx_i].reshape(-1, 1, 2)
+        pts2 = matches_data['points'][j][idx_j].reshape(-1, 1, 2)
+        
+        # Find essential matrix
+        E, mask = cv2.findEssentialMat(pts1, pts2, K, method=cv2.RANSAC, prob=0.999, threshold=1.0)
+        if E is None or E.shape != (3, 3):
+            return None
+        
+        # Recover pose
+        _, R, t, mask_pose = cv2.recoverPose(E, pts1, pts2, K, mask=mask)
+        inliers = mask_pose.ravel() > 0
+        if inliers.sum() < 5:
+            return None
+        
+        # Triangulate the inliers with the unit baseline to get their depths
+        X = cv2.triangulatePoints(
+            K @ np.hstack([np.eye(3), np.zeros((3, 1))]),
+            K @ np.hstack([R, t]),
+            pts1[inliers].reshape(-1, 2).T.astype(np.float64),
+            pts2[inliers].reshape(-1, 2).T.astype(np.float64)
+        )
+        X = X[:3] / X[3]
+        depth_i = X[2]
+        depth_j = (R @ X + t)[2]
+        
+        return R, t, idx_i[inliers], idx_j[inliers], depth_i, depth_j
+    
+    def estimate_landmark_poses(self, images: List[np.ndarray],
+                                landmarks: List[Optional[np.ndarray]],
+                                reference: int = 0) -> List[Optional[np.ndarray]]:
+        """
+        Camera poses from face landmarks alone, without feature matching
+        landmarks holds one (N, 3) FaceMesh array per view (pixels, z
+        relative to image width) or None. Every view's landmarks are lifted
+        into its camera frame with the estimated intrinsics, aligned to the
+        reference view by a similarity transform and averaged into one face
+        model, and each view is posed against that model with cv2.solvePnP.
+        Returns camera matrices (3x4) in the reference camera's frame, None
+        for views without landmarks or without a pose in front of the model.
+        """
+        shapes = {
+            i: self._lift_landmarks(lm, self._estimate_intrinsic_matrix(image))
+            for i, (image, lm) in enumerate(zip(images, landmarks)) if lm is not None
+        }
+        if reference not in shapes:
+            raise ValueError("Reference view has no landmarks")
+    
+        # Generalised Procrustes: align to the running mean, then bring the
+        # mean back into the reference camera's frame and scale
+        model = shapes[reference]
+        for _ in range(2):
+            model = np.mean([self._align(shape, model) for shape in shapes.values()], axis=0)
+        model = self._align(model, shapes[reference])
+    
+        camera_matrices: List[Optional[np.ndarray]] = [None] * len(images)
+        for i, lm in enumerate(landmarks):
+            if lm is None:
+                continue
+            K = self._estimate_intrinsic_matrix(images[i]).astype(np.float64)
+            image_points = np.ascontiguousarray(np.asarray(lm, dtype=np.float64)[:, :2])
+            ok, rvec, tvec = cv2.solvePnP(model, image_points, K, None, flags=cv2.SOLVEPNP_SQPNP)
+            if not ok:
+                continue
+            rvec, tvec = cv2.solvePnPRefineLM(model, image_points, K, None, rvec, tvec)
+            R, _ = cv2.Rodrigues(rvec)
+            if ((model @ R.T)[:, 2] + tvec[2, 0] <= 0).any():
+                continue
+            camera_matrices[i] = K @ np.hstack([R, tvec])
+    
+        return camera_matrices
+    
+    @staticmethod
+    def _lift_landmarks(landmarks: np.ndarray, K: np.ndarray) -> np.ndarray:
+        """
+        FaceMesh landmarks as 3D points in the camera frame
+        FaceMesh z is in pixels at the scale of x, which is one unit per
+        pixel at depth fx; points are back-projected at that depth plus z.
+        """
+        points = np.asarray(landmarks, dtype=np.float64)
+        fx, fy, cx, cy = K[0, 0], K[1, 1], K[0, 2], K[1, 2]
+        depth = fx + points[:, 2]
+        return np.stack([
+            (points[:, 0] - cx) * depth / fx,
+            (points[:, 1] - cy) * depth / fy,
+            depth
+        ], axis=1)
+    
+    @staticmethod
+    def _align(source: np.ndarray, target: np.ndarray) -> np.ndarray:
+        """source mapped onto target by the least-squares similarity transform (Umeyama)"""
+        mu_s, mu_t = source.mean(axis=0), target.mean(axis=0)
+        src, dst = source - mu_s, target - mu_t
+        U, S, Vt = np.linalg.svd(dst.T @ src / len(source))
+        D = np.diag([1.0, 1.0, np.sign(np.linalg.det(U) * np.linalg.det(Vt))])
+        R = U @ D @ Vt
+        scale = np.trace(np.diag(S) @ D) / (src ** 2).sum(axis=1).mean()
+        return scale * src @ R.T + mu_t
+    
+    def triangulate_matches(self, matches_data: Dict, camera_matrices: List[Optional[np.ndarray]],
+                            max_reprojection_error: Optional[float] = None) -> np.ndarray:
+        """
+        Dense point cloud from the RANSAC-inlier feature matches
+        The inliers recorded by estimate_camera_poses are chained into tracks
+        (connected components over (view, keypoint) nodes) and every track is
+        triangulated over all views it was seen in with one triangulate_dlt
+        call. Tracks that hit a view twice are dropped as inconsistent.
+        Views with a None camera matrix are left out.
+        """
+        inliers = matches_data.get('inliers') or []
+        if not inliers:
+            return np.empty((0, 3))
+        import scipy.sparse as sp
+        from scipy.sparse.csgraph import connected_components
+        
+        points = matches_data['points']
+        offsets = np.concatenate([[0], np.cumsum([len(p) for p in points])])
+        node_a = np.concatenate([offsets[a] + idx_a for a, _, idx_a, _ in inliers])
+        node_b = np.concatenate([offsets[b] + idx_b for _, b, _, idx_b in inliers])
+        graph = sp.coo_matrix(
+            (np.ones(len(node_a), dtype=np.int8), (node_a, node_b)),
+            shape=(offsets[-1], offsets[-1])
+        )
+        _, labels = connected_components(graph, directed=False)
+        
+        nodes = np.unique(np.concatenate([node_a, node_b]))
+        views = np.searchsorted(offsets, nodes, side='right') - 1
+        tracks, track_idx = np.unique(labels[nodes], return_inverse=True)
+        n_views = len(camera_matrices)
+        track_views, counts = np.unique(track_idx * n_views + views, return_counts=True)
+        conflicting = np.zeros(len(tracks), dtype=bool)
+        conflicting[track_views[counts > 1] // n_views] = True
+        
+        observations = np.full((n_views, len(tracks), 2), np.nan)
+        observations[views, track_idx] = np.concatenate(points)[nodes]
+        observations[:, conflicting] = np.nan
+        
+        posed = [i for i, P in enumerate(camera_matrices) if P is not None]
+        points_3d, errors = self.triangulate_dlt(
+            list(observations[posed]), [camera_matrices[i] for i in posed]
+        )
+        keep = np.isfinite(errors)
+        if max_reprojection_error is not None:
+            keep &= errors <= max_reprojection_error
+        return points_3d[keep]
+    
     def triangulate_points(self, points_2d_list: List[np.ndarray], 
-                          camera_matrices: List[np.ndarray]) -> np.ndarray:
+                          camera_matrices: List[np.ndarray],
+                          max_reprojection_error: Optional[float] = None) -> np.ndarray:
         """
         Triangulate 3D points from 2D correspondences across multiple views
+        Uses every view; points whose mean reprojection error exceeds
+        max_reprojection_error (pixels) are dropped
         """
         if len(points_2d_list) < 2:
             return np.array([])
         
-        # Use first two views for initial triangulation
-        points_3d = cv2.triangulatePoints(
-            camera_matrices[0], 
-            camera_matrices[1],
-            points_2d_list[0].T, 
-            points_2d_list[1].T
-        )
+        points_3d, errors = self.triangulate_dlt(points_2d_list, camera_matrices)
+        if max_reprojection_error is None:
+            return points_3d
+        return points_3d[errors <= max_reprojection_error]
+    
+    @staticmethod
+    def triangulate_dlt(points_2d_list: List[np.ndarray],
+                        camera_matrices: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Batched N-view linear (DLT) triangulation
+        points_2d_list holds one (M, 2) array per view with the same M points
+        in the same order; NaN rows mark points not visible in that view.
+        All M systems are solved with a single batched SVD. Returns the (M, 3)
+        points and their mean reprojection error in pixels (inf for points
+        seen by fewer than two views or behind a camera).
+        """
+        observations = np.stack([np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in points_2d_list])  # (V, M, 2)
+        projections = np.stack([np.asarray(P, dtype=np.float64) for P in camera_matrices])  # (V, 3, 4)
+        n_views, n_points = observations.shape[:2]
+        
+        visible = np.isfinite(observations).all(axis=2)  # (V, M)
+        obs = np.where(visible[..., None], observations, 0.0)
         
-        # Convert from homogeneous coordinates
-        points_3d = points_3d[:3] / points_3d[3]
-        return points_3d.T
+        # Two rows per view: x * P[2] - P[0] and y * P[2] - P[1]  ->  (M, 2V, 4)
+        rows_x = obs[..., 0:1] * projections[:, None, 2, :] - projections[:, None, 0, :]
+        rows_y = obs[..., 1:2] * projections[:, None, 2, :] - projections[:, None, 1, :]
+        A = np.stack([rows_x, rows_y], axis=1)  # (V, 2, M, 4)
+        A = A * visible[:, None, :, None]
+        A = A.transpose(2, 0, 1, 3).reshape(n_points, 2 * n_views, 4)
+        # Row normalisation keeps the system well conditioned with pixel coordinates
+        A = A / np.maximum(np.linalg.norm(A, axis=2, keepdims=True), 1e-12)
+        
+        _, _, vt = np.linalg.svd(A)
+        homogeneous = vt[:, -1, :]  # (M, 4)
+        w = homogeneous[:, 3:4]
+        points_3d = homogeneous[:, :3] / np.where(np.abs(w) < 1e-12, 1e-12, w)
+        
+        # Reproject into every view
+        points_h = np.hstack([points_3d, np.ones((n_points, 1))])
+        projected = np.einsum('vij,mj->vmi', projections, points_h)  # (V, M, 3)
+        depth = projected[..., 2]
+        reprojected = projected[..., :2] / np.where(np.abs(depth) < 1e-12, 1e-12, depth)[..., None]
+        residuals = np.linalg.norm(reprojected - obs, axis=2)
+        
+        n_visible = visible.sum(axis=0)
+        errors = np.where(visible, residuals, 0.0).sum(axis=0) / np.maximum(n_visible, 1)
+        in_front = ((depth > 0) | ~visible).all(axis=0)
+        errors = np.where((n_visible >= 2) & in_front, errors, np.inf)
+        
+        return points_3d, errors
     
     def _estimate_intrinsic_matrix(self, image: np.ndarray) -> np.ndarray:
         """
@@ -140,6 +587,103 @@ class StructureFromMotion:
         ], dtype=np.float32)
 
 
+class MeshTopology:
+    """
+    Vertex connectivity derived once from a face array.
+    Holds the directed edge list (two entries per triangle edge) and the
+    uniform neighbour-averaging operator as sparse matrices.
+    """
+    
+    def __init__(self, faces: np.ndarray, n_vertices: int):
+        import scipy.sparse as sp
+        faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+        self.faces = faces
+        self.n_vertices = n_vertices
+        
+        # Directed edges i -> j for every corner pair of every face
+        self.rows = faces[:, [0, 1, 1, 2, 2, 0]].ravel()
+        self.cols = faces[:, [1, 0, 2, 1, 0, 2]].ravel()
+        
+        adjacency = sp.csr_matrix(
+            (np.ones(len(self.rows)), (self.rows, self.cols)),
+            shape=(n_vertices, n_vertices)
+        )
+        # Collapse edges shared by two faces to a single neighbour entry
+        adjacency.data[:] = 1.0
+        self.adjacency = adjacency
+        self.uniform_operator = self._row_normalise(adjacency)
+    
+    def _row_normalise(self, weights: "sp.csr_matrix") -> "sp.csr_matrix":
+        """
+        Turn edge weights into an averaging operator W so that (W @ v)[i] is the
+        weighted mean of i's neighbours. Isolated vertices map to themselves.
+        """
+        import scipy.sparse as sp
+        row_sums = np.asarray(weights.sum(axis=1)).ravel()
+        isolated = row_sums <= 0
+        inv = np.where(isolated, 0.0, 1.0 / np.where(isolated, 1.0, row_sums))
+        return (sp.diags(inv) @ weights + sp.diags(isolated.astype(np.float64))).tocsr()
+    
+    def cotangent_operator(self, vertices: np.ndarray) -> "sp.csr_matrix":
+        """
+        Cotangent-weighted averaging operator for the given vertex positions
+        Negative weights (obtuse triangles) are clamped to zero for stability.
+        """
+        import scipy.sparse as sp
+        v = np.asarray(vertices, dtype=np.float64)
+        f = self.faces
+        cots = []
+        # For the edge opposite each corner, cot of that corner's angle
+        for corner, (a, b) in enumerate([(1, 2), (2, 0), (0, 1)]):
+            e1 = v[f[:, a]] - v[f[:, corner]]
+            e2 = v[f[:, b]] - v[f[:, corner]]
+            cross = np.linalg.norm(np.cross(e1, e2), axis=1)
+            cots.append((e1 * e2).sum(axis=1) / np.maximum(cross, 1e-12))
+        cot0, cot1, cot2 = cots
+        # Same edge order as self.rows/self.cols: (0,1),(1,0),(1,2),(2,1),(2,0),(0,2)
+        edge_weights = 0.5 * np.stack([cot2, cot2, cot0, cot0, cot1, cot1], axis=1).ravel()
+        edge_weights = np.maximum(edge_weights, 0.0)
+        
+        weights = sp.csr_matrix(
+            (edge_weights, (self.rows, self.cols)),
+            shape=(self.n_vertices, self.n_vertices)
+        )
+        return self._row_normalise(weights)
+    
+    def operator(self, vertices: np.ndarray, method: str = 'uniform') -> "sp.csr_matrix":
+        if method == 'uniform':
+            return self.uniform_operator
+        if method == 'cotangent':
+            return self.cotangent_operator(vertices)
+        raise ValueError(f"Unknown smoothing weights: {method}")
+
+
+_TOPOLOGY_CACHE_SIZE = 32
+_topology_cache: "OrderedDict[Tuple[int, bytes], MeshTopology]" = OrderedDict()
+_topology_lock = threading.Lock()
+
+
+def get_mesh_topology(faces: np.ndarray, n_vertices: int) -> MeshTopology:
+    """
+    MeshTopology for a face array, cached by face content so repeated
+    requests with the same connectivity reuse the sparse operators
+    """
+    faces = np.ascontiguousarray(faces, dtype=np.int64)
+    key = (n_vertices, hashlib.sha1(faces.tobytes()).digest())
+    with _topology_lock:
+        topology = _topology_cache.get(key)
+        if topology is not None:
+            _topology_cache.move_to_end(key)
+            return topology
+    
+    topology = MeshTopology(faces, n_vertices)
+    with _topology_lock:
+        _topology_cache[key] = topology
+        while len(_topology_cache) > _TOPOLOGY_CACHE_SIZE:
+            _topology_cache.popitem(last=False)
+    return topology
+
+
 class MeshOptimizer:
     """
     Mesh optimization and smoothing utilities
@@ -147,31 +691,47 @@ class MeshOptimizer:
     
     @staticmethod
     def laplacian_smoothing(vertices: np.ndarray, faces: np.ndarray, 
-                           iterations: int = 5, lambda_factor: float = 0.5) -> np.ndarray:
+                           iterations: int = 5, lambda_factor: float = 0.5,
+                           method: str = 'uniform',
+                           topology: Optional[MeshTopology] = None) -> np.ndarray:
         """
         Apply Laplacian smoothing to mesh vertices
+        Each iteration is one sparse matrix product: v <- v + lambda * (W v - v),
+        with uniform or cotangent weights in W. A prebuilt topology for faces
+        skips the cache lookup.
         """
-        smoothed_vertices = vertices.copy()
+        if len(faces) == 0:
+            return vertices.copy()
         
-        # Build adjacency list
-        n_vertices = len(vertices)
-        adjacency = [[] for _ in range(n_vertices)]
+        topology = topology or get_mesh_topology(faces, len(vertices))
+        smoothed_vertices = np.asarray(vertices, dtype=np.float64)
+        operator = topology.operator(smoothed_vertices, method)
         
-        for face in faces:
-            for i in range(3):
-                for j in range(3):
-                    if i != j:
-                        adjacency[face[i]].append(face[j])
+        for _ in range(iterations):
+            smoothed_vertices = smoothed_vertices + lambda_factor * (operator @ smoothed_vertices - smoothed_vertices)
+        
+        return smoothed_vertices
+    
+    @staticmethod
+    def taubin_smoothing(vertices: np.ndarray, faces: np.ndarray,
+                         iterations: int = 5, lambda_factor: float = 0.5,
+                         mu_factor: float = -0.53, method: str = 'uniform',
+                         topology: Optional[MeshTopology] = None) -> np.ndarray:
+        """
+        Taubin lambda/mu smoothing
+        Alternates a shrinking step (lambda > 0) with an inflating step
+        (mu < -lambda) so the mesh is smoothed without losing volume
+        """
+        if len(faces) == 0:
+            return vertices.copy()
+        
+        topology = topology or get_mesh_topology(faces, len(vertices))
+        smoothed_vertices = np.asarray(vertices, dtype=np.float64)
+        operator = topology.operator(smoothed_vertices, method)
         
-        # Apply smoothing iterations
         for _ in range(iterations):
-            new_vertices = smoothed_vertices.copy()
-            for i in range(n_vertices):
-                if len(adjacency[i]) > 0:
-                    neighbors = np.array(adjacency[i])
-                    neighbor_avg = smoothed_vertices[neighbors].mean(axis=0)
-                    new_vertices[i] = (1 - lambda_factor) * smoothed_vertices[i] + lambda_factor * neighbor_avg
-            smoothed_vertices = new_vertices
+            for factor in (lambda_factor, mu_factor):
+                smoothed_vertices = smoothed_vertices + factor * (operator @ smoothed_vertices - smoothed_vertices)
         
         return smoothed_vertices
     
@@ -190,6 +750,41 @@ class MeshOptimizer:
         
         return vertices[mask]
     
+    @staticmethod
+    def statistical_outlier_mask(points: np.ndarray, k: int = 16, std_ratio: float = 2.0) -> np.ndarray:
+        """
+        Statistical outlier removal
+        Keeps points whose mean distance to their k nearest neighbours
+        (cKDTree query) is within std_ratio standard deviations of the
+        cloud-wide mean. Returns the boolean keep mask.
+        """
+        if len(points) <= k:
+            return np.ones(len(points), dtype=bool)
+        from scipy.spatial import cKDTree
+        distances, _ = cKDTree(points).query(points, k=k + 1)
+        mean_distances = distances[:, 1:].mean(axis=1)
+        return mean_distances <= mean_distances.mean() + std_ratio * mean_distances.std()
+    
+    @staticmethod
+    def radius_outlier_mask(points: np.ndarray, radius: Optional[float] = None,
+                            min_neighbors: int = 4, radius_scale: float = 3.0) -> np.ndarray:
+        """
+        Radius outlier removal
+        Keeps points with at least min_neighbors other points within radius.
+        radius defaults to radius_scale times the median nearest-neighbour
+        distance, which makes the filter independent of the cloud's scale.
+        Returns the boolean keep mask.
+        """
+        if len(points) <= min_neighbors:
+            return np.ones(len(points), dtype=bool)
+        from scipy.spatial import cKDTree
+        tree = cKDTree(points)
+        if radius is None:
+            distances, _ = tree.query(points, k=2)
+            radius = radius_scale * float(np.median(distances[:, 1]))
+        counts = tree.query_ball_point(points, radius, return_length=True)
+        return counts - 1 >= min_neighbors
+    
     @staticmethod
     def fill_holes(vertices: np.ndarray, faces: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """
@@ -206,47 +801,158 @@ class TextureMapper:
     Texture mapping utilities for 3D meshes
     """
     
+    # Fixed-point bits used when rasterising UV triangles
+    RASTER_SHIFT = 4
+    # Atlas rows baked per pass, bounding the float32 working arrays
+    BAKE_ROWS = 256
+    
     @staticmethod
     def create_texture_atlas(images: List[np.ndarray], 
                             vertices_3d: np.ndarray,
                             faces: np.ndarray,
-                            camera_matrices: List[np.ndarray]) -> np.ndarray:
+                            camera_matrices: List[np.ndarray],
+                            texture_size: int = 1024) -> np.ndarray:
         """
         Create texture atlas from multiple images
-        Projects 3D vertices to 2D image coordinates and extracts textures
+        Bakes every triangle into UV space and blends all views that see it
+        """
+        texture, _ = TextureMapper.bake_texture(
+            images, vertices_3d, faces, camera_matrices, texture_size=texture_size
+        )
+        return texture
+    
+    @staticmethod
+    def bake_texture(images: List[np.ndarray],
+                     vertices_3d: np.ndarray,
+                     faces: np.ndarray,
+                     camera_matrices: List[np.ndarray],
+                     texture_size: int = 1024,
+                     uv_method: str = 'planar',
+                     angle_power: float = 2.0,
+                     uvs: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
         """
-        if len(images) == 0:
-            return np.zeros((256, 256, 3), dtype=np.uint8)
+        Multi-view texture baking
+        Rasterises the mesh into UV space (the given per-vertex uvs, or
+        generate_uv_coordinates when None), projects every covered texel into
+        each view and samples it with one cv2.remap per view and band of
+        BAKE_ROWS atlas rows. Views are blended with weight cos(angle between
+        face normal and view direction) ** angle_power; back-facing and
+        out-of-frame samples get zero weight.
+        Returns the texture and the per-vertex UVs (origin at the top-left).
+        """
+        vertices = np.asarray(vertices_3d, dtype=np.float64)
+        faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+        if uvs is None:
+            uvs = TextureMapper.generate_uv_coordinates(vertices - vertices.mean(axis=0), method=uv_method)
         
-        # Simple approach: use first image for texture
-        # Full implementation would blend textures from multiple views
-        texture_size = 1024
         texture = np.zeros((texture_size, texture_size, 3), dtype=np.uint8)
+        if len(images) == 0 or len(faces) == 0 or len(camera_matrices) == 0:
+            return texture, uvs
         
-        # Project vertices to first image
-        K = camera_matrices[0][:, :3] if len(camera_matrices) > 0 else np.eye(3)
-        if len(camera_matrices) > 0:
-            # Extract rotation and translation
-            R = camera_matrices[0][:, :3]
-            t = camera_matrices[0][:, 3:4]
-            
-            # Project to 2D
-            points_2d_homogeneous = K @ (R @ vertices_3d.T + t)
-            points_2d = (points_2d_homogeneous[:2] / points_2d_homogeneous[2]).T
+        uv_pixels = uvs * (texture_size - 1)
+        face_map = TextureMapper._rasterize_uv(uv_pixels, faces, texture_size)
+        if not (face_map >= 0).any():
+            return texture, uvs
+        # Empty texels point at an extra all-zero face so every per-face
+        # lookup below is a dense take over the whole atlas
+        empty = len(faces)
+        face_map[face_map < 0] = empty
+        
+        # Per-face affine map from [u, v, 1] to the 3D position
+        tri_uv = np.concatenate([uv_pixels[faces], np.ones((len(faces), 3, 1))], axis=2)
+        tri_xyz = vertices[faces]
+        singular = np.abs(np.linalg.det(tri_uv)) < 1e-12
+        tri_uv[singular] = np.eye(3)
+        uv_to_xyz = np.zeros((len(faces) + 1, 3, 3), dtype=np.float32)
+        uv_to_xyz[:-1] = np.linalg.solve(tri_uv, tri_xyz)
+        uv_to_xyz[:-1][singular] = 0
+        
+        # Face normals, oriented towards the average camera centre
+        cameras = np.array([TextureMapper._camera_center(P) for P in camera_matrices])
+        centroids = tri_xyz.mean(axis=1)
+        normals = np.cross(tri_xyz[:, 1] - tri_xyz[:, 0], tri_xyz[:, 2] - tri_xyz[:, 0])
+        normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+        normals *= np.where(((cameras.mean(axis=0) - centroids) * normals).sum(axis=1) < 0, -1.0, 1.0)[:, None]
+        
+        # View weight per face from the angle between normal and view ray
+        views = []
+        for image, P, center in zip(images, camera_matrices, cameras):
+            view_dir = center - centroids
+            view_dir /= np.maximum(np.linalg.norm(view_dir, axis=1, keepdims=True), 1e-12)
+            face_weight = np.zeros(len(faces) + 1, dtype=np.float32)
+            face_weight[:-1] = np.clip((view_dir * normals).sum(axis=1), 0, None) ** angle_power
+            if face_weight.any():
+                P = np.asarray(P, dtype=np.float64)
+                views.append((np.ascontiguousarray(image[:, :, :3]), P, np.vstack([P, P[2:3]]), face_weight))
+        
+        # The atlas is baked BAKE_ROWS rows at a time, so the float32 working
+        # set stays the same size whatever the texture size; rows without
+        # any face are skipped
+        columns = np.arange(texture_size, dtype=np.float32)
+        for top in range(0, texture_size, TextureMapper.BAKE_ROWS):
+            band = face_map[top:top + TextureMapper.BAKE_ROWS]
+            if not (band < empty).any():
+                continue
+            rows = np.arange(top, top + len(band), dtype=np.float32)[:, None]
+            positions = cv2.merge([
+                columns * np.take(uv_to_xyz[:, 0, c], band)
+                + rows * np.take(uv_to_xyz[:, 1, c], band)
+                + np.take(uv_to_xyz[:, 2, c], band)
+                for c in range(3)
+            ])
             
-            # Normalize to texture coordinates
-            if len(points_2d) > 0:
-                points_2d = points_2d - points_2d.min(axis=0)
-                points_2d = (points_2d / points_2d.max(axis=0) * (texture_size - 1)).astype(int)
+            accum = np.zeros(band.shape + (3,), dtype=np.float32)
+            weight_sum = np.zeros(band.shape, dtype=np.float32)
+            for image, P, homography, face_weight in views:
+                weight = np.take(face_weight, band)
+                
+                # Project every texel into the view; texels behind the camera
+                # or outside the frame get no weight
+                weight[cv2.transform(positions, P[2:3]) <= 1e-6] = 0
+                mapped = cv2.perspectiveTransform(positions, homography)
+                h, w = image.shape[:2]
+                weight[cv2.inRange(mapped, (0, 0, -np.inf), (w - 1, h - 1, np.inf)) == 0] = 0
+                map_x, map_y, _ = cv2.split(mapped)
                 
-                # Sample from image (simplified - would need proper UV mapping)
-                img = images[0]
-                for i, pt in enumerate(points_2d):
-                    if 0 <= pt[0] < texture_size and 0 <= pt[1] < texture_size:
-                        if 0 <= pt[1] < img.shape[0] and 0 <= pt[0] < img.shape[1]:
-                            texture[pt[1], pt[0]] = img[pt[1], pt[0]]
+                # One remap of the uint8 view samples every texel in the band
+                sampled = cv2.remap(
+                    image,
+                    map_x,
+                    map_y,
+                    interpolation=cv2.INTER_LINEAR,
+                    borderMode=cv2.BORDER_REPLICATE
+                )
+                cv2.accumulateProduct(sampled.astype(np.float32), cv2.merge([weight] * 3), accum)
+                weight_sum += weight
+            
+            weight_sum[weight_sum <= 0] = 1.0
+            texture[top:top + len(band)] = cv2.convertScaleAbs(accum / weight_sum[:, :, None])
         
-        return texture
+        return texture, uvs
+    
+    @staticmethod
+    def _camera_center(P: np.ndarray) -> np.ndarray:
+        """Camera centre C of P = [M | p4], i.e. C = -M^-1 p4"""
+        P = np.asarray(P, dtype=np.float64)
+        return -np.linalg.solve(P[:, :3], P[:, 3])
+    
+    @staticmethod
+    def _rasterize_uv(uv_pixels: np.ndarray, faces: np.ndarray, size: int) -> np.ndarray:
+        """
+        Rasterise faces into a (size, size) int32 map of face indices (-1 = empty)
+        Faces straddling a UV seam (spanning more than half the atlas) are skipped.
+        """
+        face_map = np.full((size, size), -1, dtype=np.int32)
+        tri = uv_pixels[faces]
+        spans = tri.max(axis=1) - tri.min(axis=1)
+        keep = np.flatnonzero((spans < size / 2).all(axis=1))
+        
+        scale = 1 << TextureMapper.RASTER_SHIFT
+        fixed = np.round(tri * scale).astype(np.int32)
+        for face in keep.tolist():
+            cv2.fillConvexPoly(face_map, fixed[face], face, lineType=cv2.LINE_8,
+                               shift=TextureMapper.RASTER_SHIFT)
+        return face_map
     
     @staticmethod
     def generate_uv_coordinates(vertices: np.ndarray, method: str = 'spherical') -> np.ndarray:
@@ -281,63 +987,16 @@ class TextureMapper:
 
 class GPUAcceleration:
     """
-    GPU acceleration utilities using CUDA (if available)
+    CUDA detection (CuPy), reported by /health; the pipeline runs on the CPU
     """
     
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def is_cuda_available() -> bool:
-        """Check if CUDA is available"""
+        """Check if CUDA is available; probed once per process"""
         try:
             import cupy as cp
-            return cp.cuda.is_available()
-        except ImportError:
-            return False
-    
-    @staticmethod
-    def accelerate_triangulation(points_2d_list: List[np.ndarray],
-                                camera_matrices: List[np.ndarray]) -> Optional[np.ndarray]:
-        """
-        GPU-accelerated triangulation using CuPy
-        Falls back to CPU if CUDA unavailable
-        """
-        if not GPUAcceleration.is_cuda_available():
-            return None
-        
-        try:
-            import cupy as cp
-            
-            # Convert to GPU arrays
-            points_gpu = [cp.asarray(p) for p in points_2d_list]
-            matrices_gpu = [cp.asarray(m) for m in camera_matrices]
-            
-            # Perform triangulation on GPU
-            # (Simplified - full implementation would use CuPy's linear algebra)
-            # For now, fallback to CPU
-            return None
-            
-        except Exception as e:
-            print(f"GPU acceleration failed: {e}")
-            return None
-    
-    @staticmethod
-    def accelerate_smoothing(vertices: np.ndarray, faces: np.ndarray) -> Optional[np.ndarray]:
-        """
-        GPU-accelerated mesh smoothing
-        """
-        if not GPUAcceleration.is_cuda_available():
-            return None
-        
-        try:
-            import cupy as cp
-            
-            # Convert to GPU
-            vertices_gpu = cp.asarray(vertices)
-            
-            # Perform smoothing on GPU
-            # (This is a placeholder - full implementation would use CuPy operations)
-            vertices_smoothed = cp.asnumpy(vertices_gpu)
-            
-            return vertices_smoothed
-            
+            return bool(cp.cuda.is_available())
         except Exception:
-            return None
+            # ImportError without CuPy, CUDA runtime errors without a usable driver
+            return False
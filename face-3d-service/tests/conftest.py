@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The service modules are imported top-level, as app.py does
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
@@ -0,0 +1,40 @@
+"""
+Pose angles of FaceMesh detections on the benchmark sample views
+"""
+
+import os
+
+import cv2
+import pytest
+
+from pipeline import _detect_face_landmarks
+from workers import WorkerPool
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks", "data")
+
+
+@pytest.fixture(scope="module")
+def worker_pool():
+    # Sizes the per-process FaceMesh pool the detector runs on
+    pool = WorkerPool(kind="thread", workers=1)
+    yield pool
+    pool.shutdown()
+
+
+def detect_pose(name: str):
+    image = cv2.cvtColor(cv2.imread(os.path.join(DATA_DIR, f"{name}.jpg")), cv2.COLOR_BGR2RGB)
+    landmarks = _detect_face_landmarks(image)
+    assert landmarks is not None
+    return landmarks.pose_angles
+
+
+def test_frontal_face_reads_near_zero(worker_pool):
+    pose = detect_pose("front")
+    assert abs(pose["yaw"]) < 10
+    assert abs(pose["pitch"]) < 10
+
+
+def test_turned_and_tilted_faces_move_away_from_frontal(worker_pool):
+    front = detect_pose("front")
+    assert detect_pose("left_30")["yaw"] > front["yaw"] > detect_pose("right_30")["yaw"]
+    assert detect_pose("up_10")["pitch"] > front["pitch"] > detect_pose("down_10")["pitch"]
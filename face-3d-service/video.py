@@ -0,0 +1,257 @@
+"""
+Video Ingestion
+Head-turn videos and frame sequences as multi-view input. Uploads are
+spooled to disk, frames are decoded one at a time with cv2.VideoCapture and
+only the sharpest frame per yaw/pitch cell is kept, so memory is bounded by
+the number of pose cells instead of the length of the video.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Tuple
+
+import cv2
+import numpy as np
+from starlette.requests import Request
+
+from ingest import IMAGE_MAX_PIXELS, UnsupportedUpload, UploadTooLarge, decode_image, fit_image
+from metrics import timed
+
+try:
+    import python_multipart
+except ImportError:
+    python_multipart = None
+
+VIDEO_MAX_BYTES = int(os.getenv("VIDEO_MAX_BYTES", str(200 * 1024 * 1024)))
+VIDEO_MAX_FRAMES = int(os.getenv("VIDEO_MAX_FRAMES", "1800"))  # 60 s at 30 fps
+# Frames are downscaled to this longest side before tracking and SfM
+VIDEO_MAX_SIDE = int(os.getenv("VIDEO_MAX_SIDE", "960"))
+VIDEO_MAX_KEYFRAMES = int(os.getenv("VIDEO_MAX_KEYFRAMES", "9"))
+# Yaw/pitch cell size (degrees); the grid coarsens whenever more than
+# VIDEO_MAX_CANDIDATES cells would hold a frame
+VIDEO_POSE_BIN = float(os.getenv("VIDEO_POSE_BIN", "10"))
+VIDEO_MAX_CANDIDATES = int(os.getenv("VIDEO_MAX_CANDIDATES", "32"))
+# Candidates less sharp than this fraction of the median are not selected
+VIDEO_MIN_SHARPNESS_RATIO = float(os.getenv("VIDEO_MIN_SHARPNESS_RATIO", "0.5"))
+
+# Raw request bodies with one of these content types are taken as one video
+_RAW_VIDEO_TYPES = ("video/", "application/octet-stream")
+_COPY_CHUNK = 1024 * 1024
+# Multipart bodies may exceed the file bytes by this much (boundaries,
+# part headers and form fields)
+_FORM_OVERHEAD = 1024 * 1024
+# Face crops are resized to this longest side before measuring sharpness,
+# so near and far faces are compared on the same scale
+_SHARPNESS_SIDE = 256
+
+
+class VideoDecodeError(Exception):
+    """Raised when an uploaded video cannot be opened"""
+
+
+async def spool_video_upload(request: Request, directory: str,
+                             max_bytes: int = VIDEO_MAX_BYTES,
+                             max_frames: int = VIDEO_MAX_FRAMES) -> Tuple[List[str], bool, Dict[str, List[str]]]:
+    """
+    Write an uploaded video or frame sequence into directory
+    A raw video/* or application/octet-stream body, or a multipart "video"
+    file field, is one video; multipart "frames" file fields are a frame
+    sequence in upload order. Returns the written paths, whether they are
+    a frame sequence, and the remaining form fields. Raises UploadTooLarge
+    past max_bytes in total, UnsupportedUpload for other content types and
+    ValueError when nothing usable was sent. The limit is checked against
+    Content-Length up front and against the body as it is received, before
+    Starlette spools any of it.
+    """
+    content_type = request.headers.get("content-type", "").lower()
+    paths: List[str] = []
+    fields: Dict[str, List[str]] = {}
+    written = 0
+
+    if content_type.startswith("multipart/form-data"):
+        if python_multipart is None:
+            raise UnsupportedUpload("Multipart uploads require the 'python-multipart' package")
+        # Starlette spools file parts to temporary files while parsing
+        request = _limit_body(request, max_bytes, _FORM_OVERHEAD)
+        form = await request.form(max_files=max_frames + 1)
+        kinds = set()
+        try:
+            for key, value in form.multi_items():
+                if isinstance(value, str):
+                    fields.setdefault(key, []).append(value)
+                    continue
+                if key not in ("video", "frames"):
+                    continue
+                kinds.add(key)
+                if len(kinds) > 1 or (key == "video" and paths):
+                    raise ValueError("Send either one 'video' file or 'frames' files")
+                extension = os.path.splitext(value.filename or "")[1][:8]
+                path = os.path.join(directory, f"{len(paths):06d}{extension}")
+                with open(path, "wb") as f:
+                    while True:
+                        chunk = await value.read(_COPY_CHUNK)
+                        if not chunk:
+                            break
+                        written += len(chunk)
+                        if written > max_bytes:
+                            raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+                        f.write(chunk)
+                paths.append(path)
+        finally:
+            await form.close()
+        if not paths:
+            raise ValueError("Multipart form has no 'video' or 'frames' file fields")
+        return paths, "frames" in kinds, fields
+
+    if content_type.startswith(_RAW_VIDEO_TYPES):
+        path = os.path.join(directory, "video")
+        with open(path, "wb") as f:
+            async for chunk in _limit_body(request, max_bytes).stream():
+                written += len(chunk)
+                f.write(chunk)
+        if not written:
+            raise ValueError("Request body is empty")
+        return [path], False, fields
+
+    raise UnsupportedUpload("Expected multipart/form-data or a video request body")
+
+
+def _limit_body(request: Request, max_bytes: int, overhead: int = 0) -> Request:
+    """
+    request whose body raises UploadTooLarge once more than max_bytes plus
+    overhead have been received, or right away when Content-Length already
+    says so
+    """
+    limit = max_bytes + overhead
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > limit:
+        raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+    received = 0
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal received
+        message = await request.receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > limit:
+                raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+        return message
+
+    return Request(request.scope, receive)
+
+
+def iter_frames(paths: List[str], is_sequence: bool, max_side: int = VIDEO_MAX_SIDE,
+                max_frames: int = VIDEO_MAX_FRAMES) -> Iterator[np.ndarray]:
+    """
+    RGB uint8 frames of a video file or frame sequence, one at a time
+    Frames are downscaled to max_side; at most max_frames are read.
+    Raises VideoDecodeError when the video cannot be opened or its frames
+    are larger than IMAGE_MAX_PIXELS.
+    """
+    if is_sequence:
+        for path in paths[:max_frames]:
+            with open(path, "rb") as f:
+                data = f.read()
+            yield fit_image(decode_image(data, max_side), max_side)
+        return
+
+    capture = cv2.VideoCapture(paths[0])
+    if not capture.isOpened():
+        raise VideoDecodeError("Unsupported or corrupt video data")
+    try:
+        pixels = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)) * int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if IMAGE_MAX_PIXELS > 0 and pixels > IMAGE_MAX_PIXELS:
+            raise VideoDecodeError(f"Frames have {pixels} pixels, more than the {IMAGE_MAX_PIXELS} allowed")
+        for _ in range(max_frames):
+            with timed("decode"):
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                frame = fit_image(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), max_side)
+            yield frame
+    finally:
+        capture.release()
+
+
+def face_sharpness(image: np.ndarray, box: Dict[str, float]) -> float:
+    """Variance of the Laplacian over the face bounding box"""
+    h, w = image.shape[:2]
+    x0, y0 = max(int(box["x_min"]), 0), max(int(box["y_min"]), 0)
+    x1, y1 = min(int(np.ceil(box["x_max"])), w), min(int(np.ceil(box["y_max"])), h)
+    if x1 - x0 < 8 or y1 - y0 < 8:
+        return 0.0
+    gray = cv2.cvtColor(image[y0:y1, x0:x1], cv2.COLOR_RGB2GRAY)
+    gray = fit_image(gray, _SHARPNESS_SIDE)
+    return float(cv2.Laplacian(gray, cv2.CV_32F).var())
+
+
+@dataclass
+class Keyframe:
+    index: int  # frame number in the video
+    image: np.ndarray
+    landmarks: Any  # pipeline.FaceLandmarks
+    sharpness: float
+
+    @property
+    def pose(self) -> Tuple[float, float]:
+        return self.landmarks.pose_angles["yaw"], self.landmarks.pose_angles["pitch"]
+
+
+class KeyframeSelector:
+    """
+    Keeps the sharpest frame of every yaw/pitch cell while frames stream
+    by, then picks up to max_keyframes of them spread over the pose range.
+    At most max_candidates frames are held: when more cells fill up, the
+    cell size doubles and neighbouring cells are merged.
+    """
+
+    def __init__(self, bin_degrees: float = VIDEO_POSE_BIN,
+                 max_keyframes: int = VIDEO_MAX_KEYFRAMES,
+                 max_candidates: int = VIDEO_MAX_CANDIDATES,
+                 min_sharpness_ratio: float = VIDEO_MIN_SHARPNESS_RATIO):
+        self.bin_degrees = bin_degrees
+        self.max_keyframes = max_keyframes
+        self.max_candidates = max(max_candidates, max_keyframes)
+        self.min_sharpness_ratio = min_sharpness_ratio
+        self.cells: Dict[Tuple[int, int], Keyframe] = {}
+
+    def _cell(self, keyframe: Keyframe) -> Tuple[int, int]:
+        yaw, pitch = keyframe.pose
+        return int(np.floor(yaw / self.bin_degrees)), int(np.floor(pitch / self.bin_degrees))
+
+    def _keep(self, cells: Dict[Tuple[int, int], Keyframe], keyframe: Keyframe) -> None:
+        cell = self._cell(keyframe)
+        best = cells.get(cell)
+        if best is None or keyframe.sharpness > best.sharpness:
+            cells[cell] = keyframe
+
+    def offer(self, keyframe: Keyframe) -> None:
+        self._keep(self.cells, keyframe)
+        while len(self.cells) > self.max_candidates:
+            self.bin_degrees *= 2
+            merged: Dict[Tuple[int, int], Keyframe] = {}
+            for candidate in self.cells.values():
+                self._keep(merged, candidate)
+            self.cells = merged
+
+    def select(self) -> List[Keyframe]:
+        """
+        Farthest-point sampling in (yaw, pitch) over the sharp candidates,
+        starting from the most frontal one; returned in frame order
+        """
+        candidates = list(self.cells.values())
+        if not candidates:
+            return []
+        threshold = self.min_sharpness_ratio * float(np.median([c.sharpness for c in candidates]))
+        candidates = [c for c in candidates if c.sharpness >= threshold]
+
+        poses = np.array([c.pose for c in candidates])
+        chosen = [int(np.argmin(np.abs(poses[:, 0])))]
+        distance = np.linalg.norm(poses - poses[chosen[0]], axis=1)
+        while len(chosen) < min(self.max_keyframes, len(candidates)):
+            nxt = int(np.argmax(distance))
+            if distance[nxt] <= 0:
+                break
+            chosen.append(nxt)
+            distance = np.minimum(distance, np.linalg.norm(poses - poses[nxt], axis=1))
+        return sorted((candidates[i] for i in chosen), key=lambda c: c.index)
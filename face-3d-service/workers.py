@@ -0,0 +1,216 @@
+"""
+Worker Pool
+Bounded thread / process pool that runs the CPU-bound pipeline stages off
+the event loop, with per-worker FaceMesh and StructureFromMotion objects
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+from artifact_store import get_artifact_store
+from face_mesh_pool import FaceMeshPool, FACE_MESH_POOL_SIZE
+from metrics import merge, profiling_requested, run_instrumented
+from reconstruction_3d import StructureFromMotion
+
+WORKER_POOL_KIND = os.getenv("WORKER_POOL_KIND", "thread")  # "thread" or "process"
+WORKER_COUNT = int(os.getenv("WORKER_COUNT", str(min(os.cpu_count() or 1, 4))))
+WORKER_QUEUE_SIZE = int(os.getenv("WORKER_QUEUE_SIZE", "16"))
+WORKER_RETRY_AFTER = int(os.getenv("WORKER_RETRY_AFTER", "5"))
+# Threads shared by all workers for concurrent FLANN pair matching
+SFM_MATCH_WORKERS = int(os.getenv("SFM_MATCH_WORKERS", "4"))
+
+# Per-process FaceMesh pool. In thread mode it is shared by all worker
+# threads and sized to the worker count; in process mode every child
+# process builds its own single-instance pool. It is built in the executor
+# initializer as the workers start, whether or not a warm-up runs, rather
+# than on the event loop or by the first request.
+_face_mesh_pool: Optional[FaceMeshPool] = None
+_face_mesh_pool_size = 0
+_face_mesh_pool_lock = threading.Lock()
+# Same sizing for the video tracking graphs (static_image_mode=False),
+# which are built on the first video instead of at startup
+_tracking_pool: Optional[FaceMeshPool] = None
+# Per-worker StructureFromMotion (holds the SIFT detector and FLANN matcher,
+# and shares the process-wide artifact store for cached SIFT features) and
+# the outcome of the worker's start-up
+_local = threading.local()
+
+
+class WorkerPoolSaturated(Exception):
+    """Raised when the bounded task queue is full"""
+
+    def __init__(self, message: str, retry_after: int = WORKER_RETRY_AFTER):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def current_face_mesh_pool() -> FaceMeshPool:
+    """FaceMesh pool for the calling worker"""
+    global _face_mesh_pool
+    if _face_mesh_pool is None:
+        with _face_mesh_pool_lock:
+            if _face_mesh_pool is None:
+                if _face_mesh_pool_size < 1:
+                    raise RuntimeError("FaceMesh pool is not initialised")
+                _face_mesh_pool = FaceMeshPool(size=_face_mesh_pool_size)
+    return _face_mesh_pool
+
+
+def current_tracking_pool() -> FaceMeshPool:
+    """FaceMesh pool in tracking mode for video frames; reset graphs per video"""
+    global _tracking_pool
+    if _tracking_pool is None:
+        with _face_mesh_pool_lock:
+            if _tracking_pool is None:
+                if _face_mesh_pool_size < 1:
+                    raise RuntimeError("FaceMesh pool is not initialised")
+                _tracking_pool = FaceMeshPool(size=_face_mesh_pool_size, static_image_mode=False)
+    return _tracking_pool
+
+
+def current_sfm() -> StructureFromMotion:
+    """StructureFromMotion instance owned by the calling worker"""
+    sfm = getattr(_local, "sfm", None)
+    if sfm is None:
+        sfm = StructureFromMotion(match_workers=SFM_MATCH_WORKERS, artifact_store=get_artifact_store())
+        _local.sfm = sfm
+    return sfm
+
+
+def _init_worker(warm_up: Optional[Callable[[], Dict[str, float]]]) -> None:
+    """
+    Executor initializer: build the FaceMesh pool, then run warm_up if
+    given, before the worker takes its first task
+    """
+    try:
+        start = time.perf_counter()
+        current_face_mesh_pool()
+        timings = {"face_mesh_pool": time.perf_counter() - start}
+        if warm_up is not None:
+            timings.update(warm_up())
+        _local.warm_up = timings
+    except Exception as e:
+        # Reported through worker_warm_up instead of breaking the executor
+        _local.warm_up = e
+
+
+def _init_process_worker(warm_up: Optional[Callable[[], Dict[str, float]]]) -> None:
+    global _face_mesh_pool_size
+    _face_mesh_pool_size = 1
+    _init_worker(warm_up)
+
+
+def worker_warm_up() -> Optional[Dict[str, float]]:
+    """Step timings of the start-up (pool build and warm-up) the calling worker ran"""
+    result = getattr(_local, "warm_up", None)
+    if isinstance(result, BaseException):
+        raise result
+    return result
+
+
+class WorkerPool:
+    """
+    Executor for pipeline stages with a bounded queue.
+    At most `workers + queue_size` tasks may be in flight; further
+    submissions fail fast with WorkerPoolSaturated instead of queueing
+    without limit. Every worker thread or process builds its FaceMesh pool
+    as it starts and then runs warm_up, if given, before it takes any task.
+    """
+
+    def __init__(self, kind: str = WORKER_POOL_KIND, workers: int = WORKER_COUNT,
+                 queue_size: int = WORKER_QUEUE_SIZE,
+                 warm_up: Optional[Callable[[], Dict[str, float]]] = None):
+        global _face_mesh_pool_size
+
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown worker pool kind: {kind}")
+
+        self.kind = kind
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+
+        self.executor: Executor
+        if kind == "process":
+            self.executor = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_process_worker,
+                initargs=(warm_up,),
+            )
+        else:
+            _face_mesh_pool_size = FACE_MESH_POOL_SIZE or workers
+            self.executor = ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix="reconstruction",
+                initializer=_init_worker,
+                initargs=(warm_up,),
+            )
+
+    def _reserve(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._rejected += 1
+                raise WorkerPoolSaturated(
+                    f"Reconstruction queue is full ({self._in_flight} tasks in flight)"
+                )
+            self._in_flight += 1
+
+    def _release(self, _future: Any = None) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run fn(*args, **kwargs) on a worker and await the result
+        Raises WorkerPoolSaturated immediately if the queue is full. Stage
+        timings recorded by fn are reported in the awaiting request.
+        """
+        self._reserve()
+        try:
+            future = self.executor.submit(partial(
+                run_instrumented, fn, profiling_requested(), time.monotonic(), *args, **kwargs
+            ))
+        except BaseException:
+            self._release()
+            raise
+        # Release when the worker finishes rather than when the awaiting
+        # request goes away, so cancelled requests keep counting until the
+        # work actually stops.
+        future.add_done_callback(self._release)
+        result, sample = await asyncio.wrap_future(future)
+        merge(sample)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                "kind": self.kind,
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "in_flight": self._in_flight,
+                "queued": max(self._in_flight - self.workers, 0),
+                "rejected": self._rejected,
+            }
+        if self.kind == "thread" and _face_mesh_pool is not None:
+            stats["face_mesh_pool"] = _face_mesh_pool.stats()
+        if self.kind == "thread" and _tracking_pool is not None:
+            stats["tracking_pool"] = _tracking_pool.stats()
+        return stats
+
+    def shutdown(self) -> None:
+        global _face_mesh_pool, _tracking_pool, _face_mesh_pool_size
+
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        if self.kind == "thread":
+            for pool in (_face_mesh_pool, _tracking_pool):
+                if pool is not None:
+                    pool.close()
+            _face_mesh_pool = _tracking_pool = None
+            _face_mesh_pool_size = 0
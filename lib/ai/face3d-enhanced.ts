@@ -34,7 +34,8 @@ export interface EnhancedReconstructionResponse {
   mesh_faces?: number[][];
   texture_data?: string;
   warnings: string[];
-  gpu_accelerated: boolean;
+  /** @deprecated No longer sent by the service; triangulation always runs on the CPU. */
+  gpu_accelerated?: boolean;
 }
 
 /**
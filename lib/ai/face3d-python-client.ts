@@ -27,17 +27,36 @@ export interface FaceLandmarksResponse {
     pitch: number;
     roll: number;
   };
+  image_size?: { width: number; height: number }; // Size the landmark pixel coordinates refer to
 }
 
 export interface MultiViewReconstructionResponse {
   landmarks_list: FaceLandmarksResponse[];
   reconstruction_quality: number;
   estimated_3d_points?: number[][];
+  dense_points?: number[][]; // Filtered SIFT point cloud (dense requests only)
   mesh_vertices?: number[][];
   mesh_faces?: number[][];
+  mesh_uvs?: number[][]; // Per-vertex texture coordinates (origin top-left)
   texture_data?: string; // Base64 encoded texture
   warnings: string[];
-  gpu_accelerated: boolean;
+  /** @deprecated No longer sent by the service; triangulation always runs on the CPU. */
+  gpu_accelerated?: boolean;
+  quality?: ReconstructionQuality | null; // Lowest tier any reconstruction stage actually ran at
+  keyframes?: VideoKeyframe[]; // Frames selected from a video input
+}
+
+export type ReconstructionQuality = 'draft' | 'standard' | 'high';
+
+export interface MultiViewReconstructionOptions {
+  quality?: ReconstructionQuality; // Per-stage budget tier (service default: standard)
+}
+
+export interface VideoKeyframe {
+  frame: number; // Frame number in the video or position in the frame sequence
+  yaw: number;
+  pitch: number;
+  sharpness: number; // Variance of the Laplacian over the face
 }
 
 /**
@@ -84,11 +103,49 @@ export async function detectFaceLandmarksPython(imageUrl: string): Promise<FaceL
   }
 }
 
+export interface BatchLandmarksItem {
+  index: number;
+  source: string;
+  status_code: number;
+  result?: FaceLandmarksResponse | null;
+  error?: string | null;
+}
+
+/**
+ * Detect face landmarks for many images in one call
+ * Each entry carries its own status, so one bad URL does not fail the batch
+ */
+export async function detectFaceLandmarksBatchPython(imageUrls: string[]): Promise<BatchLandmarksItem[] | null> {
+  try {
+    const response = await fetch(`${PYTHON_SERVICE_URL}/detect-landmarks/batch`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ image_urls: imageUrls }),
+      signal: AbortSignal.timeout(120000), // 2 minute timeout for the whole batch
+    });
+
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({ detail: 'Unknown error' }));
+      console.error('Python service error:', errorData.detail || response.statusText);
+      return null;
+    }
+
+    const data = await response.json();
+    return data.results as BatchLandmarksItem[];
+  } catch (error: unknown) {
+    console.error('Error calling Python service for batch landmarks:', error instanceof Error ? error.message : String(error));
+    return null;
+  }
+}
+
 /**
  * Multi-view reconstruction from multiple images
  */
 export async function multiViewReconstructionPython(
-  imageUrls: string[]
+  imageUrls: string[],
+  options: MultiViewReconstructionOptions = {}
 ): Promise<MultiViewReconstructionResponse | null> {
   try {
     const response = await fetch(`${PYTHON_SERVICE_URL}/multi-view-reconstruction`, {
@@ -96,7 +153,7 @@ export async function multiViewReconstructionPython(
       headers: {
         'Content-Type': 'application/json',
       },
-      body: JSON.stringify({ image_urls: imageUrls }),
+      body: JSON.stringify({ image_urls: imageUrls, ...options }),
       signal: AbortSignal.timeout(60000), // 60 second timeout for multiple images
     });
 
@@ -113,3 +170,237 @@ export async function multiViewReconstructionPython(
     return null;
   }
 }
+
+export interface ReconstructionJobStatus {
+  job_id: string;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  result?: MultiViewReconstructionResponse | null;
+  error?: { status_code: number; detail: string } | null;
+}
+
+const JOB_POLL_INTERVAL_MS = 1000;
+const JOB_TIMEOUT_MS = 5 * 60 * 1000;
+
+/**
+ * Queue an asynchronous multi-view reconstruction and return its job id
+ * Identical submissions (same URLs in the same order) share one job
+ */
+export async function submitReconstructionJob(
+  imageUrls: string[],
+  options: MultiViewReconstructionOptions = {}
+): Promise<string | null> {
+  try {
+    const response = await fetch(`${PYTHON_SERVICE_URL}/jobs/multi-view-reconstruction`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ image_urls: imageUrls, ...options }),
+      signal: AbortSignal.timeout(30000), // 30 second timeout for submission
+    });
+
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({ detail: 'Unknown error' }));
+      console.error('Python service error:', errorData.detail || response.statusText);
+      return null;
+    }
+
+    const { job_id: jobId } = (await response.json()) as ReconstructionJobStatus;
+    return jobId;
+  } catch (error: unknown) {
+    console.error('Error submitting reconstruction job to Python service:', error instanceof Error ? error.message : String(error));
+    return null;
+  }
+}
+
+/**
+ * Poll a reconstruction job until it finishes or timeoutMs passes
+ * Returns the reconstruction of a succeeded job, null otherwise
+ */
+export async function pollReconstructionJob(
+  jobId: string,
+  timeoutMs: number = JOB_TIMEOUT_MS
+): Promise<MultiViewReconstructionResponse | null> {
+  try {
+    const deadline = Date.now() + timeoutMs;
+
+    while (Date.now() < deadline) {
+      const response = await fetch(`${PYTHON_SERVICE_URL}/jobs/${jobId}`, {
+        method: 'GET',
+        signal: AbortSignal.timeout(10000), // 10 second timeout per poll
+      });
+
+      if (!response.ok) {
+        const errorData = await response.json().catch(() => ({ detail: 'Unknown error' }));
+        console.error('Python service error:', errorData.detail || response.statusText);
+        return null;
+      }
+
+      const job = (await response.json()) as ReconstructionJobStatus;
+      if (job.status === 'succeeded') {
+        return job.result ?? null;
+      }
+      if (job.status === 'failed') {
+        console.error('Python service error:', job.error?.detail || 'Reconstruction job failed');
+        return null;
+      }
+
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    }
+
+    console.error('Python service error: reconstruction job timed out');
+    return null;
+  } catch (error: unknown) {
+    console.error('Error polling reconstruction job:', error instanceof Error ? error.message : String(error));
+    return null;
+  }
+}
+
+/**
+ * Multi-view reconstruction from a head-turn video
+ * The video is sent as a multipart "video" field; the service tracks the face
+ * and reconstructs from a pose-spread set of sharp keyframes
+ */
+export async function reconstructFromVideo(
+  video: Blob,
+  options: MultiViewReconstructionOptions = {}
+): Promise<MultiViewReconstructionResponse | null> {
+  try {
+    const form = new FormData();
+    form.append('video', video, 'video');
+    if (options.quality) {
+      form.append('quality', options.quality);
+    }
+    const response = await fetch(`${PYTHON_SERVICE_URL}/multi-view-reconstruction/video`, {
+      method: 'POST',
+      body: form,
+      signal: AbortSignal.timeout(180000), // 3 minute timeout for upload, tracking and reconstruction
+    });
+
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({ detail: 'Unknown error' }));
+      console.error('Python service error:', errorData.detail || response.statusText);
+      return null;
+    }
+
+    const data = await response.json();
+    return data as MultiViewReconstructionResponse;
+  } catch (error: unknown) {
+    console.error('Error calling Python service for video reconstruction:', error instanceof Error ? error.message : String(error));
+    return null;
+  }
+}
+
+/**
+ * Multi-view reconstruction returned as binary glTF (GLB)
+ * Skips the JSON float round trip so the mesh can go straight to GLTFLoader
+ */
+export async function multiViewReconstructionGlbPython(
+  imageUrls: string[],
+  options: MultiViewReconstructionOptions = {}
+): Promise<ArrayBuffer | null> {
+  try {
+    const response = await fetch(`${PYTHON_SERVICE_URL}/multi-view-reconstruction`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        Accept: 'model/gltf-binary',
+      },
+      body: JSON.stringify({ image_urls: imageUrls, ...options }),
+      signal: AbortSignal.timeout(60000), // 60 second timeout for multiple images
+    });
+
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({ detail: 'Unknown error' }));
+      console.error('Python service error:', errorData.detail || response.statusText);
+      return null;
+    }
+
+    return await response.arrayBuffer();
+  } catch (error: unknown) {
+    console.error('Error calling Python service for GLB reconstruction:', error instanceof Error ? error.message : String(error));
+    return null;
+  }
+}
+
+export type ReconstructionStreamEvent =
+  | ({ event: 'landmarks'; index: number; error?: string } & Partial<FaceLandmarksResponse>)
+  | {
+      event: 'summary';
+      reconstruction_quality: number;
+      pose_angles: (FaceLandmarksResponse['pose_angles'] | null)[];
+      yaw_range: number;
+      pitch_range: number;
+      warnings: string[];
+    }
+  | {
+      event: 'points';
+      estimated_3d_points: number[][] | null;
+      /** @deprecated No longer sent by the service. */
+      gpu_accelerated?: boolean;
+    }
+  | { event: 'dense_points'; dense_points: number[][] }
+  | { event: 'mesh'; mesh_vertices: number[][]; mesh_faces: number[][] }
+  | { event: 'texture'; mesh_uvs: number[][]; texture_data: string }
+  | {
+      event: 'done';
+      reconstruction_quality: number;
+      warnings: string[];
+      /** @deprecated No longer sent by the service. */
+      gpu_accelerated?: boolean;
+      quality: ReconstructionQuality | null;
+    }
+  | { event: 'error'; status_code: number; detail: string };
+
+/**
+ * Progressive multi-view reconstruction (NDJSON stream)
+ * Calls onEvent for every stage as it finishes; aborting the signal
+ * closes the connection and cancels the remaining stages on the service
+ */
+export async function multiViewReconstructionStreamPython(
+  imageUrls: string[],
+  onEvent: (event: ReconstructionStreamEvent) => void,
+  signal?: AbortSignal,
+  options: MultiViewReconstructionOptions = {}
+): Promise<boolean> {
+  try {
+    const response = await fetch(`${PYTHON_SERVICE_URL}/multi-view-reconstruction/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        Accept: 'application/x-ndjson',
+      },
+      body: JSON.stringify({ image_urls: imageUrls, ...options }),
+      signal,
+    });
+
+    if (!response.ok || !response.body) {
+      const errorData = await response.json().catch(() => ({ detail: 'Unknown error' }));
+      console.error('Python service error:', errorData.detail || response.statusText);
+      return false;
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+    let completed = false;
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffered += decoder.decode(value, { stream: true });
+      let newline: number;
+      while ((newline = buffered.indexOf('\n')) >= 0) {
+        const line = buffered.slice(0, newline).trim();
+        buffered = buffered.slice(newline + 1);
+        if (!line) continue;
+        const event = JSON.parse(line) as ReconstructionStreamEvent;
+        completed = event.event === 'done';
+        onEvent(event);
+      }
+    }
+    return completed;
+  } catch (error: unknown) {
+    console.error('Error calling Python service for streaming reconstruction:', error instanceof Error ? error.message : String(error));
+    return false;
+  }
+}